@@ -0,0 +1,91 @@
+"""
+Benchmark de los motores de clasificación.
+
+Genera artículos sintéticos con un tema oculto: cada tema tiene su
+vocabulario relacionado y solo una parte de sus artículos usa alguna de
+las palabras clave del analizador. Ajusta el motor TF-IDF sobre ellos y
+compara contra las palabras clave: artículos por segundo y precisión /
+cobertura frente al tema oculto.
+
+Uso: python bench_classifiers.py [n_articulos] [fraccion_con_palabra_clave]
+"""
+import sys
+import time
+import random
+
+from main_loop import topics
+from classifiers import KeywordEngine, TfidfEngine, fit_model, BATCH_SIZE
+
+FILLER = (
+    "el la de que en un una por con para los las se del al su como más pero "
+    "sus le ya este porque esta entre cuando muy sin sobre también hasta hay "
+    "donde desde todo durante todos contra otros ante ellos antes algunos "
+    "país ciudad bogotá medellín cali colombia región semana año mes día "
+    "según informó dijo anunció fuentes nacional departamento personas"
+).split()
+
+RELATED = {
+    "economia": "mercado acciones bolsa peso exportaciones banco empresarios inversión "
+                "crecimiento déficit aranceles petróleo precios consumidores fiscal",
+    "seguridad": "policía ejército disidencias armas muertos heridos fiscalía "
+                 "combates extorsión secuestro operativo criminal banda detenidos",
+    "politica": "senado partido campaña votos reforma oposición coalición decreto "
+                "candidato gabinete debate proyecto ley petro registraduría",
+    "salud": "pacientes médicos vacunación eps urgencias virus camas tratamiento "
+             "epidemia contagios minsalud brote síntomas medicamentos",
+}
+
+def synthetic_articles(n, keyword_share, seed=42):
+    """(texto, tema oculto o None) con ~40 palabras cada uno"""
+    rng = random.Random(seed)
+    names = list(topics)
+    related = {t: words.split() for t, words in RELATED.items()}
+    articles = []
+    for _ in range(n):
+        topic = rng.choice(names + [None])
+        words = [rng.choice(FILLER) for _ in range(rng.randint(25, 50))]
+        if topic:
+            for _ in range(rng.randint(4, 8)):
+                words[rng.randrange(len(words))] = rng.choice(related[topic])
+            if rng.random() < keyword_share:
+                words[rng.randrange(len(words))] = rng.choice(topics[topic])
+        articles.append((" ".join(words), topic))
+    return articles
+
+def evaluate(label, engine, articles):
+    texts = [text for text, _ in articles]
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(texts), BATCH_SIZE):
+        results.extend(engine.score_batch(texts[i:i + BATCH_SIZE]))
+    elapsed = time.perf_counter() - start
+
+    print(f"{label}: {len(texts) / elapsed:,.0f} art/s")
+    for topic in engine.topics:
+        predicted = {i for i, scores in enumerate(results) if topic in scores}
+        actual = {i for i, (_, t) in enumerate(articles) if t == topic}
+        hits = len(predicted & actual)
+        precision = hits / len(predicted) if predicted else 0.0
+        recall = hits / len(actual) if actual else 0.0
+        print(f"   - {topic:<10} precisión {precision:.2f}   cobertura {recall:.2f}")
+    print()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    keyword_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+
+    print(f"📊 {n:,} artículos sintéticos, {keyword_share:.0%} de los de cada tema con palabra clave\n")
+    articles = synthetic_articles(n, keyword_share)
+
+    keywords = KeywordEngine(topics)
+    evaluate("Palabras clave", keywords, articles)
+
+    tfidf = TfidfEngine(topics, model_path=None)
+    start = time.perf_counter()
+    tfidf.model = fit_model(tfidf.matcher, [text for text, _ in articles])
+    print(f"🧠 Ajuste TF-IDF: {time.perf_counter() - start:.2f}s, "
+          f"{len(tfidf.model.vocabulary)} términos\n")
+    evaluate("TF-IDF", tfidf, articles)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark del clasificador por temas.
+
+Compara el bucle original (`any(word in text for word in words)` por tema)
+contra TopicMatcher sobre artículos sintéticos, con el diccionario actual
+y con uno ampliado para ver cómo escala con el número de palabras clave.
+
+Uso: python bench_topic_matcher.py [n_articulos]
+"""
+import sys
+import time
+import random
+
+from main_loop import topics
+from topic_matcher import TopicMatcher
+
+VOCAB = (
+    "el la de que en un una por con para los las se del al su como más pero "
+    "sus le ya este porque esta entre cuando muy sin sobre también hasta hay "
+    "donde desde todo durante todos contra otros ante ellos antes algunos "
+    "país ciudad bogotá medellín cali colombia región semana año mes día "
+    "wellness mercado empresa barrio estudiantes familia proyecto"
+).split()
+
+def legacy_match(text, topic_dict=topics):
+    """Bucle original del analizador"""
+    text = text.lower()
+    return [topic for topic, words in topic_dict.items()
+            if any(word in text for word in words)]
+
+def synthetic_articles(n, keywords, seed=42):
+    """Genera n textos de 20 a 120 palabras con ~2% de palabras clave"""
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n):
+        words = [rng.choice(keywords) if rng.random() < 0.02 else rng.choice(VOCAB)
+                 for _ in range(rng.randint(20, 120))]
+        articles.append(" ".join(words).capitalize() + ".")
+    return articles
+
+def expanded_topics(factor):
+    """Diccionario con `factor` veces más palabras clave por tema"""
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {
+        topic: words + ["".join(rng.choice(letters) for _ in range(8))
+                        for _ in range(len(words) * (factor - 1))]
+        for topic, words in topics.items()
+    }
+
+def timed(fn, articles):
+    start = time.perf_counter()
+    for text in articles:
+        fn(text)
+    return time.perf_counter() - start
+
+def run(label, topic_dict, articles):
+    matcher = TopicMatcher(topic_dict)
+    legacy = timed(lambda text: legacy_match(text, topic_dict), articles)
+    compiled = timed(matcher.match, articles)
+
+    n_keywords = sum(len(words) for words in topic_dict.values())
+    print(f"{label} ({n_keywords} palabras clave):")
+    print(f"   - Bucle original: {legacy:.2f}s ({len(articles)/legacy:,.0f} art/s)")
+    print(f"   - TopicMatcher:   {compiled:.2f}s ({len(articles)/compiled:,.0f} art/s)")
+    print(f"   - Relación:       {legacy/compiled:.2f}x\n")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    keywords = [word for words in topics.values() for word in words]
+
+    print(f"📊 Generando {n:,} artículos sintéticos...\n")
+    articles = synthetic_articles(n, keywords)
+
+    run("Diccionario actual", topics, articles)
+    run("Diccionario x20", expanded_topics(20), articles)
+
+    # Diferencias de clasificación por límites de palabra y tildes
+    matcher = TopicMatcher(topics)
+    differ = sum(legacy_match(text) != matcher.match(text) for text in articles)
+    print(f"🔎 Artículos clasificados distinto que el bucle original: {differ:,}")
+
+if __name__ == "__main__":
+    main()
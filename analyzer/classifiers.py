@@ -0,0 +1,279 @@
+"""
+Motores de clasificación por temas del analizador.
+
+Todos reciben lotes de textos y devuelven, por artículo, los temas
+asignados con su puntaje: {tema: puntaje}. El conteo diario suma un
+artículo por tema asignado y la serie de puntajes suma los puntajes.
+
+- keywords: TopicMatcher (listas de palabras clave). Puntaje 1.0 por
+  tema encontrado, así que los puntajes coinciden con los conteos.
+- tfidf: similitud coseno entre el vector TF-IDF del artículo y el
+  centroide de cada tema. El vocabulario y el IDF se ajustan sobre el
+  almacén de artículos limpios. Cada centroide mezcla el promedio de los
+  artículos que las palabras clave asignan al tema (menos el promedio de
+  todo el corpus) con las propias palabras clave, de modo que el motor
+  funciona sin datos etiquetados y encuentra artículos del tema que no
+  usan ninguna de esas palabras. El
+  umbral de cada tema se calibra para aceptar TFIDF_RECALL de los
+  artículos que asignan las palabras clave, puntuados sin ellas.
+
+El modelo TF-IDF se guarda en disco y solo se vuelve a ajustar si
+cambian las palabras clave o si el almacén creció TFIDF_REFIT_GROWTH
+veces desde el último ajuste. Los textos de un lote se convierten a una
+matriz dispersa CSR (arreglos indptr / indices / data de NumPy) y los
+puntajes de todos los temas salen de una sola pasada sobre ella.
+"""
+import os
+import re
+import math
+import hashlib
+import collections
+import numpy as np
+
+from topic_matcher import TopicMatcher, strip_accents
+
+BATCH_SIZE = int(os.getenv("ANALYZER_BATCH_SIZE", 2000))
+
+MIN_DF = int(os.getenv("TFIDF_MIN_DF", 2))
+MAX_DF = float(os.getenv("TFIDF_MAX_DF", 0.5))
+MAX_FEATURES = int(os.getenv("TFIDF_MAX_FEATURES", 50000))
+FIT_SAMPLE = int(os.getenv("TFIDF_FIT_SAMPLE", 20000))
+RECALL = float(os.getenv("TFIDF_RECALL", 0.9))
+REFIT_GROWTH = float(os.getenv("TFIDF_REFIT_GROWTH", 2))
+
+# Peso de las palabras clave frente al promedio de artículos en el centroide
+KEYWORD_WEIGHT = 0.5
+
+# Umbral mínimo de similitud para asignar un tema
+MIN_THRESHOLD = 0.05
+
+TOKEN_RE = re.compile(r"[^\W\d_]{3,}")
+
+# Minúsculas sin tildes con una sola pasada de str.translate
+ACCENT_TABLE = {
+    code: strip_accents(chr(code))
+    for code in range(0xC0, 0x250)
+    if len(strip_accents(chr(code))) == 1 and strip_accents(chr(code)) != chr(code)
+}
+
+def tokenize(text):
+    """Palabras de 3 o más letras, en minúsculas y sin tildes"""
+    return TOKEN_RE.findall(text.lower().translate(ACCENT_TABLE))
+
+class KeywordEngine:
+    """Palabras clave: puntaje 1.0 por tema encontrado"""
+
+    name = "keywords"
+
+    def __init__(self, topics, model_path=None):
+        self.matcher = TopicMatcher(topics)
+        self.topics = self.matcher.topics
+        # La misma firma de antes: los manifiestos existentes siguen valiendo
+        self.signature = self.matcher.signature
+
+    def prepare(self, corpus_size, load_corpus):
+        """No hay nada que ajustar"""
+
+    def score_batch(self, texts):
+        return [{topic: 1.0 for topic in self.matcher.match(text)} for text in texts]
+
+class TfidfModel:
+    """Vocabulario, IDF, centroides y umbrales por tema"""
+
+    def __init__(self, topics, vocabulary, idf, centroids, thresholds, n_docs, keywords_signature,
+                 store_size=None):
+        self.topics = list(topics)
+        self.vocabulary = list(vocabulary)
+        self.index = {term: i for i, term in enumerate(self.vocabulary)}
+        self.idf = np.asarray(idf, dtype=float)
+        self.centroids = np.asarray(centroids, dtype=float)       # temas × vocabulario
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.n_docs = int(n_docs)
+        self.keywords_signature = keywords_signature
+        # Artículos en el almacén al ajustar (n_docs no pasa de FIT_SAMPLE);
+        # no entra en la firma
+        self.store_size = int(store_size if store_size is not None else n_docs)
+
+        digest = hashlib.md5()
+        digest.update("\n".join(self.vocabulary).encode())
+        for array in (self.idf, self.centroids, self.thresholds):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.signature = f"tfidf-{digest.hexdigest()}"
+
+    def transform(self, texts):
+        """
+        Matriz CSR (indptr, indices, data) con filas TF-IDF de norma 1.
+        tf sublineal: 1 + log(apariciones).
+        """
+        lookup = self.index.get
+        n_terms = len(self.vocabulary)
+        ids, lengths = [], []
+        for text in texts:
+            row = [i for i in map(lookup, tokenize(text or "")) if i is not None]
+            ids.extend(row)
+            lengths.append(len(row))
+
+        docs = np.repeat(np.arange(len(texts)), lengths)
+        keys, counts = np.unique(docs * n_terms + np.asarray(ids, dtype=np.int64), return_counts=True)
+        rows, indices = keys // n_terms, keys % n_terms
+        indptr = np.searchsorted(rows, np.arange(len(texts) + 1))
+
+        data = (1 + np.log(counts)) * self.idf[indices]
+        norms = np.sqrt(row_sums(data * data, indptr))
+        data /= np.repeat(np.where(norms > 0, norms, 1), np.diff(indptr))
+        return indptr, indices, data
+
+    def scores(self, texts):
+        """Similitud coseno (artículos × temas) con cada centroide"""
+        indptr, indices, data = self.transform(texts)
+        return row_sums(data[:, None] * self.centroids.T[indices], indptr)
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, topics=np.array(self.topics), vocabulary=np.array(self.vocabulary),
+                     idf=self.idf, centroids=self.centroids, thresholds=self.thresholds,
+                     n_docs=self.n_docs, keywords_signature=self.keywords_signature,
+                     store_size=self.store_size)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["topics"].tolist(), data["vocabulary"].tolist(), data["idf"],
+                       data["centroids"], data["thresholds"], data["n_docs"],
+                       str(data["keywords_signature"]),
+                       data["store_size"] if "store_size" in data.files else None)
+
+def row_sums(values, indptr):
+    """Suma por fila de una matriz CSR (values alineado con indices)"""
+    totals = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    return totals[indptr[1:]] - totals[indptr[:-1]]
+
+def normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def fit_model(matcher, texts, store_size=None):
+    """Ajusta vocabulario, IDF, centroides y umbrales sobre un corpus"""
+    texts = list(texts)
+    n = len(texts)
+
+    keyword_terms = {topic: set() for topic in matcher.topics}
+    for keyword, keyword_topics in matcher.keywords.items():
+        for topic in keyword_topics:
+            keyword_terms[topic].update(tokenize(keyword))
+
+    df = collections.Counter()
+    for text in texts:
+        df.update(set(tokenize(text or "")))
+
+    # Términos frecuentes pero no omnipresentes, más todas las palabras clave
+    max_df = max(MIN_DF, MAX_DF * n)
+    candidates = [t for t, c in df.items() if MIN_DF <= c <= max_df]
+    candidates.sort(key=lambda t: (-df[t], t))
+    forced = set().union(*keyword_terms.values())
+    vocabulary = sorted(set(candidates[:MAX_FEATURES]) | forced)
+
+    idf = np.array([math.log((1 + n) / (1 + df[t])) + 1 for t in vocabulary])
+    base = TfidfModel(matcher.topics, vocabulary, idf, np.zeros((len(matcher.topics), len(vocabulary))),
+                      np.full(len(matcher.topics), MIN_THRESHOLD), n, matcher.signature)
+
+    # Artículos semilla de cada tema según las palabras clave
+    seeds = {topic: [] for topic in matcher.topics}
+    for i, text in enumerate(texts):
+        for topic in matcher.match(text or ""):
+            seeds[topic].append(i)
+
+    indptr, indices, data = base.transform(texts)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+
+    # Promedio de todo el corpus: se resta del de cada tema (Rocchio) para
+    # quitar el vocabulario común a todas las noticias
+    background = normalize(np.bincount(indices, weights=data, minlength=len(vocabulary)))
+
+    centroids = base.centroids
+    for j, topic in enumerate(matcher.topics):
+        keyword_vector = np.zeros(len(vocabulary))
+        for term in keyword_terms[topic]:
+            keyword_vector[base.index[term]] = idf[base.index[term]]
+        keyword_vector = normalize(keyword_vector)
+
+        if seeds[topic]:
+            mask = np.isin(rows, seeds[topic])
+            mean = normalize(np.bincount(indices[mask], weights=data[mask], minlength=len(vocabulary)))
+            mean = normalize(np.clip(mean - background, 0, None))
+            centroids[j] = normalize((1 - KEYWORD_WEIGHT) * mean + KEYWORD_WEIGHT * keyword_vector)
+        else:
+            centroids[j] = keyword_vector
+
+    # Umbral: acepta RECALL de las semillas de cada tema puntuadas sin sus
+    # palabras clave, es decir, como puntuaría un artículo del tema que no
+    # las usa
+    thresholds = base.thresholds
+    keyword_columns = np.array(sorted(base.index[t] for t in forced), dtype=int)
+    masked = np.where(np.isin(indices, keyword_columns), 0.0, data)
+    norms = np.sqrt(row_sums(masked * masked, indptr))
+    masked /= np.repeat(np.where(norms > 0, norms, 1), np.diff(indptr))
+    scores = row_sums(masked[:, None] * centroids.T[indices], indptr)
+    for j, topic in enumerate(matcher.topics):
+        if seeds[topic]:
+            thresholds[j] = max(MIN_THRESHOLD, np.quantile(scores[seeds[topic], j], 1 - RECALL))
+
+    return TfidfModel(matcher.topics, vocabulary, idf, centroids, thresholds, n, matcher.signature, store_size)
+
+class TfidfEngine:
+    """Similitud TF-IDF contra centroides de temas"""
+
+    name = "tfidf"
+
+    def __init__(self, topics, model_path):
+        self.matcher = TopicMatcher(topics)
+        self.topics = self.matcher.topics
+        self.model_path = model_path
+        self.model = None
+
+        try:
+            model = TfidfModel.load(model_path) if model_path else None
+            if model and model.keywords_signature == self.matcher.signature and model.topics == self.topics:
+                self.model = model
+        except (OSError, KeyError, ValueError):
+            pass
+
+    @property
+    def signature(self):
+        return self.model.signature if self.model else None
+
+    def prepare(self, corpus_size, load_corpus):
+        """Ajusta el modelo si no hay uno válido o si el almacén creció bastante"""
+        if self.model is not None and corpus_size < REFIT_GROWTH * max(1, self.model.store_size):
+            return
+
+        reason = "sin modelo guardado" if self.model is None else \
+            f"el almacén creció de {self.model.store_size} a {corpus_size} artículos"
+        print(f"🧠 Ajustando modelo TF-IDF ({reason})...")
+        self.model = fit_model(self.matcher, load_corpus(FIT_SAMPLE), corpus_size)
+        self.model.save(self.model_path)
+        print(f"   - {len(self.model.vocabulary)} términos, {self.model.n_docs} artículos, "
+              f"umbrales: {dict(zip(self.topics, self.model.thresholds.round(3).tolist()))}")
+
+    def score_batch(self, texts):
+        scores = self.model.scores(texts)
+        assigned = scores >= self.model.thresholds
+        return [
+            {topic: round(float(scores[i, j]), 4) for j, topic in enumerate(self.topics) if assigned[i, j]}
+            for i in range(len(texts))
+        ]
+
+ENGINES = {
+    KeywordEngine.name: KeywordEngine,
+    TfidfEngine.name: TfidfEngine,
+}
+
+def get_engine(topics, model_path, name=None):
+    """Motor configurado en ANALYZER_ENGINE"""
+    name = name or os.getenv("ANALYZER_ENGINE", KeywordEngine.name)
+    try:
+        return ENGINES[name](topics, model_path)
+    except KeyError:
+        raise ValueError(f"Motor de clasificación desconocido: {name} (opciones: {', '.join(ENGINES)})")
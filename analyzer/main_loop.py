@@ -1,16 +1,34 @@
 import os
+import sys
 import json
-import glob
-import time
+import zlib
+import heapq
 import collections
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from classifiers import get_engine, BATCH_SIZE
+from common.article_store import ArticleStore
+from common import events
+from common import metrics
 
-CLEAN_DIR = "/app/data/clean"
+CLEAN_STORE_DIR = "/app/data/store/clean"
 OUT_DIR = "/app/data/analysis"
+MANIFEST_FILE = os.path.join(OUT_DIR, "manifest.json")
+COUNTS_FILE = os.path.join(OUT_DIR, "daily_counts.json")
+SCORES_FILE = os.path.join(OUT_DIR, "daily_scores.json")
+CLASSIFIER_FILE = os.path.join(OUT_DIR, "classifier.json")
+MODEL_FILE = os.path.join(OUT_DIR, "tfidf_model.npz")
+
+# Conteos agregados por semana (clave: lunes de la semana) y por mes (YYYY-MM)
+ROLLUP_FILES = {
+    "week": os.path.join(OUT_DIR, "weekly_counts.json"),
+    "month": os.path.join(OUT_DIR, "monthly_counts.json"),
+}
 
 os.makedirs(OUT_DIR, exist_ok=True)
 
+clean_store = ArticleStore(CLEAN_STORE_DIR)
+
 # Palabras clave por categoría 
 topics = {
     "economia": ["economía", "económico", "colcap", "bvc", "inflación", "dólar", "tasas"],
@@ -19,57 +37,258 @@ topics = {
     "salud": ["salud", "hospital", "covid", "enfermedad", "clínica", "medicina"],
 }
 
-def analyze_news():
-    """Analiza noticias y cuenta por categoría"""
-    print(f"[{datetime.now()}] Iniciando análisis de noticias...")
-    
-    daily_counts = {}
-    total_analyzed = 0
+# Motor de clasificación (ANALYZER_ENGINE): palabras clave o TF-IDF
+ENGINE = get_engine(topics, MODEL_FILE)
 
-    # Buscar todos los archivos JSON en clean
-    clean_files = glob.glob(os.path.join(CLEAN_DIR, "*.json"))
-    
-    print(f"📄 Archivos a analizar: {len(clean_files)}")
+# Métricas en /metrics (METRICS_PORT)
+cycle = metrics.track_cycle("analyzer")
+CLASSIFY_SECONDS = metrics.Histogram("analyzer_classify_batch_seconds",
+                                     "Duración de la clasificación de cada lote", ["engine"])
+
+def article_text(doc):
+    return doc.get("title", "") + " " + doc.get("text", "")
+
+def article_day(doc):
+    """Día de publicación de un artículo (YYYY-MM-DD)"""
+    date = doc.get("publish_date")
+    if not date:
+        date = datetime.utcnow().isoformat()
+
+    return date.split("T")[0]
+
+def load_corpus(limit):
+    """
+    Textos de una muestra de `limit` artículos para ajustar el motor: los
+    de menor crc32 de la clave. La muestra solo cambia por los artículos
+    nuevos que caen en ella, no se desplaza entera como las más recientes.
+    """
+    keys = heapq.nsmallest(limit, clean_store.keys(), key=lambda k: zlib.crc32(k.encode()))
+    docs = (clean_store.get(key) or {} for key in keys)
+    return [article_text(doc) for doc in docs if not doc.get("duplicate_of")]
+
+def load_state():
+    """
+    Carga el manifiesto de archivos ya contados, los conteos diarios y los
+    puntajes diarios. Si falta el manifiesto o los conteos, o si el
+    manifiesto se generó con otro clasificador, devuelve None para forzar
+    una reconstrucción.
+    """
+    if not os.path.exists(MANIFEST_FILE) or not os.path.exists(COUNTS_FILE):
+        return None, None, None
+
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        with open(COUNTS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"  ⚠️ Estado incremental ilegible, se reconstruye: {e}")
+        return None, None, None
 
-    for path in clean_files:
+    if manifest.get("classifier") != ENGINE.signature:
+        print("🔁 El clasificador cambió desde el último ciclo")
+        return None, None, None
+
+    daily_counts = {day: collections.Counter(counts) for day, counts in data.items()}
+
+    try:
+        with open(SCORES_FILE, "r", encoding="utf-8") as f:
+            daily_scores = {day: collections.Counter(scores) for day, scores in json.load(f).items()}
+    except (FileNotFoundError, ValueError):
+        # Manifiesto anterior a los puntajes: se derivan de lo ya clasificado
+        daily_scores = collections.defaultdict(collections.Counter)
+        for entry in manifest["files"].values():
+            daily_scores[entry["day"]].update(entry_scores(entry))
+        daily_scores = dict(daily_scores)
+
+    return manifest["files"], daily_counts, daily_scores
+
+def entry_scores(entry):
+    """Puntajes de una entrada del manifiesto (1.0 por tema si no los tiene)"""
+    return entry.get("scores") or {topic: 1.0 for topic in entry["topics"]}
+
+def save_json_atomic(path, data):
+    """Escribe un JSON en un archivo temporal y lo renombra al destino"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def period_of(day, resolution):
+    """Clave del período (semana o mes) al que pertenece un día YYYY-MM-DD"""
+    if resolution == "month":
+        return day[:7]
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+def rollup(daily_counts, resolution):
+    """Suma los conteos diarios por período"""
+    totals = collections.defaultdict(collections.Counter)
+    for day, counter in daily_counts.items():
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                doc = json.load(f)
+            totals[period_of(day, resolution)].update(counter)
+        except ValueError:
+            continue
+    return {period: dict(totals[period]) for period in sorted(totals)}
+
+@cycle
+def analyze_news(full_rebuild=False):
+    """
+    Analiza noticias y cuenta por categoría.
+
+    En modo incremental solo lee los artículos nuevos o reescritos desde
+    el último ciclo (según el manifiesto) y actualiza los conteos en sitio.
+    Con full_rebuild=True descarta el estado y relee todo el almacén.
+    """
+    print(f"[{datetime.now()}] Iniciando análisis de noticias...")
 
-            text = (doc.get("title", "") + " " + doc.get("text", "")).lower()
+    # Ajustar el motor si hace falta (TF-IDF), antes de comparar su firma
+    clean_store.refresh()
+    ENGINE.prepare(len(clean_store), load_corpus)
 
-            # Fecha de la noticia
-            date = doc.get("publish_date")
-            if not date:
-                date = datetime.utcnow().isoformat()
+    manifest, daily_counts, daily_scores = (None, None, None) if full_rebuild else load_state()
 
-            day = date.split("T")[0]
+    if manifest is None:
+        print("🔁 Reconstrucción completa de conteos")
+        manifest = {}
+        daily_counts = {}
+        daily_scores = {}
+
+    # Artículos por día, para saber cuándo un día queda vacío
+    day_files = collections.Counter(entry["day"] for entry in manifest.values())
+
+    def discount(entry):
+        day = entry["day"]
+        counter = daily_counts.get(day, collections.Counter())
+        for topic in entry["topics"]:
+            counter[topic] -= 1
+            if counter[topic] <= 0:
+                del counter[topic]
+        scores = daily_scores.get(day, collections.Counter())
+        for topic, score in entry_scores(entry).items():
+            scores[topic] -= score
+            if scores[topic] <= 1e-9:
+                del scores[topic]
+        day_files[day] -= 1
+        if day_files[day] <= 0:
+            daily_counts.pop(day, None)
+            daily_scores.pop(day, None)
+            del day_files[day]
+
+    total_analyzed = 0
+    seen = set()
+    pending = []
+
+    def classify_pending():
+        """Clasifica el lote pendiente de una vez y actualiza los conteos"""
+        nonlocal total_analyzed
+        try:
+            # Los casi duplicados (ver processor/near_duplicates.py) ya
+            # cuentan en el primer artículo de su grupo
+            originals = [doc for _, _, doc in pending if not doc.get("duplicate_of")]
+            with CLASSIFY_SECONDS.time(engine=ENGINE.name):
+                results = iter(ENGINE.score_batch([article_text(doc) for doc in originals]))
+        except Exception as e:
+            # Sin entrada en el manifiesto: se reintentan en el próximo ciclo
+            print(f"  ⚠️ Error clasificando un lote de {len(pending)} artículos: {e}")
+            pending.clear()
+            return
+
+        for key, loc, doc in pending:
+            scores = {} if doc.get("duplicate_of") else next(results)
+            day = article_day(doc)
+            hits = [topic for topic in ENGINE.topics if topic in scores]
+
+            # Si el archivo cambió, retirar su aporte anterior
+            entry = manifest.get(key)
+            if entry:
+                discount(entry)
 
             if day not in daily_counts:
                 daily_counts[day] = collections.Counter()
+            if day not in daily_scores:
+                daily_scores[day] = collections.Counter()
+
+            # Contar por cada tema y sumar su puntaje
+            for topic in hits:
+                daily_counts[day][topic] += 1
+            daily_scores[day].update(scores)
+            day_files[day] += 1
+
+            manifest[key] = {
+                "loc": loc,
+                "day": day,
+                "topics": hits,
+                "scores": scores
+            }
 
-            # Contar por cada tema
-            for topic, words in topics.items():
-                if any(word in text for word in words):
-                    daily_counts[day][topic] += 1
-            
             total_analyzed += 1
-            
+
+        cycle.count("classified", len(pending))
+        pending.clear()
+
+    print(f"📄 Artículos en clean: {len(clean_store)}")
+
+    # Índice de artículos limpios (sin listar directorios)
+    for key, loc in list(clean_store.index.items()):
+        seen.add(key)
+        loc = list(loc)
+
+        try:
+            entry = manifest.get(key)
+
+            # Saltar si no cambió desde el último conteo
+            if entry and entry.get("loc") == loc:
+                continue
+
+            doc = clean_store.get(key)
+            pending.append((key, loc, doc))
+
         except Exception as e:
-            print(f"  ⚠️ Error procesando {path}: {e}")
+            print(f"  ⚠️ Error procesando {key}: {e}")
+
+        # Clasificar por lotes
+        if len(pending) >= BATCH_SIZE:
+            classify_pending()
+
+    if pending:
+        classify_pending()
+
+    # Retirar artículos eliminados de clean (p. ej. por cleanup_old_files)
+    removed = [key for key in manifest if key not in seen]
+    for key in removed:
+        discount(manifest.pop(key))
 
     # Convertir Counter a dict normal para JSON
     daily_counts_serializable = {}
     for day, counter in daily_counts.items():
         daily_counts_serializable[day] = dict(counter)
 
+    # Agregados para el dashboard; se escriben antes que los diarios para
+    # que un cambio en daily_counts.json ya los encuentre al día
+    for resolution, path in ROLLUP_FILES.items():
+        save_json_atomic(path, rollup(daily_counts, resolution))
+
+    # Puntajes por tema y día para el correlador, con el motor que los produjo
+    save_json_atomic(SCORES_FILE, {
+        day: {topic: round(score, 4) for topic, score in scores.items()}
+        for day, scores in daily_scores.items()
+    })
+    save_json_atomic(CLASSIFIER_FILE, {"engine": ENGINE.name, "signature": ENGINE.signature})
+
     # Guardar resultado
-    output_file = os.path.join(OUT_DIR, "daily_counts.json")
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(daily_counts_serializable, f, ensure_ascii=False, indent=2)
+    output_file = COUNTS_FILE
+    save_json_atomic(output_file, daily_counts_serializable)
+    save_json_atomic(MANIFEST_FILE, {"classifier": ENGINE.signature, "files": manifest})
+
+    # Despertar al correlador si los conteos cambiaron
+    if total_analyzed or removed:
+        events.publish("analysis")
 
     print(f"✅ Análisis completado:")
-    print(f"   - Archivos analizados: {total_analyzed}")
+    print(f"   - Artículos analizados: {total_analyzed} nuevos o modificados")
+    print(f"   - Artículos retirados: {len(removed)}")
     print(f"   - Días con datos: {len(daily_counts)}")
     print(f"   - Archivo generado: {output_file}")
     
@@ -85,13 +304,22 @@ def analyze_news():
 def main():
     """Loop principal del analizador"""
     interval = int(os.getenv("SLEEP_INTERVAL", 1800))
+
+    # Reconstrucción completa bajo demanda: --full o ANALYZER_FULL_REBUILD=1
+    full_rebuild = "--full" in sys.argv or os.getenv("ANALYZER_FULL_REBUILD", "0") == "1"
     
     print("🚀 Iniciando analizador de noticias...")
     print(f"⏱️  Intervalo: {interval} segundos ({interval/60:.1f} minutos)\n")
     
+    # Nuevos artículos limpios despiertan al analizador antes del intervalo
+    clean_events = events.Subscription("clean")
+    
+    metrics.serve()
+    
     while True:
         try:
-            days_analyzed = analyze_news()
+            days_analyzed = analyze_news(full_rebuild=full_rebuild)
+            full_rebuild = False
             
             if days_analyzed == 0:
                 print("⚠️  No hay datos para analizar aún")
@@ -101,8 +329,8 @@ def main():
             import traceback
             traceback.print_exc()
         
-        print(f"\n💤 Esperando {interval} segundos...\n")
-        time.sleep(interval)
+        print(f"\n💤 Esperando nuevos artículos (máx. {interval} segundos)...\n")
+        clean_events.wait(interval)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
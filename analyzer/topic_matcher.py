@@ -0,0 +1,207 @@
+"""
+Motor de clasificación por palabras clave.
+
+Compila una sola vez el diccionario de temas y normaliza cada texto una
+única vez, en lugar de buscar cada palabra clave con y sin tildes.
+
+- La normalización es una sola pasada en C: el texto se codifica a
+  latin-1 y bytes.translate aplica una tabla de 256 entradas
+  ("Política" -> b"politica"). Los pocos caracteres fuera de latin-1
+  (comillas tipográficas, rayas) los resuelve un manejador de errores
+  del codec. Las palabras clave se normalizan igual al construir.
+- Con límites de palabra, la tabla además convierte todo separador en
+  espacio: bytes.split() da los tokens y basta cruzarlos con el conjunto
+  de palabras clave, así que el costo no crece con su número. Las frases
+  se confirman con su patrón solo si aparece su primera palabra.
+- Sin límites de palabra se conserva la semántica de subcadena del
+  bucle original (una búsqueda `in` por palabra clave).
+"""
+import re
+import codecs
+import hashlib
+import collections
+import unicodedata
+
+TOKEN_RE = re.compile(r"\w+")
+
+def strip_accents(text):
+    """Quita tildes y diéresis de un texto ("política" -> "politica")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+def _fold_char(ch):
+    """
+    Forma ASCII de un carácter: el ASCII solo pasa a minúsculas; fuera de
+    ASCII, la letra base en minúscula si la tiene, "_" para el resto de
+    las letras y dígitos (siguen siendo parte de una palabra) y "\\x00"
+    para lo demás (separa palabras y no aparece en ninguna palabra clave).
+    """
+    if ch.isascii():
+        return ch.lower()
+    base = strip_accents(ch.lower())
+    if len(base) == 1 and base.isascii() and base.isalnum():
+        return base
+    return "_" if ch.isalnum() else "\x00"
+
+FOLD_TABLE = bytes(ord(_fold_char(chr(code))) for code in range(256))
+
+# Igual, pero cualquier byte que no sea de palabra (\w) pasa a espacio
+WORD_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyz0123456789_")
+WORDS_TABLE = bytes(code if code in WORD_BYTES else ord(" ") for code in FOLD_TABLE)
+
+_folded = {}
+
+def _fold_errors(error):
+    """Manejador del codec para los caracteres fuera de latin-1"""
+    out = []
+    for ch in error.object[error.start:error.end]:
+        folded = _folded.get(ch)
+        if folded is None:
+            folded = _folded[ch] = _fold_char(ch)
+        out.append(folded)
+    return "".join(out), error.end
+
+codecs.register_error("topic_fold", _fold_errors)
+
+def fold_text(text):
+    """Texto en minúsculas, sin tildes y en ASCII (bytes)"""
+    return text.encode("latin-1", "topic_fold").translate(FOLD_TABLE)
+
+def fold_words(text):
+    """Como fold_text, con las palabras separadas solo por espacios"""
+    return text.encode("latin-1", "topic_fold").translate(WORDS_TABLE)
+
+class TopicMatcher:
+    """Clasificador de textos por temas a partir de listas de palabras clave"""
+
+    def __init__(self, topics, word_boundaries=True, accent_insensitive=True):
+        self.topics = list(topics)
+        self.word_boundaries = word_boundaries
+        self.accent_insensitive = accent_insensitive
+
+        # Forma canónica de cada palabra clave -> temas que la contienen
+        self.keywords = collections.defaultdict(set)
+        for topic, words in topics.items():
+            for word in words:
+                self.keywords[self._canonical(word)].add(topic)
+
+        # Firma estable de la configuración, para invalidar estados guardados
+        spec = repr((sorted((k, sorted(v)) for k, v in self.keywords.items()),
+                     word_boundaries, accent_insensitive))
+        self.signature = hashlib.md5(spec.encode()).hexdigest()
+
+        self._build()
+
+    def _canonical(self, word):
+        word = word.lower().strip()
+        return strip_accents(word) if self.accent_insensitive else word
+
+    def _normalize(self, text):
+        """El texto en la misma forma que las palabras clave"""
+        if not self.accent_insensitive:
+            return text.lower()
+        return fold_words(text) if self.word_boundaries else fold_text(text)
+
+    def _build(self):
+        """
+        Por palabra clave, el patrón que confirma la coincidencia y cuenta
+        las apariciones. Con límites de palabra, un índice primera palabra
+        -> (patrón, palabra clave); el patrón es None si la palabra clave
+        es un solo token, porque entonces el token ya la confirma.
+        """
+        self._patterns = {}
+        self._substrings = []
+        self._token_index = collections.defaultdict(list)
+        # Palabras clave con signos ("c++"): su patrón corre sobre el texto
+        # con los signos (fold_text); sin ningún token, siempre se verifican
+        self._symbolic = []
+
+        for keyword in self.keywords:
+            norm = (fold_text(keyword).decode("ascii") if self.accent_insensitive else keyword).strip()
+
+            if not self.word_boundaries:
+                pattern = re.escape(norm)
+            else:
+                # En frases, cualquier separador entre palabras
+                pattern = r"(?<!\w){}(?!\w)".format(r"\W+".join(map(re.escape, norm.split())))
+            if self.accent_insensitive:
+                pattern = pattern.encode("ascii")
+            pattern = re.compile(pattern)
+            self._patterns[keyword] = pattern
+
+            if not self.word_boundaries:
+                self._substrings.append((norm.encode("ascii") if self.accent_insensitive else norm, keyword))
+                continue
+
+            tokens = TOKEN_RE.findall(norm)
+            head = tokens[0] if tokens else None
+            if head is not None and self.accent_insensitive:
+                head = head.encode("ascii")
+            if self.accent_insensitive and " ".join(tokens) != " ".join(norm.split()):
+                self._symbolic.append((head, pattern, keyword))
+            elif tokens == [norm]:
+                self._token_index[head].append((None, keyword))
+            else:
+                self._token_index[head].append((pattern, keyword))
+
+        self._token_set = frozenset(self._token_index)
+
+    def _tokens(self, norm):
+        if isinstance(norm, bytes):
+            return norm.split()
+        return TOKEN_RE.findall(norm)
+
+    def _found(self, text):
+        """(palabra clave, patrón, texto normalizado) de las presentes"""
+        norm = self._normalize(text)
+        if not self.word_boundaries:
+            return [(keyword, self._patterns[keyword], norm)
+                    for substring, keyword in self._substrings if substring in norm]
+
+        found = []
+        tokens = self._tokens(norm)
+        for head in self._token_set.intersection(tokens):
+            for pattern, keyword in self._token_index[head]:
+                if pattern is None or pattern.search(norm):
+                    found.append((keyword, self._patterns[keyword], norm))
+
+        if self._symbolic:
+            tokens = set(tokens)
+            folded = None
+            for head, pattern, keyword in self._symbolic:
+                if head is None or head in tokens:
+                    folded = fold_text(text) if folded is None else folded
+                    if pattern.search(folded):
+                        found.append((keyword, pattern, folded))
+        return found
+
+    def find_keywords(self, text):
+        """Itera sobre las palabras clave (forma canónica) halladas en el texto"""
+        if not text:
+            return
+        for keyword, pattern, norm in self._found(text):
+            for _ in pattern.finditer(norm):
+                yield keyword
+
+    def match(self, text):
+        """Lista de temas presentes en el texto, en el orden del diccionario"""
+        if not text:
+            return []
+
+        hit_topics = set()
+        for keyword, _, _ in self._found(text):
+            hit_topics |= self.keywords[keyword]
+
+        return [topic for topic in self.topics if topic in hit_topics]
+
+    def count(self, text):
+        """Número de apariciones de palabras clave por tema"""
+        counts = collections.Counter()
+        for keyword in self.find_keywords(text):
+            for topic in self.keywords[keyword]:
+                counts[topic] += 1
+        return counts
+
+    def keyword_counts(self, text):
+        """Número de apariciones de cada palabra clave (forma canónica)"""
+        return collections.Counter(self.find_keywords(text))
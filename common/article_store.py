@@ -0,0 +1,274 @@
+"""
+Almacén de artículos en segmentos JSONL de solo anexado.
+
+Reemplaza el esquema de un archivo JSON por artículo. Cada almacén (raw,
+clean) es un directorio con:
+
+    index.jsonl                 índice por clave (rss_<md5>, cc_<md5>)
+    2025-12-17.0000.jsonl       segmentos de la partición de un día
+    2025-12-17.0001.jsonl       ...se abre uno nuevo al superar SEGMENT_BYTES
+
+La partición es el día en que se escribe el registro, de modo que la
+retención por días equivale a la limpieza por fecha de modificación que
+se hacía con los archivos sueltos.
+
+Los segmentos de un día se leen abriendo 0000, 0001, ... hasta el primero
+que no exista, sin listar directorios. Reescribir una clave agrega una
+versión nueva y el índice apunta siempre a la última. Varios procesos
+pueden escribir a la vez: las escrituras se serializan con flock.
+"""
+import os
+import json
+import fcntl
+from datetime import datetime
+from contextlib import contextmanager
+
+SEGMENT_BYTES = int(os.getenv("STORE_SEGMENT_BYTES", 16 * 1024 * 1024))
+
+def today():
+    """Partición del día actual (YYYY-MM-DD)"""
+    return datetime.now().strftime("%Y-%m-%d")
+
+class ArticleStore:
+    """Almacén particionado por día con índice en memoria por clave"""
+
+    def __init__(self, root, segment_bytes=SEGMENT_BYTES):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.index_path = os.path.join(root, "index.jsonl")
+        self.lock_path = os.path.join(root, ".lock")
+
+        os.makedirs(root, exist_ok=True)
+
+        # clave -> (día, segmento, offset, longitud)
+        self.index = {}
+        self._last_segment = {}
+        self._index_pos = 0
+        self._index_ino = None
+
+        self.refresh()
+
+    def segment_path(self, day, seg):
+        return os.path.join(self.root, f"{day}.{seg:04d}.jsonl")
+
+    @contextmanager
+    def _locked(self):
+        """Bloqueo exclusivo entre procesos para escribir o compactar"""
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """
+        Lee las entradas de índice agregadas desde la última lectura.
+        Si el índice fue compactado (cambió de inodo) se recarga completo.
+        """
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            self.index.clear()
+            self._last_segment.clear()
+            self._index_pos = 0
+            self._index_ino = None
+            return
+
+        if st.st_ino != self._index_ino or st.st_size < self._index_pos:
+            self.index.clear()
+            self._last_segment.clear()
+            self._index_pos = 0
+            self._index_ino = st.st_ino
+
+        if st.st_size == self._index_pos:
+            return
+
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                # Una línea sin salto final es una escritura a medias
+                if not line.endswith(b"\n"):
+                    break
+                self._index_pos += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        day, seg = entry["d"], entry["s"]
+        self.index[entry["k"]] = (day, seg, entry["o"], entry["n"])
+        if seg > self._last_segment.get(day, -1):
+            self._last_segment[day] = seg
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def days(self):
+        """Días con al menos un registro, ordenados"""
+        return sorted({loc[0] for loc in self.index.values()})
+
+    def location(self, key):
+        return self.index.get(key)
+
+    def get(self, key):
+        """Devuelve el registro de una clave, o None si no existe"""
+        loc = self.index.get(key)
+        if loc is None:
+            return None
+
+        day, seg, offset, length = loc
+        with open(self.segment_path(day, seg), "rb") as f:
+            f.seek(offset)
+            line = f.read(length)
+
+        return json.loads(line)["data"]
+
+    def iter_day(self, day):
+        """
+        Recorre en streaming los registros vigentes de un día.
+        Omite versiones reemplazadas y líneas sin entrada en el índice.
+        """
+        seg = 0
+        while True:
+            try:
+                f = open(self.segment_path(day, seg), "rb")
+            except FileNotFoundError:
+                return
+
+            with f:
+                offset = 0
+                for line in f:
+                    start, offset = offset, offset + len(line)
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue
+                    loc = self.index.get(item["key"])
+                    if loc and loc[1] == seg and loc[2] == start and loc[0] == day:
+                        yield item["key"], item["data"]
+            seg += 1
+
+    def append(self, key, record, day):
+        """Agrega un registro a la partición `day`"""
+        self.append_many([(key, record, day)])
+
+    def append_many(self, items):
+        """
+        Agrega varios registros (clave, registro, día) con un solo bloqueo.
+        Devuelve el número de registros escritos.
+        """
+        if not items:
+            return 0
+
+        by_day = {}
+        for key, record, day in items:
+            by_day.setdefault(day, []).append((key, record))
+
+        with self._locked():
+            # Ver lo que otros procesos escribieron antes de elegir segmento
+            self.refresh()
+
+            entries = []
+            for day, day_items in by_day.items():
+                entries.extend(self._write_segment(day, day_items))
+
+            data = b"".join(
+                json.dumps(e, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                for e in entries
+            )
+            with open(self.index_path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+
+            self.refresh()
+
+        return len(entries)
+
+    def _write_segment(self, day, day_items):
+        """Escribe los registros de un día y devuelve sus entradas de índice"""
+        seg = self._last_segment.get(day, 0)
+        path = self.segment_path(day, seg)
+
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+
+        if size >= self.segment_bytes:
+            seg += 1
+            path = self.segment_path(day, seg)
+            size = 0
+
+        entries = []
+        with open(path, "a+b") as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+
+            # Cerrar una línea que haya quedado a medias tras una caída
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    offset += 1
+
+            chunks = []
+            for key, record in day_items:
+                line = json.dumps({"key": key, "data": record}, ensure_ascii=False,
+                                  separators=(",", ":")).encode("utf-8") + b"\n"
+                chunks.append(line)
+                entries.append({"k": key, "d": day, "s": seg, "o": offset, "n": len(line)})
+                offset += len(line)
+
+            f.write(b"".join(chunks))
+
+        return entries
+
+    def drop_days_before(self, cutoff_day):
+        """
+        Elimina las particiones anteriores a `cutoff_day` (YYYY-MM-DD) y
+        compacta el índice. Devuelve el número de registros eliminados.
+        """
+        with self._locked():
+            self.refresh()
+
+            old_days = {day for day in self._last_segment if day < cutoff_day}
+            if not old_days:
+                return 0
+
+            kept = {k: loc for k, loc in self.index.items() if loc[0] not in old_days}
+            removed = len(self.index) - len(kept)
+
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, (day, seg, offset, length) in kept.items():
+                    f.write(json.dumps({"k": key, "d": day, "s": seg, "o": offset, "n": length},
+                                       ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, self.index_path)
+
+            for day in old_days:
+                seg = 0
+                while True:
+                    try:
+                        os.remove(self.segment_path(day, seg))
+                    except FileNotFoundError:
+                        break
+                    seg += 1
+
+            self.refresh()
+
+        return removed
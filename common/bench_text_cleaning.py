@@ -0,0 +1,78 @@
+"""
+Benchmark de limpieza de texto.
+
+Compara la versión anterior de clean_html / extracción de párrafos
+(varios re.sub sin compilar) con common.text_cleaning, sobre cuerpos
+HTML sintéticos de varios KB como los de los registros WARC, y verifica
+que ambas produzcan exactamente la misma salida.
+
+Uso: python -m common.bench_text_cleaning [n_documentos] [kb_por_documento]
+"""
+import re
+import sys
+import time
+import random
+from html import unescape
+
+from common.text_cleaning import clean_many, extract_paragraphs
+
+def legacy_clean_html(text):
+    """clean_html original del procesador"""
+    if not text:
+        return ""
+    text = unescape(text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.replace('\xa0', ' ')
+    text = text.replace('\u200b', '')
+    return text.strip()
+
+def legacy_paragraphs(html):
+    """Extracción de párrafos original de CommonCrawlFetcher"""
+    paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', html, re.I | re.S)
+    return ' '.join([unescape(re.sub(r'<[^>]+>', '', p)) for p in paragraphs])
+
+def synthetic_page(rng, kb):
+    """Página con navegación, párrafos, enlaces, entidades y espacios raros"""
+    words = ("el gobierno anunció que la economía del país crecerá este año "
+             "según el ministro de hacienda y el banco de la república").split()
+    chunks = ['<html><head><title>Noticia &amp; análisis</title></head><body>',
+              '<nav><ul><li><a href="/">Inicio</a></li><li><a href="/eco">Economía</a></li></ul></nav>']
+    size = 0
+    while size < kb * 1024:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+        para = (f'<p class="txt">{sentence} <a href="/x">enlace</a> &quot;cita&quot;'
+                f'&nbsp;\u200b <strong>dato</strong>\n\t {sentence}.</p>\n')
+        chunks.append(para)
+        size += len(para)
+    chunks.append('<footer><p>© 2025 &copy; Todos los derechos</p></footer></body></html>')
+    return "".join(chunks)
+
+def timed(fn, docs):
+    start = time.perf_counter()
+    result = fn(docs)
+    return time.perf_counter() - start, result
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    kb = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    rng = random.Random(42)
+    docs = [synthetic_page(rng, kb) for _ in range(n)]
+
+    print(f"📊 {n} páginas de ~{kb} KB\n")
+
+    for label, legacy, current in [
+        ("clean_html", lambda d: [legacy_clean_html(x) for x in d], clean_many),
+        ("extract_paragraphs", lambda d: [legacy_paragraphs(x) for x in d],
+         lambda d: [extract_paragraphs(x) for x in d]),
+    ]:
+        t_legacy, out_legacy = timed(legacy, docs)
+        t_current, out_current = timed(current, docs)
+        same = "idéntica" if out_legacy == out_current else "DIFERENTE"
+        print(f"{label}:")
+        print(f"   - Original:  {t_legacy:.2f}s")
+        print(f"   - Compartido: {t_current:.2f}s ({t_legacy / t_current:.2f}x)")
+        print(f"   - Salida {same}\n")
+
+if __name__ == "__main__":
+    main()
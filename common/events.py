@@ -0,0 +1,91 @@
+"""
+Notificaciones entre etapas del pipeline sobre el volumen compartido.
+
+Cada canal ("raw", "clean", "analysis") es un archivo en EVENTS_DIR. Una
+etapa publica agregando un byte al archivo y las etapas siguientes
+esperan observando su tamaño con stat(), lo que funciona también en un
+PVC compartido entre nodos, donde inotify no ve escrituras remotas.
+
+El intervalo SLEEP_INTERVAL de cada servicio queda como respaldo: si no
+llega ningún evento, wait() vuelve al agotarse el tiempo igual que antes.
+"""
+import os
+import time
+
+EVENTS_DIR = "/app/data/events"
+
+# Desactivar con EVENT_DRIVEN=0 para volver al sondeo por intervalo
+EVENT_DRIVEN = os.getenv("EVENT_DRIVEN", "1") == "1"
+POLL_SECONDS = float(os.getenv("EVENT_POLL_SECONDS", 1))
+DEBOUNCE_SECONDS = float(os.getenv("EVENT_DEBOUNCE_SECONDS", 2))
+
+# Tamaño a partir del cual se trunca el archivo de un canal
+MAX_CHANNEL_BYTES = 4096
+
+def _channel_path(channel):
+    return os.path.join(EVENTS_DIR, channel)
+
+def _signature(channel):
+    """Identifica el estado actual de un canal (cambia en cada publicación)"""
+    try:
+        st = os.stat(_channel_path(channel))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def publish(channel):
+    """Avisa a las etapas siguientes que hay datos nuevos en `channel`"""
+    os.makedirs(EVENTS_DIR, exist_ok=True)
+    path = _channel_path(channel)
+
+    try:
+        if os.path.getsize(path) >= MAX_CHANNEL_BYTES:
+            # Reemplazar en lugar de truncar: el cambio de inodo también cuenta
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b".")
+            os.replace(tmp_path, path)
+            return
+    except FileNotFoundError:
+        pass
+
+    with open(path, "ab") as f:
+        f.write(b".")
+
+class Subscription:
+    """Espera publicaciones en uno o varios canales"""
+
+    def __init__(self, *channels):
+        self.channels = channels
+        self._seen = {channel: _signature(channel) for channel in channels}
+
+    def _changed(self):
+        changed = False
+        for channel in self.channels:
+            current = _signature(channel)
+            if current != self._seen[channel]:
+                self._seen[channel] = current
+                changed = True
+        return changed
+
+    def wait(self, timeout):
+        """
+        Bloquea hasta que haya una publicación o se cumpla `timeout`.
+        Devuelve True si despertó por un evento y False por tiempo.
+        """
+        if not EVENT_DRIVEN:
+            time.sleep(timeout)
+            return False
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._changed():
+                # Agrupar ráfagas (p. ej. un anexado por feed) en un solo ciclo
+                time.sleep(DEBOUNCE_SECONDS)
+                self._changed()
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(POLL_SECONDS, remaining))
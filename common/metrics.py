@@ -0,0 +1,237 @@
+"""
+Métricas de los servicios en formato de texto de Prometheus.
+
+Cada servicio declara sus métricas al importar y llama a serve() al
+arrancar: un hilo en segundo plano responde GET /metrics en METRICS_PORT
+con el valor actual de todas. Hay tres tipos:
+
+    Counter     solo aumenta (artículos procesados, bytes descargados)
+    Gauge       valor actual (artículos pendientes en raw)
+    Histogram   distribución de duraciones o tamaños, por cubetas
+
+Las etiquetas se declaran por nombre y se pasan como argumentos:
+FEED_SECONDS.observe(0.3, feed=url). Histogram.time() mide un bloque
+y sirve como context manager o como decorador. track_cycle(stage) mide
+el ciclo principal de una etapa y deja el estado para alertas:
+duración, fallos y hora del último ciclo exitoso.
+
+Sin dependencias: el formato es texto plano y el servidor es
+http.server. Las métricas viven en el proceso que las registra (los
+workers de un ProcessPoolExecutor no reportan).
+"""
+import os
+import math
+import time
+import threading
+from contextlib import ContextDecorator
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 8000))
+
+# Cubetas por defecto (segundos): de una petición rápida a un ciclo largo
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base: nombre, ayuda, etiquetas y valores por combinación de etiquetas"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labels}, no {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError(f"{self.name}: un contador no puede disminuir")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+
+    def time(self, **labels):
+        """Mide un bloque (with) o una función (decorador) en segundos"""
+        return _Timer(self, labels)
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            cumulative += count
+            labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labels, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class _Timer(ContextDecorator):
+    """Observa la duración aunque el bloque termine con una excepción"""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Como decorador, una medición propia por llamada (hilos concurrentes)
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        self.histogram.observe(self.elapsed, **self.labels)
+        return False
+
+# Estado de los ciclos principales, común a todas las etapas
+CYCLE_SECONDS = Histogram("pipeline_cycle_seconds", "Duración de cada ciclo principal", ["stage"])
+CYCLE_FAILURES = Counter("pipeline_cycle_failures_total", "Ciclos que terminaron con una excepción", ["stage"])
+LAST_SUCCESS = Gauge("pipeline_last_success_timestamp_seconds", "Hora Unix del último ciclo exitoso", ["stage"])
+ITEMS = Counter("pipeline_items_total", "Artículos o registros que atravesaron una etapa, por resultado",
+                ["stage", "result"])
+THROUGHPUT = Gauge("pipeline_last_cycle_items_per_second",
+                   "Artículos o registros por segundo del último ciclo", ["stage"])
+
+class track_cycle(ContextDecorator):
+    """
+    Mide el ciclo principal de una etapa: duración, fallos, último éxito
+    y artículos por segundo (los que se cuenten con count() durante el
+    ciclo). Se usa como decorador: @track_cycle("processor").
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._items = 0
+        self._start = None
+
+    def count(self, result, amount=1):
+        """Suma al contador de la etapa y al rendimiento del ciclo en curso"""
+        ITEMS.inc(amount, stage=self.stage, result=result)
+        self._items += amount
+
+    def __enter__(self):
+        self._items = 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        CYCLE_SECONDS.observe(elapsed, stage=self.stage)
+        if exc_type is not None:
+            CYCLE_FAILURES.inc(stage=self.stage)
+        else:
+            LAST_SUCCESS.set(time.time(), stage=self.stage)
+            THROUGHPUT.set(round(self._items / elapsed, 3) if elapsed > 0 else 0, stage=self.stage)
+        return False
+
+def render():
+    """Todas las métricas registradas en formato de texto de Prometheus"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Sin una línea de log por cada scrape"""
+
+def serve(port=METRICS_PORT):
+    """
+    Expone /metrics en un hilo en segundo plano. Con METRICS_PORT=0 no se
+    expone nada; si el puerto está ocupado se avisa y el servicio sigue.
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+    except OSError as e:
+        print(f"⚠️  Métricas desactivadas: no se pudo abrir el puerto {port} ({e})")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Métricas en http://0.0.0.0:{port}/metrics")
+    return server
@@ -0,0 +1,97 @@
+"""
+Migra los árboles data/raw y data/clean (un JSON por artículo) al
+almacén de segmentos de common.article_store.
+
+Cada artículo se ubica en la partición del día en que se escribió su
+archivo (fecha de modificación), igual que hacen los servicios al escribir
+en el almacén.
+
+Las claves conservan el nombre del archivo sin extensión (rss_<md5>,
+cc_<md5>), así que volver a ejecutar la migración no duplica registros.
+
+Uso:
+    python -m common.migrate_to_store --data-dir /app/data [--remove-files]
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from common.article_store import ArticleStore
+
+BATCH_SIZE = 500
+
+def file_day(path):
+    """Día de escritura de un archivo (YYYY-MM-DD)"""
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+
+def migrate_tree(src_dir, store, remove_files=False):
+    """Copia los JSON de un directorio al almacén en lotes"""
+    if not os.path.isdir(src_dir):
+        print(f"⚠️  No existe {src_dir}, se omite")
+        return 0
+
+    migrated = 0
+    skipped = 0
+    batch = []
+    done_paths = []
+
+    def flush():
+        nonlocal migrated
+        migrated += store.append_many(batch)
+        if remove_files:
+            for path in done_paths:
+                os.remove(path)
+        batch.clear()
+        done_paths.clear()
+
+    for entry in os.scandir(src_dir):
+        if not entry.name.endswith(".json"):
+            continue
+
+        key = entry.name[:-len(".json")]
+        if key in store:
+            skipped += 1
+            if remove_files:
+                os.remove(entry.path)
+            continue
+
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except Exception as e:
+            print(f"  ⚠️ Error leyendo {entry.name}: {e}")
+            continue
+
+        batch.append((key, doc, file_day(entry.path)))
+        done_paths.append(entry.path)
+
+        if len(batch) >= BATCH_SIZE:
+            flush()
+
+    flush()
+
+    print(f"✅ {src_dir}: {migrated} migrados, {skipped} ya existían")
+    return migrated
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migra data/raw y data/clean al almacén de segmentos")
+    parser.add_argument("--data-dir", default="/app/data")
+    parser.add_argument("--remove-files", action="store_true",
+                        help="Elimina los JSON individuales una vez migrados")
+    args = parser.parse_args(argv)
+
+    store_dir = os.path.join(args.data_dir, "store")
+
+    print(f"🚚 Migrando {args.data_dir} -> {store_dir}")
+
+    migrate_tree(os.path.join(args.data_dir, "raw"),
+                 ArticleStore(os.path.join(store_dir, "raw")),
+                 args.remove_files)
+    migrate_tree(os.path.join(args.data_dir, "clean"),
+                 ArticleStore(os.path.join(store_dir, "clean")),
+                 args.remove_files)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,19 @@
+"""
+Recursos disponibles para el contenedor.
+"""
+import os
+
+def cpu_limit():
+    """CPUs disponibles según el límite del cgroup (o los núcleos visibles)"""
+    cpus = len(os.sched_getaffinity(0))
+    
+    try:
+        # cgroup v2: "<cuota> <periodo>" o "max <periodo>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, -(-int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    
+    return max(1, cpus)
@@ -0,0 +1,178 @@
+"""
+Conjunto persistente de enlaces ya vistos.
+
+Guarda los primeros 64 bits del MD5 de cada enlace en un archivo binario
+de solo anexado (8 bytes por enlace). En memoria se mantiene un arreglo
+ordenado de enteros de 64 bits más un conjunto pequeño con lo agregado
+desde la última compactación, así que la consulta no toca el disco.
+
+Varios procesos pueden compartir el archivo: cada anexado es una sola
+escritura bajo flock y refresh() incorpora lo que agregaron los demás.
+claim() mantiene el flock mientras quien llama guarda los artículos, así
+que dos procesos nunca se quedan con el mismo enlace.
+
+DailySeenLinks reparte el conjunto en un archivo por día para aplicar la
+misma retención por días que los almacenes (drop_days_before).
+"""
+import os
+import fcntl
+import heapq
+import bisect
+import hashlib
+from array import array
+from contextlib import contextmanager
+
+RECORD_BYTES = 8
+
+# Tamaño del conjunto de pendientes a partir del cual se fusiona al arreglo
+MERGE_THRESHOLD = 4096
+
+def link_digest(link):
+    """MD5 hexadecimal de un enlace (la misma clave que usan los almacenes)"""
+    return hashlib.md5(link.encode()).hexdigest()
+
+def digest_prefix(digest):
+    """Primeros 64 bits de un MD5 hexadecimal como entero"""
+    return int(digest[:16], 16)
+
+class SeenLinks:
+    """Conjunto de hashes de enlaces respaldado por un archivo binario"""
+
+    def __init__(self, path):
+        self.path = path
+        self._sorted = array("Q")
+        self._pending = set()
+        self._pos = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.refresh()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    def __contains__(self, digest):
+        value = digest_prefix(digest)
+        return value in self._pending or self._in_sorted(value)
+
+    def refresh(self):
+        """Incorpora los hashes agregados al archivo desde la última lectura"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+
+        # Ignorar un registro escrito a medias al final del archivo
+        size -= size % RECORD_BYTES
+        if size <= self._pos:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._pos)
+            data = f.read(size - self._pos)
+
+        values = array("Q")
+        values.frombytes(data)
+        self._pos += len(data)
+
+        if not self._sorted and not self._pending:
+            # Carga inicial: ordenar una sola vez
+            self._sorted = array("Q", sorted(set(values)))
+        else:
+            self._pending.update(v for v in values if not self._in_sorted(v))
+            self._maybe_merge()
+
+    @contextmanager
+    def claim(self, digests):
+        """
+        Bajo el flock del archivo, entrega los hashes de `digests` que aún
+        no están (sin repetir). Si el bloque termina sin error, los anexa
+        en una sola escritura; si falla, no quedan marcados.
+        """
+        with open(self.path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Ver lo que otros procesos anexaron antes de filtrar
+                self.refresh()
+                new, values = [], set()
+                for digest in digests:
+                    value = digest_prefix(digest)
+                    if value not in values and value not in self._pending and not self._in_sorted(value):
+                        values.add(value)
+                        new.append(digest)
+
+                yield new
+
+                if values:
+                    f.write(array("Q", values).tobytes())
+                    f.flush()
+                    self.refresh()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def add_many(self, digests):
+        """Agrega hashes nuevos y los anexa al archivo en una sola escritura"""
+        with self.claim(digests) as new:
+            return len(new)
+
+    def _in_sorted(self, value):
+        i = bisect.bisect_left(self._sorted, value)
+        return i < len(self._sorted) and self._sorted[i] == value
+
+    def _maybe_merge(self):
+        """Fusiona los pendientes al arreglo ordenado cuando crecen"""
+        if len(self._pending) < MERGE_THRESHOLD:
+            return
+        self._sorted = array("Q", heapq.merge(self._sorted, sorted(self._pending)))
+        self._pending.clear()
+
+class DailySeenLinks:
+    """Conjunto de hashes con un SeenLinks por día (directorio/YYYY-MM-DD.bin)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._days = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    def __len__(self):
+        return sum(len(seen) for seen in self._days.values())
+
+    def __contains__(self, digest):
+        return any(digest in seen for seen in self._days.values())
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day}.bin")
+
+    def refresh(self):
+        """Incorpora lo agregado por otros procesos y olvida los días borrados"""
+        days = {name[:-len(".bin")] for name in os.listdir(self.directory) if name.endswith(".bin")}
+        for day in list(self._days):
+            if day not in days:
+                del self._days[day]
+        for day in days:
+            if day in self._days:
+                self._days[day].refresh()
+            else:
+                self._days[day] = SeenLinks(self._path(day))
+
+    def add_many(self, digests, day):
+        """Agrega al archivo de `day` los hashes que no estén en ningún día"""
+        seen = self._days.get(day)
+        if seen is None:
+            seen = self._days[day] = SeenLinks(self._path(day))
+        return seen.add_many([d for d in digests if d not in self])
+
+    def drop_days_before(self, cutoff_day):
+        """
+        Elimina los archivos de días anteriores a `cutoff_day` (YYYY-MM-DD).
+        Devuelve el número de hashes eliminados.
+        """
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".bin") and name[:-len(".bin")] < cutoff_day:
+                path = os.path.join(self.directory, name)
+                removed += os.path.getsize(path) // RECORD_BYTES
+                os.remove(path)
+        self.refresh()
+        return removed
@@ -0,0 +1,130 @@
+"""
+Limpieza de texto HTML compartida por el procesador y Common Crawl.
+
+Los patrones se compilan una sola vez y el trabajo pesado queda en C:
+las entidades solo se decodifican si hay un "&", las etiquetas se quitan
+con una única sustitución y los espacios se colapsan con split/join, que
+usa el mismo conjunto de espacios que `\\s` en regex. La salida es
+idéntica a la de la versión anterior basada en varios re.sub.
+"""
+import re
+from html import unescape
+
+TAG_RE = re.compile(r"<[^>]+>")
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+PARAGRAPH_RE = re.compile(r"<p[^>]*>(.*?)</p>", re.I | re.S)
+P_OPEN_RE = re.compile(r"<p[^>]*>", re.I)
+P_CLOSE_RE = re.compile(r"</p>", re.I)
+P_START_RE = re.compile(r"<p", re.I)
+
+def clean_html(text):
+    """Elimina etiquetas HTML y limpia el texto"""
+    if not text:
+        return ""
+
+    # Decodificar entidades HTML (antes de quitar etiquetas, como siempre)
+    if "&" in text:
+        text = unescape(text)
+
+    # Eliminar etiquetas HTML
+    if "<" in text:
+        text = TAG_RE.sub("", text)
+
+    # Colapsar espacios (incluye \xa0) y quitar espacios de ancho cero
+    text = " ".join(text.split())
+    if "\u200b" in text:
+        text = text.replace("\u200b", "")
+
+    return text.strip()
+
+def clean_many(texts):
+    """Limpia una lista de documentos"""
+    clean = clean_html
+    return [clean(text) for text in texts]
+
+def extract_title(html):
+    """Contenido de <title>, con entidades decodificadas"""
+    match = TITLE_RE.search(html)
+    return unescape(match.group(1)) if match else ""
+
+def _paragraph_bodies(html):
+    """
+    Contenido de cada <p>...</p>, igual que PARAGRAPH_RE.findall pero
+    saltando directo al cierre con P_CLOSE_RE en lugar de avanzar carácter
+    a carácter con (.*?). No convierte la página a minúsculas, así que
+    quien deja de iterar temprano no paga por el resto del HTML.
+    """
+    pos = 0
+    search = P_OPEN_RE.search
+    close = P_CLOSE_RE.search
+    while True:
+        match = search(html, pos)
+        if match is None:
+            return
+        end = close(html, match.end())
+        if end is None:
+            return
+        yield html[match.end():end.start()]
+        pos = end.end()
+
+def _stream_paragraph_bodies(chunks):
+    """
+    Como _paragraph_bodies, sobre trozos de HTML que llegan en orden. Al
+    terminar cada trozo solo se conserva lo que sigue al último párrafo
+    completo, y la búsqueda continúa donde quedó: ningún carácter se revisa
+    dos veces (salvo los 3 finales, por si un </p> quedó partido).
+    """
+    buf = ""
+    body_start = None     # inicio del contenido del <p> abierto en buf
+    scan = 0              # desde dónde seguir buscando en buf
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            if body_start is None:
+                match = P_OPEN_RE.search(buf, scan)
+                if match is None:
+                    # Conservar solo un <p incompleto al final (o un "<" suelto)
+                    start = P_START_RE.search(buf, scan)
+                    if start is not None:
+                        keep = start.start()
+                    else:
+                        keep = len(buf) - 1 if buf.endswith("<") else len(buf)
+                    buf, scan = buf[keep:], 0
+                    break
+                body_start = scan = match.end()
+
+            end = P_CLOSE_RE.search(buf, scan)
+            if end is None:
+                buf = buf[body_start:]
+                body_start, scan = 0, max(0, len(buf) - 3)
+                break
+            yield buf[body_start:end.start()]
+            body_start, scan = None, end.end()
+
+def extract_paragraphs(html, max_chars=None):
+    """
+    Texto de todos los <p> unidos por espacios: quita las etiquetas
+    internas y luego decodifica entidades, en un solo recorrido. Con
+    max_chars deja de buscar párrafos apenas el texto llega a ese largo.
+    """
+    return _join_paragraphs(_paragraph_bodies(html), max_chars)
+
+def extract_paragraphs_stream(chunks, max_chars=None):
+    """
+    Igual que extract_paragraphs, pero sobre trozos de HTML (p. ej. del
+    decodificador incremental). Los trozos se piden de a uno, así que
+    al llegar a max_chars no se decodifica ni se recorre el resto.
+    """
+    return _join_paragraphs(_stream_paragraph_bodies(chunks), max_chars)
+
+def _join_paragraphs(bodies, max_chars):
+    sub = TAG_RE.sub
+    parts = []
+    length = -1
+    for body in bodies:
+        text = sub("", body)
+        parts.append(unescape(text) if "&" in text else text)
+        length += len(parts[-1]) + 1
+        if max_chars is not None and length >= max_chars:
+            break
+    return " ".join(parts)
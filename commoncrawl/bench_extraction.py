@@ -0,0 +1,112 @@
+"""
+Benchmark de extracción de artículos.
+
+Genera páginas de noticias sintéticas con la estructura típica de los
+sitios objetivo (menú, titulares relacionados, cuerpo, comentarios,
+pie de página, scripts y metadatos og:), o lee archivos .html de un
+directorio, y compara los extractores de extraction.py:
+
+- Páginas por minuto en un solo núcleo.
+- Ruido: fracción del texto extraído que viene del boilerplate.
+- Cobertura: fracción del cuerpo del artículo presente en la salida.
+- Si se obtuvo article:published_time.
+
+Uso: python bench_extraction.py [n_paginas | directorio_html]
+"""
+import os
+import sys
+import time
+import random
+
+from extraction import EXTRACTORS
+
+WORDS = ("el gobierno anunció que la economía del país crecerá este año según "
+         "el ministro de hacienda y el banco de la república, mientras el dólar "
+         "y la inflación siguen presionando a los hogares colombianos").split()
+
+NOISE_MARK = "ruido"
+
+def sentence(rng, a=10, b=35):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(a, b)))
+
+def synthetic_page(rng):
+    """(html, texto_del_cuerpo) de una página de noticias sintética"""
+    body_paragraphs = [sentence(rng) + "." for _ in range(rng.randint(6, 25))]
+    noise = lambda: f"{NOISE_MARK} {sentence(rng, 3, 8)}"
+
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8">',
+             '<title>Economía crece | Diario</title>',
+             '<meta property="og:title" content="Economía crece">',
+             '<meta property="og:description" content="Resumen de la nota">',
+             '<meta property="article:published_time" content="2025-12-17T08:53:29-05:00">',
+             '<style>.a{color:red}</style>',
+             f'<script>var data = {{"x": "<p>{NOISE_MARK}</p>"}};</script></head><body>',
+             '<header class="site-header"><div class="logo">Diario</div>',
+             '<nav class="menu"><ul>']
+    parts += [f'<li><a href="/s{i}">{noise()}</a></li>' for i in range(30)]
+    parts += ['</ul></nav></header>',
+              '<div class="container"><div class="row">',
+              '<div class="col-8"><article class="article-body">',
+              '<h1>Economía crece</h1>',
+              f'<div class="share"><p><a href="#">{noise()}</a> <a href="#">{noise()}</a></p></div>']
+    for para in body_paragraphs:
+        linked = para.replace("ministro", '<a href="/m">ministro</a>')
+        parts.append(f'<p>{linked}</p>\n')
+        if rng.random() < 0.2:
+            parts.append(f'<div class="publicidad"><p>{noise()}</p></div>')
+    parts += ['</article>',
+              '<div class="comments">']
+    parts += [f'<div class="comment"><p>{noise()}</p></div>' for _ in range(rng.randint(0, 8))]
+    parts += ['</div></div>',
+              '<aside class="sidebar"><h3>Relacionadas</h3><ul>']
+    parts += [f'<li><a href="/r{i}"><p>{noise()}</p></a></li>' for i in range(12)]
+    parts += ['</ul></aside></div></div>',
+              f'<footer><p>© 2025 {noise()}</p><p>{noise()}</p></footer>',
+              '<script src="/app.js"></script>' + '<script>' + 'var x=1;' * 2000 + '</script>',
+              '</body></html>']
+    return "".join(parts), " ".join(body_paragraphs)
+
+def load_pages(path):
+    pages = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".html", ".htm")):
+            with open(os.path.join(path, name), encoding="utf-8", errors="ignore") as f:
+                pages.append((f.read(), None))
+    return pages
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "500"
+    if os.path.isdir(arg):
+        pages = load_pages(arg)
+    else:
+        rng = random.Random(42)
+        pages = [synthetic_page(rng) for _ in range(int(arg))]
+
+    size = sum(len(html) for html, _ in pages) / len(pages) / 1024
+    print(f"📊 {len(pages)} páginas (~{size:.0f} KB en promedio)\n")
+
+    for name, extractor_cls in EXTRACTORS.items():
+        extractor = extractor_cls()
+
+        start = time.perf_counter()
+        results = [extractor.extract(html) for html, _ in pages]
+        elapsed = time.perf_counter() - start
+
+        print(f"{name}:")
+        print(f"   - {len(pages) / elapsed * 60:,.0f} páginas/minuto ({elapsed / len(pages) * 1e3:.2f} ms/página)")
+
+        if pages[0][1] is not None:
+            noise = coverage = 0.0
+            for (html, body), result in zip(pages, results):
+                words = result["text"].split()
+                noise += words.count(NOISE_MARK) / max(1, len(words))
+                coverage += min(1.0, sum(len(p) for p in body.split(".") if p.strip() in result["text"])
+                                / max(1, len(body)))
+            print(f"   - Ruido: {noise / len(pages):.1%} de las palabras")
+            print(f"   - Cobertura del cuerpo: {coverage / len(pages):.1%}")
+
+        dated = sum(1 for r in results if r["published"])
+        print(f"   - Con fecha de publicación: {dated}/{len(pages)}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Consultas paginadas y reanudables al índice CDX de Common Crawl.
+
+- collinfo.json y cada página CDX se guardan en disco con un TTL, de
+  modo que repetir una ejecución no vuelve a consultar el servidor.
+- Las respuestas se escriben en streaming al caché y se leen línea a
+  línea, sin cargar el cuerpo completo en memoria.
+- Se recorre el índice página a página (showNumPages / page), con
+  filtros por estado HTTP y tipo MIME.
+- Un checkpoint por (índice, dominio) recuerda la página y la línea
+  hasta donde se consumió, para que una ejecución caída continúe ahí.
+"""
+import os
+import json
+import time
+import hashlib
+
+CACHE_DIR = os.getenv("CC_CACHE_DIR", "/app/data/commoncrawl/cache")
+CHECKPOINT_FILE = os.getenv("CC_CHECKPOINT_FILE", "/app/data/commoncrawl/cdx_checkpoint.json")
+
+# collinfo.json cambia con cada crawl nuevo; las páginas de un crawl publicado no cambian
+COLLINFO_TTL = int(os.getenv("CC_COLLINFO_TTL", 86400))
+PAGE_TTL = int(os.getenv("CC_PAGE_TTL", 7 * 86400))
+
+STATUS_FILTER = os.getenv("CC_STATUS_FILTER", "200")
+MIME_FILTER = os.getenv("CC_MIME_FILTER", "text/html")
+MATCH_TYPE = os.getenv("CC_MATCH_TYPE", "domain")
+
+def save_json_atomic(path, data):
+    """Escribe JSON en un temporal y lo renombra"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+class DiskCache:
+    """Respuestas HTTP en disco, una por archivo, con expiración por mtime"""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, url, params=None):
+        key = url + "?" + json.dumps(params or {}, sort_keys=True)
+        return os.path.join(self.root, hashlib.md5(key.encode()).hexdigest())
+
+    def fresh(self, path, ttl):
+        try:
+            return time.time() - os.stat(path).st_mtime < ttl
+        except FileNotFoundError:
+            return False
+
+    def fetch(self, session, limiter, url, params=None, ttl=PAGE_TTL, timeout=60, empty_on_404=False):
+        """
+        Devuelve la ruta del archivo con la respuesta, descargándola en
+        streaming solo si no está en caché o ya expiró. Con empty_on_404
+        (consultas CDX: un 404 significa "sin capturas") el 404 se guarda
+        como respuesta vacía; si no, se lanza HTTPError como cualquier
+        otro error y no se guarda nada.
+        """
+        path = self.path(url, params)
+        # Un archivo vacío solo es una respuesta válida si el 404 lo es
+        if self.fresh(path, ttl) and (empty_on_404 or os.path.getsize(path)):
+            return path
+
+        limiter.acquire(url)
+        with session.get(url, params=params, timeout=timeout, stream=True) as response:
+            not_found = empty_on_404 and response.status_code == 404
+            if not not_found:
+                response.raise_for_status()
+
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                if not not_found:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            os.replace(tmp, path)
+
+        return path
+
+    def prune(self, max_age=PAGE_TTL):
+        """Borra las respuestas más viejas que max_age"""
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.stat(path).st_mtime > max_age:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+def iter_json_lines(path):
+    """Registros de un archivo JSON-por-línea, sin cargarlo completo"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+class Checkpoints:
+    """Posición (página, línea) alcanzada por cada consulta índice+dominio"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.state = {}
+
+    @staticmethod
+    def key(index_name, domain):
+        return f"{index_name}|{domain}"
+
+    def get(self, index_name, domain):
+        return self.state.get(self.key(index_name, domain),
+                              {"page": 0, "line": 0, "pages": None, "done": False})
+
+    def set(self, index_name, domain, position):
+        self.state[self.key(index_name, domain)] = position
+
+    def save(self):
+        save_json_atomic(self.path, self.state)
+
+class CDXIndex:
+    """Cliente del servidor de índices con caché y paginación"""
+
+    BASE_URL = "https://index.commoncrawl.org"
+
+    def __init__(self, session, limiter, cache=None, base_url=BASE_URL):
+        self.session = session
+        self.limiter = limiter
+        self.cache = cache or DiskCache()
+        self.base_url = base_url
+
+    def collections(self):
+        """Lista de crawls (collinfo.json), del más reciente al más antiguo"""
+        path = self.cache.fetch(self.session, self.limiter,
+                                f"{self.base_url}/collinfo.json", ttl=COLLINFO_TTL, timeout=30)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def query_params(self, domain):
+        params = {"url": domain, "output": "json", "matchType": MATCH_TYPE}
+        filters = []
+        if STATUS_FILTER:
+            filters.append(f"status:{STATUS_FILTER}")
+        if MIME_FILTER:
+            filters.append(f"mime:{MIME_FILTER}")
+        if filters:
+            params["filter"] = filters
+        return params
+
+    def num_pages(self, index_name, domain):
+        """Número de páginas de resultados para el dominio"""
+        params = dict(self.query_params(domain), showNumPages="true")
+        path = self.cache.fetch(self.session, self.limiter,
+                                f"{self.base_url}/{index_name}-index", params, empty_on_404=True)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+        if not text:
+            return 0
+        info = json.loads(text)
+        return int(info.get("pages", 0)) if isinstance(info, dict) else int(info)
+
+    def page(self, index_name, domain, page):
+        """Registros de una página, leídos en streaming desde el caché"""
+        params = dict(self.query_params(domain), page=page)
+        path = self.cache.fetch(self.session, self.limiter,
+                                f"{self.base_url}/{index_name}-index", params, empty_on_404=True)
+        return iter_json_lines(path)
+
+    def records(self, index_name, domain, checkpoints, limit):
+        """
+        Hasta `limit` registros a partir del checkpoint. Devuelve la lista
+        y la nueva posición, que el llamador guarda con Checkpoints.set
+        cuando ya procesó los registros.
+        """
+        position = dict(checkpoints.get(index_name, domain))
+        if position["done"]:
+            return [], position
+
+        if position["pages"] is None:
+            position["pages"] = self.num_pages(index_name, domain)
+
+        results = []
+        while len(results) < limit and position["page"] < position["pages"]:
+            for i, record in enumerate(self.page(index_name, domain, position["page"])):
+                if i < position["line"]:
+                    continue
+                results.append(record)
+                position["line"] = i + 1
+                if len(results) == limit:
+                    break
+            else:
+                # Página agotada: pasar a la siguiente
+                position["page"] += 1
+                position["line"] = 0
+
+        position["done"] = position["page"] >= position["pages"]
+        return results, position
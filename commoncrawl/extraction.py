@@ -0,0 +1,285 @@
+"""
+Extracción del contenido principal de páginas de noticias.
+
+Dos extractores intercambiables (variable CC_EXTRACTOR):
+
+- "density" (por defecto): un solo recorrido por las etiquetas de
+  bloque, al estilo de readability. Cada párrafo suma puntos a su
+  contenedor (y la mitad al abuelo) según su longitud, sus comas y su
+  densidad de enlaces; las clases/ids tipo "article"/"content" suman y
+  las tipo "nav"/"footer"/"share" restan. Se devuelve el texto del
+  contenedor ganador. nav, header, footer, aside, form y los bloques con
+  clases negativas se descartan, y script/style se saltan sin recorrerlos.
+- "paragraphs": el comportamiento anterior, todos los <p> en orden.
+  Con max_chars deja de recorrer la página apenas junta ese texto.
+
+Ambos leen los metadatos og:* y article:* (fecha real de publicación)
+durante el mismo recorrido.
+
+extract_stream() recibe la página como trozos ya decodificados (ver
+warc_parser.iter_decoded). "paragraphs" los pide de a uno y deja de
+pedir al juntar max_chars, así que el resto ni se decodifica; "density"
+necesita la página completa porque el bloque ganador depende de toda.
+"""
+import os
+import re
+from html import unescape
+
+from common.text_cleaning import TAG_RE, extract_title, extract_paragraphs, extract_paragraphs_stream
+
+# Caracteres de la cabecera que se guardan buscando <title> y <meta>
+# cuando la página no trae <body>
+HEAD_MAX_CHARS = 256 * 1024
+
+BODY_START_RE = re.compile(r"<body\b", re.I)
+
+# Etiquetas que el recorrido necesita ver; el resto se salta en C
+TOKEN_RE = re.compile(
+    r"<(/?)(div|article|section|main|td|body|p|meta|script|style|noscript|"
+    r"nav|header|footer|aside|form|ul|ol|table)\b([^>]*)>",
+    re.I,
+)
+ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""")
+LINK_TEXT_RE = re.compile(r"<a\b[^>]*>(.*?)</a>", re.I | re.S)
+
+POSITIVE_RE = re.compile(r"article|body|content|entry|main|post|story|text|nota|cuerpo", re.I)
+NEGATIVE_RE = re.compile(
+    r"nav|menu|footer|header|sidebar|comment|share|social|related|promo|"
+    r"banner|widget|breadcrumb|tags|newsletter|publicidad|relacionad", re.I)
+
+BOILERPLATE = {"nav", "header", "footer", "aside", "form"}
+SKIP = {"script", "style", "noscript"}
+# Nunca se descartan por sus clases
+KEEP = {"body", "article", "main"}
+
+# Puntaje inicial por etiqueta, como readability
+TAG_SCORES = {"article": 10, "main": 10, "div": 5, "section": 3, "td": 3}
+
+MIN_PARAGRAPH_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+def parse_attrs(text):
+    """Atributos de una etiqueta, con nombres en minúsculas"""
+    attrs = {}
+    for name, value in ATTR_RE.findall(text):
+        if value[:1] in "\"'":
+            value = value[1:-1]
+        attrs[name.lower()] = unescape(value)
+    return attrs
+
+def meta_property(attrs_text):
+    """(propiedad, contenido) de un <meta> og:/article:, o None"""
+    attrs = parse_attrs(attrs_text)
+    name = (attrs.get("property") or attrs.get("name") or "").lower()
+    if name.startswith(("og:", "article:")) and "content" in attrs:
+        return name, attrs["content"].strip()
+    return None
+
+def clean_fragment(fragment):
+    """Texto plano de un fragmento HTML"""
+    text = TAG_RE.sub("", fragment)
+    if "&" in text:
+        text = unescape(text)
+    return " ".join(text.split())
+
+def class_weight(attrs_text):
+    """+25/-25 según las clases e ids del contenedor"""
+    if not attrs_text:
+        return 0
+    attrs = parse_attrs(attrs_text)
+    hint = f"{attrs.get('class', '')} {attrs.get('id', '')}"
+    weight = 0
+    if NEGATIVE_RE.search(hint):
+        weight -= 25
+    if POSITIVE_RE.search(hint):
+        weight += 25
+    return weight
+
+def build_result(title, text, metadata):
+    return {
+        "title": metadata.get("og:title") or title,
+        "text": text,
+        "published": metadata.get("article:published_time", ""),
+        "metadata": metadata,
+    }
+
+class ParagraphExtractor:
+    """Todos los <p> de la página (comportamiento anterior)"""
+
+    name = "paragraphs"
+
+    def extract(self, html, max_chars=None):
+        return build_result(extract_title(html), extract_paragraphs(html, max_chars),
+                            self.head_metadata(html))
+
+    def extract_stream(self, chunks, max_chars=None):
+        """
+        Igual que extract sobre trozos decodificados en orden. Título y
+        metadatos salen de lo leído hasta <body>; los párrafos dejan de
+        pedir trozos al juntar max_chars.
+        """
+        head = []
+        head_done = False
+
+        def tee():
+            nonlocal head_done
+            for chunk in chunks:
+                if not head_done:
+                    head.append(chunk)
+                    # Buscar <body> también a caballo entre dos trozos
+                    tail = "".join(head[-2:])
+                    head_done = BODY_START_RE.search(tail) is not None or sum(map(len, head)) >= HEAD_MAX_CHARS
+                yield chunk
+
+        text = extract_paragraphs_stream(tee(), max_chars)
+        html = "".join(head)
+        return build_result(extract_title(html), text, self.head_metadata(html))
+
+    @staticmethod
+    def head_metadata(html):
+        """Metadatos og:/article: de los <meta> anteriores a <body>"""
+        metadata = {}
+        for match in TOKEN_RE.finditer(html):
+            if match.group(2).lower() == "meta":
+                prop = meta_property(match.group(3))
+                if prop:
+                    metadata.setdefault(*prop)
+            elif match.group(2).lower() == "body":
+                break
+        return metadata
+
+class DensityExtractor:
+    """Bloque principal por densidad de texto y de enlaces"""
+
+    name = "density"
+
+    def extract_stream(self, chunks, max_chars=None):
+        """Lee todos los trozos: el bloque ganador depende de toda la página"""
+        return self.extract("".join(chunks), max_chars)
+
+    def extract(self, html, max_chars=None):
+        """max_chars no acorta el recorrido: el ganador depende de toda la página"""
+        lower = html.lower()
+        metadata = {}
+
+        # Pila de contenedores abiertos: (etiqueta, id, es_boilerplate)
+        stack = []
+        scores = {}
+        parents = {}
+        next_id = 0
+        boilerplate_depth = 0
+
+        paragraphs = []      # (texto, ancestros)
+        p_start = None
+        p_ancestors = None
+
+        def close_paragraph(end):
+            nonlocal p_start
+            if p_start is None:
+                return
+            fragment = html[p_start:end]
+            p_start = None
+            if boilerplate_depth:
+                return
+
+            text = clean_fragment(fragment)
+            length = len(text)
+            if not length:
+                return
+
+            link_chars = 0
+            if "<a" in fragment or "<A" in fragment:
+                link_chars = sum(len(clean_fragment(a)) for a in LINK_TEXT_RE.findall(fragment))
+            link_density = link_chars / length
+            if link_density > MAX_LINK_DENSITY:
+                return
+
+            paragraphs.append((text, p_ancestors))
+            if length < MIN_PARAGRAPH_CHARS or not p_ancestors:
+                return
+
+            score = (1 + text.count(",") + min(length // 100, 3)) * (1 - link_density)
+            parent = p_ancestors[-1]
+            scores[parent] += score
+            grandparent = parents.get(parent)
+            if grandparent is not None:
+                scores[grandparent] += score / 2
+
+        pos = 0
+        search = TOKEN_RE.search
+        while True:
+            match = search(html, pos)
+            if match is None:
+                break
+            closing, tag, attrs_text = match.groups()
+            tag = tag.lower()
+            pos = match.end()
+
+            if tag in SKIP:
+                if not closing:
+                    # Saltar el contenido completo de script/style
+                    end = lower.find(f"</{tag}", pos)
+                    pos = len(html) if end < 0 else end
+                continue
+
+            if tag == "meta":
+                if not closing:
+                    prop = meta_property(attrs_text)
+                    if prop:
+                        metadata.setdefault(*prop)
+                continue
+
+            if tag == "p":
+                close_paragraph(match.start())
+                if not closing:
+                    p_start = pos
+                    p_ancestors = tuple(entry[1] for entry in stack)
+                continue
+
+            # Contenedores y bloques de boilerplate
+            close_paragraph(match.start())
+            if not closing:
+                weight = class_weight(attrs_text)
+                # Bloques con clases tipo "publicidad"/"comments" cuentan como boilerplate
+                is_boilerplate = tag in BOILERPLATE or (weight < 0 and tag not in KEEP)
+                if is_boilerplate:
+                    boilerplate_depth += 1
+                next_id += 1
+                if stack:
+                    parents[next_id] = stack[-1][1]
+                scores[next_id] = TAG_SCORES.get(tag, 0) + weight
+                stack.append((tag, next_id, is_boilerplate))
+            else:
+                # Cerrar hasta la etiqueta correspondiente (HTML mal anidado)
+                for i in range(len(stack) - 1, -1, -1):
+                    if stack[i][0] == tag:
+                        for _, _, is_boilerplate in stack[i:]:
+                            if is_boilerplate:
+                                boilerplate_depth -= 1
+                        del stack[i:]
+                        break
+
+        close_paragraph(len(html))
+
+        scored = {c for _, ancestors in paragraphs if ancestors
+                  for c in ancestors[-2:]}
+        if scored:
+            best = max(scored, key=lambda c: scores[c])
+            text = " ".join(t for t, ancestors in paragraphs if best in ancestors)
+        else:
+            text = " ".join(t for t, _ in paragraphs)
+
+        return build_result(extract_title(html), text, metadata)
+
+EXTRACTORS = {
+    ParagraphExtractor.name: ParagraphExtractor,
+    DensityExtractor.name: DensityExtractor,
+}
+
+def get_extractor(name=None):
+    """Extractor configurado en CC_EXTRACTOR"""
+    name = name or os.getenv("CC_EXTRACTOR", DensityExtractor.name)
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError(f"Extractor desconocido: {name} (opciones: {', '.join(EXTRACTORS)})")
@@ -0,0 +1,141 @@
+"""
+Descarga concurrente de rangos WARC de Common Crawl.
+
+- Un pool acotado de hilos reparte las descargas.
+- Un token bucket por host reemplaza el time.sleep(2) fijo: limita la
+  tasa de peticiones sin importar cuántos hilos haya.
+- Los errores transitorios (conexión, 429, 5xx) se reintentan con
+  backoff exponencial, respetando Retry-After.
+- El gzip se descomprime en streaming mientras llega la respuesta.
+"""
+import os
+import time
+import zlib
+import random
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+# Peticiones por segundo y ráfaga máxima por host
+RATE_PER_HOST = float(os.getenv("CC_RATE_PER_HOST", 0.5))
+BURST_PER_HOST = int(os.getenv("CC_BURST_PER_HOST", 2))
+
+FETCH_WORKERS = int(os.getenv("CC_FETCH_WORKERS", 8))
+MAX_RETRIES = int(os.getenv("CC_MAX_RETRIES", 4))
+BACKOFF_SECONDS = float(os.getenv("CC_BACKOFF_SECONDS", 2))
+
+# Tope de bytes descomprimidos por registro
+MAX_RECORD_BYTES = int(os.getenv("CC_MAX_RECORD_BYTES", 5 * 1024 * 1024))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Token bucket seguro entre hilos"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta obtener un token"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+class RateLimiter:
+    """Un token bucket por host"""
+
+    def __init__(self, rate=RATE_PER_HOST, burst=BURST_PER_HOST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+class TransientError(Exception):
+    """Error que vale la pena reintentar"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def fetch_gzip_range(session, limiter, url, offset, length, timeout=120):
+    """
+    Descarga bytes [offset, offset+length) de `url` y los descomprime en
+    streaming. Devuelve los bytes descomprimidos (hasta MAX_RECORD_BYTES).
+    """
+    headers = {"Range": f"bytes={offset}-{offset + length - 1}"}
+
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(url)
+        try:
+            with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code in RETRY_STATUS:
+                    raise TransientError(f"HTTP {response.status_code}",
+                                         response.headers.get("Retry-After"))
+                response.raise_for_status()
+
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                chunks = []
+                size = 0
+
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    # max_length: un trozo muy comprimible no se expande
+                    # más allá del tope (el resto queda en unconsumed_tail)
+                    data = decompressor.decompress(chunk, MAX_RECORD_BYTES - size)
+                    chunks.append(data)
+                    size += len(data)
+                    # Registro completo o truncado: no hace falta seguir descargando
+                    if size >= MAX_RECORD_BYTES or decompressor.eof:
+                        break
+
+                return b"".join(chunks)
+
+        except (TransientError, requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                raise
+
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after and str(retry_after).isdigit():
+                delay = float(retry_after)
+            else:
+                delay = BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+
+            print(f"  🔁 Reintento {attempt + 1}/{MAX_RETRIES} en {delay:.1f}s ({e})")
+            time.sleep(delay)
+
+def fetch_all(fn, items, workers=FETCH_WORKERS):
+    """
+    Ejecuta fn(item) en un pool acotado y entrega (item, resultado, error)
+    a medida que terminan.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
@@ -1,15 +1,38 @@
 import os
-import json
-import gzip
 import time
 import requests
-from datetime import datetime
-import hashlib
+from requests.adapters import HTTPAdapter
+from sync_to_pipeline import RawEmitter, sync_commoncrawl_to_pipeline
+from fetch_engine import RateLimiter, FETCH_WORKERS, fetch_gzip_range, fetch_all
+from cdx_index import CDXIndex, Checkpoints
+from warc_parser import first_response, detect_charset, iter_decoded
+from extraction import get_extractor
+from common import metrics
 
 OUT_DIR = "/app/data/commoncrawl"
-RAW_DIR = "/app/data/raw"
 os.makedirs(OUT_DIR, exist_ok=True)
 
+EXTRACTOR = get_extractor()
+
+# Artículos por cada entrega al almacén raw
+EMIT_BATCH = 25
+
+# Caracteres de texto que se guardan por artículo
+MAX_TEXT_CHARS = 3000
+
+# Registros por ciclo: índices × dominios × registros por dominio (por
+# defecto 2 × 5 × 200 = 2000). A CC_RATE_PER_HOST = 0.5 son ~70 minutos
+# de descargas, muy por debajo del intervalo diario; el checkpoint CDX
+# hace que el ciclo siguiente continúe donde quedó este
+MAX_INDEXES = int(os.getenv("CC_INDEXES", 2))
+RECORDS_PER_DOMAIN = int(os.getenv("CC_RECORDS_PER_DOMAIN", 200))
+
+# Métricas en /metrics (METRICS_PORT)
+cycle = metrics.track_cycle("commoncrawl")
+WARC_SECONDS = metrics.Histogram("commoncrawl_warc_download_seconds",
+                                 "Duración de la descarga de cada registro WARC (con reintentos)")
+WARC_BYTES = metrics.Counter("commoncrawl_warc_bytes_total", "Bytes de registros WARC descargados (descomprimidos)")
+
 TARGET_DOMAINS = [
     "eltiempo.com",
     "portafolio.co",
@@ -19,90 +42,82 @@ TARGET_DOMAINS = [
 ]
 
 class CommonCrawlFetcher:
-    BASE_URL = "https://index.commoncrawl.org"
-    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'NewsAnalyzer/1.0 (Educational)'
         })
+        # Una conexión reutilizable por hilo de descarga
+        adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = RateLimiter()
+        self.index = CDXIndex(self.session, self.limiter)
     
     def get_indexes(self):
         try:
-            url = f"{self.BASE_URL}/collinfo.json"
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            indexes = response.json()
+            indexes = self.index.collections()
             print(f"✅ Encontrados {len(indexes)} índices")
             return indexes[:6]  # Últimos 6 meses
         except Exception as e:
             print(f"❌ Error: {e}")
             return []
     
-    def search_domain(self, index_name, domain, limit=20):
+    def search_domain(self, index_name, domain, checkpoints, limit=RECORDS_PER_DOMAIN):
+        """Siguientes `limit` registros del dominio y la posición alcanzada"""
         try:
-            url = f"{self.BASE_URL}/{index_name}-index"
-            params = {'url': domain, 'output': 'json', 'limit': limit}
-            
             print(f"🔍 Buscando {domain} en {index_name}...")
-            response = self.session.get(url, params=params, timeout=60)
-            response.raise_for_status()
+            results, position = self.index.records(index_name, domain, checkpoints, limit)
             
-            results = []
-            for line in response.text.strip().split('\n'):
-                if line:
-                    try:
-                        results.append(json.loads(line))
-                    except:
-                        continue
-            
-            print(f"✅ {len(results)} URLs encontradas")
-            return results
+            print(f"✅ {len(results)} URLs encontradas (página {position['page']}/{position['pages']})")
+            return results, position
         except Exception as e:
             print(f"❌ Error: {e}")
-            return []
+            return [], None
     
-    def download_warc(self, warc_record):
-        try:
-            filename = warc_record['filename']
-            offset = int(warc_record['offset'])
-            length = int(warc_record['length'])
-            
-            url = f"https://data.commoncrawl.org/{filename}"
-            headers = {'Range': f'bytes={offset}-{offset+length-1}'}
-            
-            response = self.session.get(url, headers=headers, timeout=120)
-            response.raise_for_status()
-            
-            return gzip.decompress(response.content).decode('utf-8', errors='ignore')
-        except Exception as e:
-            print(f"⚠️ Error descargando: {e}")
-            return None
+    @WARC_SECONDS.time()
+    def download_warc(self, warc_record, base_url="https://data.commoncrawl.org"):
+        """Descarga y descomprime un registro WARC (bytes, con límite de tasa y reintentos)"""
+        filename = warc_record['filename']
+        offset = int(warc_record['offset'])
+        length = int(warc_record['length'])
+        
+        url = f"{base_url}/{filename}"
+        content = fetch_gzip_range(self.session, self.limiter, url, offset, length)
+        WARC_BYTES.inc(len(content))
+        return content
     
     def extract_article(self, warc_content, url):
+        """
+        Título, texto y metadatos de la respuesta HTML del registro. El
+        cuerpo se decodifica por ventanas a pedido del extractor: con
+        CC_EXTRACTOR=paragraphs se deja de decodificar al juntar
+        MAX_TEXT_CHARS de texto; "density" (por defecto) lee la página
+        completa porque el bloque ganador depende de toda.
+        """
         try:
-            import re
-            from html import unescape
-            
-            parts = warc_content.split('\r\n\r\n', 2)
-            if len(parts) < 3:
+            response = first_response(warc_content)
+            if response is None or not response.body:
                 return None
             
-            html = parts[2]
+            charset = detect_charset(response.headers, response.body)
             
-            title_match = re.search(r'<title[^>]*>(.*?)</title>', html, re.I | re.S)
-            title = unescape(title_match.group(1)) if title_match else ""
+            # Cada ventana se decodifica y recorre una sola vez; el extractor
+            # decide cuántas pide (ver extraction.extract_stream)
+            chunks = iter_decoded(response.body, charset)
+            article = EXTRACTOR.extract_stream(chunks, MAX_TEXT_CHARS)
             
-            paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', html, re.I | re.S)
-            text = ' '.join([unescape(re.sub(r'<[^>]+>', '', p)) for p in paragraphs])
-            
-            if len(text) < 100:
+            if len(article['text']) < 100:
                 return None
             
-            return {'title': title.strip(), 'text': text.strip()[:3000], 'url': url}
+            article['title'] = article['title'].strip()
+            article['text'] = article['text'].strip()[:MAX_TEXT_CHARS]
+            article['url'] = url
+            return article
         except Exception as e:
             return None
 
+@cycle
 def fetch_news():
     print(f"\n{'='*60}")
     print(f"🚀 Iniciando recolección Common Crawl")
@@ -115,99 +130,94 @@ def fetch_news():
         print("❌ No hay índices disponibles")
         return
     
-    total = 0
-    
-    for index_info in indexes[:2]:  # Solo 2 índices para empezar
+    # 1. Reunir los registros candidatos desde el último checkpoint
+    emitter = RawEmitter()
+    checkpoints = Checkpoints()
+    positions = {}
+    pending = {}
+    for index_info in indexes[:MAX_INDEXES]:
         index_name = index_info['id']
         print(f"\n📦 Procesando: {index_name}")
         
         for domain in TARGET_DOMAINS:
-            results = fetcher.search_domain(index_name, domain, limit=10)
+            results, position = fetcher.search_domain(index_name, domain, checkpoints)
+            if position is not None:
+                positions[(index_name, domain)] = position
             
-            for i, result in enumerate(results[:5]):  # 5 por dominio
-                try:
-                    url = result.get('url', '')
-                    url_hash = hashlib.md5(url.encode()).hexdigest()
-                    output_file = os.path.join(OUT_DIR, f"cc_{url_hash}.json")
-                    
-                    if os.path.exists(output_file):
-                        continue
-                    
-                    print(f"  [{i+1}/5] Descargando...")
-                    
-                    warc_content = fetcher.download_warc(result)
-                    if not warc_content:
-                        continue
-                    
-                    article = fetcher.extract_article(warc_content, url)
-                    if article:
-                        data = {
-                            'title': article['title'],
-                            'text': article['text'],
-                            'url': url,
-                            'domain': domain,
-                            'crawl_index': index_name,
-                            'timestamp': result.get('timestamp', ''),
-                            'fetched_at': datetime.now().isoformat(),
-                            'source': 'common_crawl'
-                        }
-                        
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            json.dump(data, f, ensure_ascii=False, indent=2)
-                        
-                        total += 1
-                        print(f"  ✅ {article['title'][:50]}...")
-                    
-                    time.sleep(2)
-                except Exception as e:
-                    print(f"  ⚠️ Error: {e}")
+            for result in results:
+                url = result.get('url', '')
+                # Una misma URL puede aparecer en varios índices
+                if url and url not in pending and not emitter.is_known(url):
+                    pending[url] = (index_name, domain, result)
+    
+    pending = list(pending.values())
+    print(f"\n⬇️  Descargando {len(pending)} registros ({FETCH_WORKERS} hilos)")
+    
+    # 2. Descargar en paralelo; extraer y entregar al almacén raw en este hilo
+    total = 0
+    done = 0
+    failed = set()
+    batch = []
+    for job, warc_content, error in fetch_all(lambda job: fetcher.download_warc(job[2]), pending):
+        index_name, domain, result = job
+        url = result.get('url', '')
+        done += 1
+        
+        if error is not None:
+            failed.add((index_name, domain))
+            cycle.count("failed")
+            print(f"  ⚠️ [{done}/{len(pending)}] Error descargando: {error}")
+            continue
+        
+        try:
+            article = fetcher.extract_article(warc_content, url)
+            if article:
+                batch.append({
+                    'title': article['title'],
+                    'text': article['text'],
+                    'url': url,
+                    'domain': domain,
+                    'crawl_index': index_name,
+                    'timestamp': result.get('timestamp', ''),
+                    'published': article['published'],
+                })
+                print(f"  ✅ [{done}/{len(pending)}] {article['title'][:50]}...")
+        except Exception as e:
+            print(f"  ⚠️ Error: {e}")
         
-        print(f"\n📊 Total: {total} artículos")
+        if len(batch) >= EMIT_BATCH:
+            written = emitter.emit(batch)
+            total += written
+            cycle.count("stored", written)
+            batch = []
+    
+    if batch:
+        written = emitter.emit(batch)
+        total += written
+        cycle.count("stored", written)
+    
+    print(f"\n📊 Total: {total} artículos")
     
-    # Sincronizar al pipeline
-    sync_to_pipeline()
+    # 3. Avanzar los checkpoints; las consultas con descargas fallidas se repiten
+    for (index_name, domain), position in positions.items():
+        if (index_name, domain) not in failed:
+            checkpoints.set(index_name, domain, position)
+    checkpoints.save()
+    fetcher.index.cache.prune()
     
     print(f"\n{'='*60}")
     print(f"✅ Completado: {total} artículos")
     print(f"{'='*60}\n")
 
-def sync_to_pipeline():
-    """Copia a data/raw para procesamiento"""
-    cc_files = [f for f in os.listdir(OUT_DIR) 
-                if f.startswith('cc_') and f.endswith('.json')]
-    
-    copied = 0
-    for filename in cc_files:
-        cc_path = os.path.join(OUT_DIR, filename)
-        raw_path = os.path.join(RAW_DIR, filename)
-        
-        if not os.path.exists(raw_path):
-            try:
-                with open(cc_path, 'r', encoding='utf-8') as f:
-                    cc_data = json.load(f)
-                
-                raw_data = {
-                    "title": cc_data.get("title", ""),
-                    "link": cc_data.get("url", ""),
-                    "summary": cc_data.get("text", "")[:500],
-                    "published": cc_data.get("timestamp", datetime.now().isoformat()),
-                    "source": f"common_crawl:{cc_data.get('domain', '')}"
-                }
-                
-                with open(raw_path, 'w', encoding='utf-8') as f:
-                    json.dump(raw_data, f, ensure_ascii=False, indent=2)
-                
-                copied += 1
-            except:
-                pass
-    
-    if copied > 0:
-        print(f"✅ Sincronizados {copied} artículos al pipeline")
-
 def main():
     interval = int(os.getenv("SLEEP_INTERVAL", 86400))
     print(f"🚀 Common Crawl iniciado (cada {interval/3600:.1f}h)")
     
+    metrics.serve()
+    
+    # Importar los cc_*.json que hayan dejado versiones anteriores
+    sync_commoncrawl_to_pipeline()
+    
     while True:
         try:
             fetch_news()
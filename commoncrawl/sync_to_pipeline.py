@@ -1,54 +1,136 @@
+"""
+Única vía de entrada de Common Crawl al pipeline.
+
+El fetcher entrega cada artículo extraído directamente al almacén raw
+(RawEmitter), sin escribir antes una copia cc_*.json en
+data/commoncrawl. Los enlaces ya entregados se recuerdan en un
+SeenLinks propio, que sobrevive a la retención del almacén. Ese
+SeenLinks es el único punto de deduplicación: emit() reclama los
+enlaces bajo su flock y solo guarda los que reclamó.
+
+Los cc_*.json que dejaron versiones anteriores se importan con
+sync_commoncrawl_to_pipeline(), que usa como marca de agua la mayor
+fecha de modificación ya importada y los nombres importados con esa
+misma fecha: cada ejecución solo lee los archivos más nuevos, sin
+perder los que se escribieron en el mismo instante que la marca.
+"""
 import os
 import json
-import shutil
 from datetime import datetime
+from common.article_store import ArticleStore, today
+from common.seen_links import SeenLinks, link_digest
+from common import events
 
 CC_DIR = "/app/data/commoncrawl"
-RAW_DIR = "/app/data/raw"
+RAW_STORE_DIR = "/app/data/store/raw"
+SEEN_FILE = "/app/data/store/cc_seen_links.bin"
+WATERMARK_FILE = os.path.join(CC_DIR, "sync_watermark.json")
+
+# El pipeline solo usa un resumen del texto
+SUMMARY_CHARS = 500
+
+def record_key(url):
+    """Clave del artículo en el almacén raw (la misma de los cc_*.json)"""
+    return f"cc_{link_digest(url)}"
+
+def to_raw(cc_data):
+    """Adapta un artículo de Common Crawl al formato raw del pipeline"""
+    return {
+        "title": cc_data.get("title", ""),
+        "link": cc_data.get("url", ""),
+        "summary": cc_data.get("text", "")[:SUMMARY_CHARS],
+        "published": (cc_data.get("published") or cc_data.get("timestamp")
+                      or datetime.now().isoformat()),
+        "source": f"common_crawl:{cc_data.get('domain', '')}"
+    }
+
+class RawEmitter:
+    """Entrega artículos de Common Crawl al almacén raw"""
+
+    def __init__(self, raw_store=None, seen=None):
+        # "is None": un almacén o un SeenLinks vacío también es falso
+        self.raw_store = raw_store if raw_store is not None else ArticleStore(RAW_STORE_DIR)
+        self.seen = seen if seen is not None else SeenLinks(SEEN_FILE)
+
+    def is_known(self, url):
+        """True si el enlace ya se entregó alguna vez"""
+        return link_digest(url) in self.seen or record_key(url) in self.raw_store
 
-def sync_commoncrawl_to_pipeline():
+    def emit(self, articles):
+        """
+        Agrega al almacén raw los artículos nuevos y avisa al procesador.
+        Los enlaces se reclaman bajo el flock de SeenLinks y se guardan
+        antes de soltarlo, así que dos emisores (el ciclo y la importación,
+        o dos pods) no guardan el mismo enlace.
+        """
+        by_digest = {link_digest(a["url"]): a for a in articles}
+        with self.seen.claim(list(by_digest)) as fresh:
+            # Los guardados antes de que existiera SeenLinks solo están en raw
+            self.raw_store.refresh()
+            items = [(record_key(a["url"]), to_raw(a), today())
+                     for a in (by_digest[d] for d in fresh)
+                     if record_key(a["url"]) not in self.raw_store]
+            written = self.raw_store.append_many(items)
+
+        if written > 0:
+            events.publish("raw")
+        return written
+
+def load_watermark():
+    """(mtime_ns, nombres ya importados con ese mtime)"""
+    try:
+        with open(WATERMARK_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("mtime_ns", 0), set(data.get("names", []))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0, set()
+
+def save_watermark(mtime_ns, names):
+    tmp = f"{WATERMARK_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"mtime_ns": mtime_ns, "names": sorted(names)}, f)
+    os.replace(tmp, WATERMARK_FILE)
+
+def sync_commoncrawl_to_pipeline(emitter=None):
     """
-    Copia artículos de Common Crawl al directorio raw
-    para que el pipeline existente los procese
+    Importa los cc_*.json más nuevos que la marca de agua.
+    Solo se leen los archivos nuevos; el resto se descarta por su stat.
     """
-    cc_files = [f for f in os.listdir(CC_DIR) 
-                if f.startswith('cc_') and f.endswith('.json')]
-    
-    copied = 0
-    
-    for filename in cc_files:
-        cc_path = os.path.join(CC_DIR, filename)
-        raw_path = os.path.join(RAW_DIR, filename)
-        
-        if not os.path.exists(raw_path):
+    if not os.path.isdir(CC_DIR):
+        return 0
+
+    emitter = emitter or RawEmitter()
+    watermark, watermark_names = load_watermark()
+    newest, newest_names = watermark, set(watermark_names)
+
+    articles = []
+    with os.scandir(CC_DIR) as entries:
+        for entry in entries:
+            if not (entry.name.startswith('cc_') and entry.name.endswith('.json')):
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            # Con el mismo mtime que la marca puede haber archivos nuevos
+            if mtime_ns < watermark or (mtime_ns == watermark and entry.name in watermark_names):
+                continue
             try:
-                # Leer datos de Common Crawl
-                with open(cc_path, 'r', encoding='utf-8') as f:
+                with open(entry.path, 'r', encoding='utf-8') as f:
                     cc_data = json.load(f)
-                
-                # Adaptar formato para pipeline existente
-                raw_data = {
-                    "title": cc_data.get("title", ""),
-                    "link": cc_data.get("url", ""),
-                    "summary": cc_data.get("text", "")[:500],  # Resumen
-                    "published": cc_data.get("timestamp", datetime.now().isoformat()),
-                    "source": f"common_crawl:{cc_data.get('domain', '')}"
-                }
-                
-                # Guardar en formato del pipeline
-                with open(raw_path, 'w', encoding='utf-8') as f:
-                    json.dump(raw_data, f, ensure_ascii=False, indent=2)
-                
-                copied += 1
-                
+                if cc_data.get("url"):
+                    articles.append(cc_data)
+                if mtime_ns > newest:
+                    newest, newest_names = mtime_ns, set()
+                if mtime_ns == newest:
+                    newest_names.add(entry.name)
             except Exception as e:
-                print(f"Error copiando {filename}: {e}")
-    
+                print(f"Error copiando {entry.name}: {e}")
+
+    copied = emitter.emit(articles) if articles else 0
+    if (newest, newest_names) != (watermark, watermark_names):
+        save_watermark(newest, newest_names)
+
     if copied > 0:
         print(f"✅ Sincronizados {copied} artículos de Common Crawl al pipeline")
+    return copied
 
 if __name__ == "__main__":
-    import time
-    while True:
-        sync_commoncrawl_to_pipeline()
-        time.sleep(3600)  # Cada hora
\ No newline at end of file
+    sync_commoncrawl_to_pipeline()
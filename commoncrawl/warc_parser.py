@@ -0,0 +1,192 @@
+"""
+Lectura de registros WARC y respuestas HTTP directamente sobre bytes.
+
+- Los registros se delimitan con su Content-Length, así que un rango con
+  varios registros (o con un registro truncado) se recorre sin partir
+  el texto completo por separadores.
+- Los cuerpos con Transfer-Encoding: chunked se reensamblan, y los que
+  traen Content-Encoding gzip/deflate se descomprimen.
+- El charset sale del Content-Type, de un BOM o de la etiqueta <meta>;
+  el cuerpo se decodifica por ventanas (iter_decoded) y el extractor
+  pide la siguiente solo si todavía necesita texto.
+"""
+import re
+import zlib
+import codecs
+from collections import namedtuple
+
+WarcRecord = namedtuple("WarcRecord", ["headers", "content"])
+HttpResponse = namedtuple("HttpResponse", ["status", "headers", "body"])
+
+# Cuántos bytes del inicio del HTML se revisan buscando <meta charset>
+META_SCAN_BYTES = 4096
+
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w:.-]+)""", re.I)
+CONTENT_TYPE_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w:.-]+)""", re.I)
+
+# Los navegadores decodifican estas etiquetas como windows-1252
+CHARSET_ALIASES = {
+    "iso-8859-1": "cp1252",
+    "latin1": "cp1252",
+    "latin-1": "cp1252",
+    "us-ascii": "cp1252",
+    "ascii": "cp1252",
+}
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+def _split_head(data, start=0):
+    """Posición del fin de un bloque de cabeceras y del inicio del cuerpo"""
+    end = data.find(b"\r\n\r\n", start)
+    if end >= 0:
+        return end, end + 4
+    end = data.find(b"\n\n", start)
+    if end >= 0:
+        return end, end + 2
+    return len(data), len(data)
+
+def parse_headers(block):
+    """Primera línea y cabeceras (en minúsculas) de un bloque en bytes"""
+    lines = bytes(block).decode("latin-1").splitlines()
+    first = lines[0].strip() if lines else ""
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return first, headers
+
+def iter_records(data):
+    """Registros WARC contenidos en `data` (bytes ya descomprimidos)"""
+    view = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        if not data.startswith(b"WARC/", pos):
+            # Saltar separadores o basura hasta el siguiente registro
+            nxt = data.find(b"WARC/", pos)
+            if nxt < 0:
+                return
+            pos = nxt
+
+        head_end, body_start = _split_head(data, pos)
+        _, headers = parse_headers(view[pos:head_end])
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            length = len(data) - body_start
+
+        # Un registro truncado entrega lo que haya
+        body_end = min(body_start + length, len(data))
+        yield WarcRecord(headers, view[body_start:body_end])
+        pos = body_end
+
+def dechunk(body):
+    """Reensambla un cuerpo con Transfer-Encoding: chunked"""
+    out = bytearray()
+    pos = 0
+    while pos < len(body):
+        line_end = body.find(b"\r\n", pos)
+        if line_end < 0:
+            break
+        size_text = bytes(body[pos:line_end]).split(b";", 1)[0].strip()
+        try:
+            size = int(size_text, 16)
+        except ValueError:
+            # No era realmente chunked: devolver el original
+            return bytes(body)
+        if size == 0:
+            break
+        start = line_end + 2
+        out += body[start:start + size]
+        pos = start + size + 2
+    return bytes(out)
+
+def decompress(body, encoding):
+    """Quita Content-Encoding gzip/deflate; si falla, deja el cuerpo igual"""
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+    except zlib.error:
+        pass
+    return body
+
+def parse_http_response(payload):
+    """Separa estado, cabeceras y cuerpo (bytes) de una respuesta HTTP"""
+    payload = bytes(payload)
+    head_end, body_start = _split_head(payload)
+    first, headers = parse_headers(payload[:head_end])
+
+    parts = first.split()
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+    body = payload[body_start:]
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        body = dechunk(body)
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding:
+        body = decompress(body, encoding)
+
+    return HttpResponse(status, headers, body)
+
+def normalize_charset(name):
+    """Nombre de codec válido para Python, o None"""
+    if not name:
+        return None
+    name = name.strip().strip("\"'").lower()
+    name = CHARSET_ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def detect_charset(headers, body):
+    """Charset por BOM, Content-Type o <meta>; UTF-8 si no se declara"""
+    for bom, charset in BOMS:
+        if body.startswith(bom):
+            return charset
+
+    match = CONTENT_TYPE_CHARSET_RE.search(headers.get("content-type", ""))
+    if match:
+        charset = normalize_charset(match.group(1))
+        if charset:
+            return charset
+
+    match = META_CHARSET_RE.search(body[:META_SCAN_BYTES])
+    if match:
+        charset = normalize_charset(match.group(1).decode("ascii", "ignore"))
+        if charset:
+            return charset
+
+    return "utf-8"
+
+def iter_decoded(body, charset, window=32 * 1024):
+    """
+    El cuerpo decodificado de `window` en `window` bytes. Cada trozo es
+    solo lo nuevo (no el prefijo acumulado): quien deja de pedirlos no
+    decodifica el resto.
+    """
+    decoder = codecs.getincrementaldecoder(charset)(errors="ignore")
+    if charset == "utf-8" and body.startswith(codecs.BOM_UTF8):
+        body = body[len(codecs.BOM_UTF8):]
+
+    view = memoryview(body)
+    for start in range(0, len(body), window):
+        chunk = decoder.decode(view[start:start + window], final=start + window >= len(body))
+        if chunk:
+            yield chunk
+
+def first_response(data):
+    """Primera respuesta HTTP de los registros WARC 'response', o None"""
+    for record in iter_records(data):
+        if record.headers.get("warc-type", "response") == "response":
+            return parse_http_response(record.content)
+    return None
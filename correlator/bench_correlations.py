@@ -0,0 +1,85 @@
+"""
+Benchmark del motor de correlaciones.
+
+Compara el cálculo anterior (listas día a día y un np.corrcoef por tema,
+solo rezago 0) con correlation_engine sobre datos sintéticos de varios
+años y cientos de temas, y verifica que la correlación del mismo día
+coincida.
+
+Uso: python bench_correlations.py [dias] [temas] [max_rezago]
+"""
+import sys
+import time
+import numpy as np
+from datetime import date, timedelta
+
+from correlation_engine import build_matrix, lag_profile, correlate
+
+def legacy_correlations(news_data, colcap_data, topics):
+    """calculate_correlations original (solo Pearson, mismo día)"""
+    common_dates = sorted(set(news_data) & set(colcap_data))
+    colcap_changes, valid_dates = [], []
+    for i in range(1, len(common_dates)):
+        prev_value = colcap_data[common_dates[i - 1]]
+        curr_value = colcap_data[common_dates[i]]
+        if prev_value > 0:
+            colcap_changes.append((curr_value - prev_value) / prev_value * 100)
+            valid_dates.append(common_dates[i])
+
+    correlations = {}
+    for topic in topics:
+        topic_counts = [news_data.get(d, {}).get(topic, 0) for d in valid_dates]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = np.corrcoef(topic_counts, colcap_changes)[0, 1]
+        correlations[topic] = 0.0 if np.isnan(correlation) else float(correlation)
+    return correlations
+
+def synthetic_data(n_days, n_topics, seed=42):
+    rng = np.random.default_rng(seed)
+    start = date(2022, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(n_days)]
+    topics = [f"tema_{j:03d}" for j in range(n_topics)]
+    rates = rng.uniform(0.2, 6, n_topics)
+
+    news_data = {}
+    for day in days:
+        if rng.random() < 0.95:
+            counts = rng.poisson(rates)
+            news_data[day] = {t: int(c) for t, c in zip(topics, counts) if c}
+
+    colcap_data = {}
+    value = 1500.0
+    for day in days:
+        if date.fromisoformat(day).weekday() < 5:
+            value *= 1 + rng.normal(0, 0.01)
+            colcap_data[day] = value
+
+    return news_data, colcap_data, topics
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    n_days = int(sys.argv[1]) if len(sys.argv) > 1 else 1100
+    n_topics = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    max_lag = int(sys.argv[3]) if len(sys.argv) > 3 else 7
+
+    news_data, colcap_data, topics = synthetic_data(n_days, n_topics)
+    print(f"📊 {n_days} días × {n_topics} temas, rezagos ±{max_lag}\n")
+
+    t_legacy, legacy = timed(legacy_correlations, news_data, colcap_data, topics)
+    t_build, matrix = timed(build_matrix, news_data, colcap_data, topics)
+    t_lags, _ = timed(lag_profile, matrix, max_lag)
+    t_total, result = timed(correlate, news_data, colcap_data, max_lag, topics)
+
+    diff = max(abs(result["correlations"][t] - legacy[t]) for t in topics)
+    print(f"   - Original (Pearson, rezago 0):     {t_legacy * 1e3:.1f} ms")
+    print(f"   - Matriz días × temas:              {t_build * 1e3:.1f} ms")
+    print(f"   - Pearson + Spearman, {2 * max_lag + 1} rezagos:    {t_lags * 1e3:.1f} ms")
+    print(f"   - correlate() completo:             {t_total * 1e3:.1f} ms")
+    print(f"   - Diferencia máxima en rezago 0:    {diff:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Motor de correlaciones vectorizado.
+
+Los conteos diarios se llevan a una matriz días × temas sobre el
+calendario completo, y la variación del COLCAP a un vector alineado con
+los días en que hay cierre y noticias (las mismas fechas que usaba el
+cálculo anterior). Para cada rezago k se toman de una vez las filas
+"día del retorno - k" de la matriz y se calculan Pearson y Spearman de
+todos los temas con operaciones de matriz.
+
+Convención de rezagos: k > 0 significa que las noticias van k días
+antes que el mercado; k < 0, que van después. k = 0 reproduce la
+correlación del mismo día que se calculaba antes.
+"""
+import numpy as np
+from datetime import date
+
+# Tamaño máximo (valores distintos × temas) del histograma para rangos por conteo
+COUNTING_RANK_LIMIT = 5_000_000
+
+def day_number(iso_day):
+    """Días desde 0001-01-01 de una fecha YYYY-MM-DD"""
+    return date.fromisoformat(iso_day).toordinal()
+
+def build_matrix(news_data, colcap_data, topics=None):
+    """
+    Devuelve un dict con:
+      topics       lista de temas (columnas)
+      counts       matriz (días del calendario × temas)
+      present      bool por día del calendario: hay conteos ese día
+      first_day    ordinal del primer día del calendario
+      dates        fechas de los retornos
+      returns      variación % del COLCAP en esas fechas
+      rows         fila del calendario de cada fecha de retorno
+    """
+    if topics is None:
+        topics = sorted({t for counts in news_data.values() for t in counts})
+    column = {topic: j for j, topic in enumerate(topics)}
+
+    news_days = [day_number(d) for d in news_data]
+    first_day = min(news_days)
+    n_days = max(news_days) - first_day + 1
+
+    counts = np.zeros((n_days, len(topics)))
+    present = np.zeros(n_days, dtype=bool)
+    for day, ordinal in zip(news_data, news_days):
+        row = ordinal - first_day
+        present[row] = True
+        for topic, count in news_data[day].items():
+            j = column.get(topic)
+            if j is not None:
+                counts[row, j] = count
+
+    # Retornos entre fechas comunes consecutivas, como antes
+    common = sorted(set(news_data) & set(colcap_data))
+    values = np.array([colcap_data[d] for d in common], dtype=float)
+    prev, curr = values[:-1], values[1:]
+    valid = prev > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = ((curr - prev) / prev * 100)[valid]
+    dates = [d for d, ok in zip(common[1:], valid) if ok]
+    rows = np.array([day_number(d) - first_day for d in dates], dtype=int)
+
+    return {
+        "topics": topics,
+        "counts": counts,
+        "present": present,
+        "first_day": first_day,
+        "dates": dates,
+        "returns": returns,
+        "rows": rows,
+    }
+
+def count_ranks(values, width):
+    """
+    Rangos promedio de cada columna de una matriz de enteros en [0, width),
+    por histograma y sin ordenar: rango = menores + (iguales + 1) / 2.
+    """
+    m = values.shape[1]
+    flat = values + np.arange(m) * width
+    hist = np.bincount(flat.ravel(), minlength=m * width)
+    less = np.cumsum(hist.reshape(m, width), axis=1).ravel() - hist
+    return less[flat] + (hist[flat] + 1) / 2
+
+def integer_width(x):
+    """max + 1 si x son enteros no negativos aptos para count_ranks; si no, None"""
+    if x.size == 0 or x.min() < 0:
+        return None
+    width = int(x.max()) + 1
+    if width * x.shape[1] > COUNTING_RANK_LIMIT or not np.array_equal(x, np.floor(x)):
+        return None
+    return width
+
+def rank_columns(x):
+    """Rangos promedio (empates incluidos) de cada columna, vectorizado"""
+    n, m = x.shape
+    if n == 0:
+        return x.astype(float)
+
+    # Conteos enteros pequeños: rangos por histograma, sin ordenar
+    width = integer_width(x)
+    if width is not None:
+        return count_ranks(x.astype(np.int64), width)
+
+    order = np.argsort(x, axis=0, kind="mergesort")
+    sorted_x = np.take_along_axis(x, order, axis=0)
+
+    # Grupos de empates: un grupo nuevo donde cambia el valor o empieza columna
+    new_group = np.ones((n, m), dtype=bool)
+    new_group[1:] = sorted_x[1:] != sorted_x[:-1]
+    group = np.cumsum(new_group.T.ravel()) - 1
+
+    ordinal = np.tile(np.arange(1, n + 1, dtype=float), m)
+    mean_rank = np.bincount(group, weights=ordinal) / np.bincount(group)
+
+    ranks = np.empty((n, m))
+    np.put_along_axis(ranks, order, mean_rank[group].reshape(m, n).T, axis=0)
+    return ranks
+
+def pearson_columns(x, y):
+    """Pearson de cada columna de x contra y; 0.0 si no hay variación"""
+    if len(y) < 2:
+        return np.zeros(x.shape[1])
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean()
+    denom = np.sqrt((xc * xc).sum(axis=0) * (yc @ yc))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (yc @ xc) / denom
+    return np.nan_to_num(r, nan=0.0, posinf=0.0, neginf=0.0)
+
+def lag_rows(matrix, lag):
+    """
+    Filas del calendario con los conteos de cada retorno para un rezago,
+    y la máscara de retornos que tienen conteos ese día
+    """
+    present, rows = matrix["present"], matrix["rows"]
+    source = rows - lag
+    ok = (source >= 0) & (source < len(present))
+    ok[ok] = present[source[ok]]
+    return source[ok], ok
+
+def lag_arrays(matrix, lag, columns=None):
+    """(x, y) alineados para un rezago: conteos (n × temas) y retornos (n)"""
+    source, ok = lag_rows(matrix, lag)
+    x = matrix["counts"][source]
+    if columns is not None:
+        x = x[:, columns]
+    return x, matrix["returns"][ok]
+
+def lag_profile(matrix, max_lag=0):
+    """
+    Pearson y Spearman de todos los temas para los rezagos -max_lag..max_lag.
+    Devuelve (lags, pearson[lags × temas], spearman[lags × temas], n[lags]).
+    """
+    counts, returns = matrix["counts"], matrix["returns"]
+    lags = list(range(-max_lag, max_lag + 1))
+
+    pearson = np.zeros((len(lags), counts.shape[1]))
+    spearman = np.zeros_like(pearson)
+    sizes = []
+
+    # Los conteos son enteros: se convierten una sola vez para count_ranks
+    width = integer_width(counts)
+    int_counts = counts.astype(np.int64) if width is not None else None
+
+    for i, lag in enumerate(lags):
+        source, ok = lag_rows(matrix, lag)
+        x = counts[source]
+        y = returns[ok]
+        sizes.append(len(y))
+
+        pearson[i] = pearson_columns(x, y)
+        if len(y) == 0:
+            continue
+        x_ranks = (count_ranks(int_counts[source], width) if width is not None
+                   else rank_columns(x))
+        spearman[i] = pearson_columns(x_ranks, rank_columns(y[:, None])[:, 0])
+
+    return lags, pearson, spearman, sizes
+
+def correlate(news_data, colcap_data, max_lag=0, topics=None):
+    """
+    Calcula el perfil de rezagos completo. Devuelve un dict listo para
+    guardar en correlations_latest.json (ver save_results).
+    """
+    return correlate_matrix(build_matrix(news_data, colcap_data, topics), max_lag)
+
+def correlate_matrix(matrix, max_lag=0):
+    """Como correlate, sobre una matriz ya construida con build_matrix"""
+    lags, pearson, spearman, sizes = lag_profile(matrix, max_lag)
+    topics = matrix["topics"]
+    zero = lags.index(0)
+
+    best_lag = {}
+    for j, topic in enumerate(topics):
+        # Rezago con la correlación de Pearson más fuerte (con al menos 3 pares)
+        usable = [i for i, n in enumerate(sizes) if n >= 3] or [zero]
+        i = max(usable, key=lambda i: abs(pearson[i, j]))
+        best_lag[topic] = {
+            "lag": lags[i],
+            "pearson": float(pearson[i, j]),
+            "spearman": float(spearman[i, j]),
+        }
+
+    return {
+        "dates": matrix["dates"],
+        "returns": matrix["returns"].tolist(),
+        "correlations": {t: float(pearson[zero, j]) for j, t in enumerate(topics)},
+        "spearman": {t: float(spearman[zero, j]) for j, t in enumerate(topics)},
+        "lag_profile": {
+            "lags": lags,
+            "observations": sizes,
+            "pearson": {t: pearson[:, j].round(6).tolist() for j, t in enumerate(topics)},
+            "spearman": {t: spearman[:, j].round(6).tolist() for j, t in enumerate(topics)},
+        },
+        "best_lag": best_lag,
+    }
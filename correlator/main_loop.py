@@ -2,8 +2,14 @@ import os
 import json
 import time
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
+from common import events
+from common import metrics
+from correlation_engine import build_matrix, correlate_matrix, lag_arrays
+from significance import test_correlations, benjamini_hochberg, ALPHA
+from results_store import ResultsStore
+import rolling
 
 ANALYSIS_DIR = "/app/data/analysis"
 ECONOMIC_DIR = "/app/data/economic"
@@ -11,6 +17,23 @@ RESULTS_DIR = "/app/data/results"
 
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Historial de ejecuciones y correlations_latest.json para el dashboard
+results_store = ResultsStore(RESULTS_DIR)
+
+# Temas que siempre se reportan (en este orden); los demás del analizador van después
+TOPICS = ["economia", "seguridad", "politica", "salud"]
+
+ROLLING_STATE_FILE = os.path.join(RESULTS_DIR, "rolling_state.json")
+ROLLING_FILE = os.path.join(RESULTS_DIR, "rolling_correlations.json")
+
+# Métricas en /metrics (METRICS_PORT)
+cycle = metrics.track_cycle("correlator")
+SIGNIFICANCE_SECONDS = metrics.Histogram("correlator_significance_seconds",
+                                         "Duración de las pruebas de significancia")
+
+# Rezagos evaluados: de -MAX_LAG a +MAX_LAG días
+MAX_LAG = int(os.getenv("CORRELATION_MAX_LAG", 7))
+
 def load_news_data():
     """Carga los conteos diarios de noticias por tema"""
     daily_counts_file = os.path.join(ANALYSIS_DIR, "daily_counts.json")
@@ -25,6 +48,26 @@ def load_news_data():
     print(f"✅ Cargados datos de noticias: {len(data)} días")
     return data
 
+def load_topic_scores(news_data):
+    """
+    Puntajes diarios por tema del motor de clasificación del analizador
+    (daily_scores.json) y el origen de la serie ("<motor>:<firma>"). Con
+    el motor de palabras clave coinciden con los conteos; si no existen
+    (analizador anterior) se usan los conteos.
+    """
+    daily_scores_file = os.path.join(ANALYSIS_DIR, "daily_scores.json")
+    classifier_file = os.path.join(ANALYSIS_DIR, "classifier.json")
+    
+    try:
+        with open(daily_scores_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with open(classifier_file, "r", encoding="utf-8") as f:
+            classifier = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return news_data, "counts"
+    
+    return data, f"{classifier['engine']}:{classifier['signature']}"
+
 def load_colcap_data():
     """Carga los datos históricos del COLCAP"""
     historical_file = os.path.join(ECONOMIC_DIR, "colcap_historical.json")
@@ -42,88 +85,140 @@ def load_colcap_data():
     print(f"✅ Cargados datos COLCAP: {len(colcap_by_date)} días")
     return colcap_by_date
 
-def calculate_correlations(news_data, colcap_data):
+@cycle
+def calculate_correlations(series, colcap_data, news_data):
     """
-    Calcula correlaciones entre temas de noticias y variación del COLCAP
+    Calcula correlaciones (Pearson y Spearman) entre la serie diaria por
+    tema (puntajes o conteos) y la variación del COLCAP, para todos los
+    rezagos de -MAX_LAG a +MAX_LAG
     """
     print(f"[{datetime.now()}] Calculando correlaciones...")
     
     # Obtener fechas comunes
-    news_dates = set(news_data.keys())
-    colcap_dates = set(colcap_data.keys())
-    common_dates = sorted(news_dates & colcap_dates)
+    common_dates = sorted(set(series.keys()) & set(colcap_data.keys()))
     
     if len(common_dates) < 2:
         print("⚠️  Insuficientes datos para correlación")
         return {}, []
     
-    print(f"📊 Analizando {len(common_dates)} días comunes")
+    print(f"📊 Analizando {len(common_dates)} días comunes (rezagos ±{MAX_LAG})")
+    cycle.count("days", len(common_dates))
     
-    # Preparar series de tiempo
-    topics = ["economia", "seguridad", "politica", "salud"]
+    topics = TOPICS + sorted({t for values in series.values() for t in values} - set(TOPICS))
+    matrix = build_matrix(series, colcap_data, topics)
+    analysis = correlate_matrix(matrix, MAX_LAG)
+    valid_dates = analysis["dates"]
     
-    # Calcular variación porcentual del COLCAP
-    colcap_changes = []
-    valid_dates = []
+    if len(valid_dates) < 2:
+        print("⚠️  Insuficientes variaciones del COLCAP para correlación")
+        return {}, []
     
-    for i in range(1, len(common_dates)):
-        prev_date = common_dates[i-1]
-        curr_date = common_dates[i]
-        
-        prev_value = colcap_data[prev_date]
-        curr_value = colcap_data[curr_date]
-        
-        if prev_value > 0:
-            change_pct = ((curr_value - prev_value) / prev_value) * 100
-            colcap_changes.append(change_pct)
-            valid_dates.append(curr_date)
+    with SIGNIFICANCE_SECONDS.time():
+        analysis["significance"] = assess_significance(matrix, analysis)
+    
+    # Generar insights
+    insights = generate_insights(analysis["correlations"], news_data, colcap_data, valid_dates,
+                                 analysis["best_lag"], analysis["significance"])
     
-    # Calcular correlaciones por tema
-    correlations = {}
+    return analysis, insights
+
+def assess_significance(matrix, analysis):
+    """
+    p-valores (permutación), intervalos (bootstrap por bloques) y q-valores
+    de las correlaciones del mismo día; p-valores del mejor rezago de cada
+    tema, corregidos por la cantidad de rezagos revisados (Bonferroni)
+    """
+    topics = matrix["topics"]
+    samples = {0: (*lag_arrays(matrix, 0), topics, True)}
     
+    # Temas agrupados por su mejor rezago distinto de 0
+    by_lag = defaultdict(list)
+    for j, topic in enumerate(topics):
+        lag = analysis["best_lag"][topic]["lag"]
+        if lag != 0:
+            by_lag[lag].append(j)
+    for lag, columns in by_lag.items():
+        samples[lag] = (*lag_arrays(matrix, lag, columns), [topics[j] for j in columns], False)
+    
+    start = time.time()
+    report = test_correlations(samples)
+    same_day = report[0]
+    
+    tested = [t for t in topics if same_day[t]["p_value"] is not None]
+    for topic, q in zip(tested, benjamini_hochberg([same_day[t]["p_value"] for t in tested])):
+        same_day[topic]["q_value"] = round(float(q), 6)
     for topic in topics:
-        topic_counts = []
-        
-        for date in valid_dates:
-            count = news_data.get(date, {}).get(topic, 0)
-            topic_counts.append(count)
-        
-        # Calcular correlación de Pearson
-        if len(topic_counts) > 1 and len(colcap_changes) > 1:
-            correlation = np.corrcoef(topic_counts, colcap_changes)[0, 1]
-            
-            # Manejar NaN (cuando no hay variación)
-            if np.isnan(correlation):
-                correlation = 0.0
-            
-            correlations[topic] = float(correlation)
+        same_day[topic].setdefault("q_value", None)
+        same_day[topic]["significant"] = (same_day[topic]["q_value"] is not None
+                                          and same_day[topic]["q_value"] < ALPHA)
     
-    # Generar insights
-    insights = generate_insights(correlations, news_data, colcap_data, valid_dates)
+    n_lags = len(analysis["lag_profile"]["lags"])
+    for lag, columns in by_lag.items():
+        for topic, result in report[lag].items():
+            p = result["p_value"]
+            best = analysis["best_lag"][topic]
+            best["p_value"] = p
+            best["p_adjusted"] = None if p is None else min(1.0, round(p * n_lags, 6))
+    
+    sample = same_day[topics[0]]
+    print(f"🎲 Significancia: {sample['permutations']} permutaciones, {sample['bootstraps']} "
+          f"remuestreos bootstrap, {sum(same_day[t]['significant'] for t in topics)} temas "
+          f"significativos ({time.time() - start:.1f}s)")
     
-    return correlations, insights
+    return same_day
 
-def generate_insights(correlations, news_data, colcap_data, dates):
-    """Genera insights interpretables de las correlaciones"""
+def generate_insights(correlations, news_data, colcap_data, dates, best_lag=None, significance=None):
+    """
+    Genera insights interpretables de las correlaciones. Solo se reportan
+    las que son estadísticamente significativas (q-valor < ALPHA)
+    """
     insights = []
+    significance = significance or {}
     
     for topic, corr in correlations.items():
-        if abs(corr) > 0.3:  # Correlación significativa
+        test = significance.get(topic, {})
+        if test.get("significant"):
             direction = "positiva" if corr > 0 else "negativa"
-            strength = "fuerte" if abs(corr) > 0.7 else "moderada"
+            strength = "fuerte" if abs(corr) > 0.7 else "moderada" if abs(corr) > 0.3 else "débil"
             
             insight_text = (
-                f"Correlación {strength} {direction} ({corr:.3f}). "
-                f"Las noticias de {topic} {'aumentan' if corr > 0 else 'disminuyen'} "
+                f"Correlación {strength} {direction} ({corr:.3f}, p={test['p_value']:.3f}"
+                + (f", IC {1 - ALPHA:.0%}: {test['ci_low']:.2f} a {test['ci_high']:.2f}" if test["ci_low"] is not None else "")
+                + f"). Las noticias de {topic} {'aumentan' if corr > 0 else 'disminuyen'} "
                 f"cuando el COLCAP sube."
             )
             
             insights.append({
                 "topic": topic,
                 "correlation": corr,
+                "p_value": test["p_value"],
+                "q_value": test["q_value"],
+                "ci": [test["ci_low"], test["ci_high"]],
                 "insight": insight_text
             })
     
+    # Rezagos donde la relación es más fuerte que el mismo día
+    for topic, best in (best_lag or {}).items():
+        lag, corr = best["lag"], best["pearson"]
+        p_adjusted = best.get("p_adjusted")
+        if lag != 0 and p_adjusted is not None and p_adjusted < ALPHA and abs(corr) > abs(correlations.get(topic, 0)):
+            timing = f"antes que el COLCAP ({lag} días)" if lag > 0 else f"después del COLCAP ({-lag} días)"
+            insights.append({
+                "topic": topic,
+                "correlation": corr,
+                "lag": lag,
+                "p_value": p_adjusted,
+                "insight": (f"La relación más fuerte ({corr:.3f}, p ajustado={p_adjusted:.3f}) aparece "
+                            f"cuando las noticias de {topic} van {timing}.")
+            })
+    
+    if significance and not insights:
+        insights.append({
+            "topic": "general",
+            "insight": (f"Ninguna correlación es estadísticamente significativa con {len(dates)} "
+                        f"días de datos (α={ALPHA}).")
+        })
+    
     # Insight sobre período
     if dates:
         avg_news = np.mean([sum(news_data.get(d, {}).values()) for d in dates])
@@ -134,37 +229,34 @@ def generate_insights(correlations, news_data, colcap_data, dates):
     
     return insights
 
-def save_results(correlations, insights, dates):
+def save_results(analysis, insights, dates, source="counts"):
     """Guarda los resultados del análisis"""
+    correlations = analysis["correlations"]
     results = {
         "timestamp": datetime.now().isoformat(),
         "correlations": correlations,
+        "spearman": analysis["spearman"],
         "insights": insights,
         "period": {
             "start": dates[0] if dates else None,
             "end": dates[-1] if dates else None,
             "days": len(dates)
-        }
+        },
+        # Perfil por rezago: lags[i] > 0 = noticias antes que el mercado
+        "lag_profile": analysis["lag_profile"],
+        "best_lag": analysis["best_lag"],
+        # p-valor, intervalo de confianza y q-valor de cada correlación del mismo día
+        "significance": analysis.get("significance", {}),
+        # Serie de noticias usada: puntajes de un clasificador o conteos
+        "source": source
     }
     
-    # Guardar con timestamp
-    timestamp_file = os.path.join(
-        RESULTS_DIR, 
-        f"correlations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    )
-    
-    with open(timestamp_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    
-    # Guardar versión "latest" para el dashboard
-    latest_file = os.path.join(RESULTS_DIR, "correlations_latest.json")
-    
-    with open(latest_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # Una línea más en el historial y la versión "latest" para el dashboard
+    results_store.append(results)
     
     print(f"✅ Resultados guardados:")
-    print(f"   - {timestamp_file}")
-    print(f"   - {latest_file}")
+    print(f"   - {results_store.history_path}")
+    print(f"   - {results_store.latest_path}")
     
     # Mostrar resumen
     print(f"\n📊 Resumen de correlaciones:")
@@ -172,18 +264,26 @@ def save_results(correlations, insights, dates):
         emoji = "📈" if corr > 0 else "📉"
         print(f"   {emoji} {topic}: {corr:.3f}")
 
-def cleanup_old_results(days_to_keep=30):
-    """Limpia resultados antiguos para ahorrar espacio"""
-    cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+def update_rolling(analysis, series, source="counts"):
+    """Agrega los días nuevos a las correlaciones móviles y guarda la serie"""
+    topics = list(analysis["correlations"].keys())
+    state = rolling.load(ROLLING_STATE_FILE, topics, source=source)
     
-    for filename in os.listdir(RESULTS_DIR):
-        if filename.startswith("correlations_") and filename != "correlations_latest.json":
-            filepath = os.path.join(RESULTS_DIR, filename)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-            
-            if file_mtime < cutoff_date:
-                os.remove(filepath)
-                print(f"🗑️  Eliminado: {filename}")
+    added = state.update(series, analysis["dates"], analysis["returns"])
+    
+    if added or not os.path.exists(ROLLING_FILE):
+        rolling.save(state, ROLLING_STATE_FILE, ROLLING_FILE)
+        print(f"📈 Correlaciones móviles ({', '.join(f'{w}d' for w in state.windows)}): "
+              f"{added} días nuevos, hasta {state.last_day}")
+
+def import_legacy_results():
+    """Pasa al historial los correlations_<fecha>.json de versiones anteriores"""
+    paths = [os.path.join(RESULTS_DIR, name) for name in os.listdir(RESULTS_DIR)
+             if name.startswith("correlations_") and name.endswith(".json")
+             and name != "correlations_latest.json"]
+    imported = results_store.import_files(paths) if paths else 0
+    if imported:
+        print(f"📦 {imported} resultados anteriores importados al historial")
 
 def main():
     """Loop principal del correlador"""
@@ -192,6 +292,13 @@ def main():
     print("🚀 Iniciando correlador de datos...")
     print(f"⏱️  Intervalo: {interval} segundos ({interval/3600:.1f} horas)\n")
     
+    # Conteos nuevos del analizador despiertan al correlador antes del intervalo
+    analysis_events = events.Subscription("analysis")
+    
+    metrics.serve()
+    
+    import_legacy_results()
+    
     while True:
         try:
             # Cargar datos
@@ -201,24 +308,26 @@ def main():
             if not news_data or not colcap_data:
                 print("⚠️  Esperando datos suficientes...")
             else:
-                # Calcular correlaciones
-                correlations, insights = calculate_correlations(news_data, colcap_data)
+                # Correlacionar los puntajes del clasificador (o los conteos)
+                series, source = load_topic_scores(news_data)
+                analysis, insights = calculate_correlations(series, colcap_data, news_data)
                 
                 # Guardar resultados
-                if correlations:
-                    dates = sorted(set(news_data.keys()) & set(colcap_data.keys()))
-                    save_results(correlations, insights, dates)
+                if analysis:
+                    dates = sorted(set(series.keys()) & set(colcap_data.keys()))
+                    save_results(analysis, insights, dates, source)
+                    update_rolling(analysis, series, source)
                     
-                    # Limpiar archivos antiguos
-                    cleanup_old_results()
+                    # Adelgazar el historial antiguo
+                    results_store.downsample()
             
         except Exception as e:
             print(f"❌ Error en ciclo principal: {e}")
             import traceback
             traceback.print_exc()
         
-        print(f"\n💤 Esperando {interval} segundos...\n")
-        time.sleep(interval)
+        print(f"\n💤 Esperando nuevos conteos (máx. {interval} segundos)...\n")
+        analysis_events.wait(interval)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
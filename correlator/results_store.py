@@ -0,0 +1,225 @@
+"""
+Historial de resultados del correlador en un solo archivo de solo anexado.
+
+Reemplaza el correlations_YYYYMMDD_HHMMSS.json que se escribía en cada
+ciclo. En data/results quedan:
+
+    correlations_history.jsonl  una línea JSON compacta por ejecución,
+                                en orden de timestamp
+    correlations_latest.json    la última ejecución, escrita en un
+                                temporal y renombrada (el dashboard nunca
+                                ve un archivo a medias)
+
+Como las líneas están ordenadas, una consulta por rango de fechas busca
+el inicio por bisección sobre los bytes del archivo y solo lee las
+líneas del rango.
+
+La retención no borra: adelgaza. Se conservan todas las ejecuciones de
+los últimos RESULTS_FULL_DAYS días, la última de cada día hasta
+RESULTS_DAILY_DAYS y la última de cada semana de ahí para atrás.
+"""
+import os
+import json
+import fcntl
+import shutil
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+FULL_DAYS = int(os.getenv("RESULTS_FULL_DAYS", 7))
+DAILY_DAYS = int(os.getenv("RESULTS_DAILY_DAYS", 90))
+
+HISTORY_FILE = "correlations_history.jsonl"
+LATEST_FILE = "correlations_latest.json"
+
+def as_timestamp(value):
+    """ISO del timestamp (acepta datetime o texto ISO)"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def encode(results):
+    return json.dumps(results, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+def bucket(timestamp, full_cutoff, daily_cutoff):
+    """Ejecuciones con el mismo balde se reducen a la última"""
+    if timestamp >= full_cutoff:
+        return timestamp
+    if timestamp >= daily_cutoff:
+        return timestamp[:10]
+    year, week, _ = datetime.fromisoformat(timestamp).isocalendar()
+    return f"{year}-W{week:02d}"
+
+class ResultsStore:
+    """Historial ordenado por timestamp más la última ejecución"""
+
+    def __init__(self, root):
+        self.root = root
+        self.history_path = os.path.join(root, HISTORY_FILE)
+        self.latest_path = os.path.join(root, LATEST_FILE)
+        self.lock_path = os.path.join(root, ".results.lock")
+
+        os.makedirs(root, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, results):
+        """Agrega una ejecución al historial y la publica como la última"""
+        with self._locked():
+            data = encode(results)
+            with open(self.history_path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                # Cerrar una línea que haya quedado a medias tras una caída
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+
+            tmp = f"{self.latest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.latest_path)
+
+    def latest(self):
+        """Última ejecución, sin recorrer el historial"""
+        try:
+            with open(self.latest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_line(f, pos):
+        """
+        (offset, registro) de la primera línea completa que empieza en
+        `pos` o después; (None, None) si no hay
+        """
+        f.seek(pos)
+        if pos > 0:
+            f.seek(pos - 1)
+            f.readline()
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                return None, None
+            try:
+                return offset, json.loads(line)
+            except ValueError:
+                continue
+
+    def _seek(self, f, size, timestamp):
+        """Offset de la primera línea con timestamp >= `timestamp` (bisección)"""
+        low, high = 0, size
+        while low < high:
+            mid = (low + high) // 2
+            offset, record = self._read_line(f, mid)
+            if offset is None or record["timestamp"] >= timestamp:
+                high = mid
+            else:
+                low = offset + 1
+        offset, _ = self._read_line(f, low)
+        return size if offset is None else offset
+
+    def range(self, start=None, end=None):
+        """Ejecuciones con start <= timestamp < end (en orden)"""
+        start, end = as_timestamp(start), as_timestamp(end)
+        try:
+            f = open(self.history_path, "rb")
+        except FileNotFoundError:
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(self._seek(f, size, start) if start else 0)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if end and record["timestamp"] >= end:
+                    break
+                yield record
+
+    def downsample(self, now=None, full_days=FULL_DAYS, daily_days=DAILY_DAYS):
+        """
+        Adelgaza la parte del historial anterior a `full_days`. Solo se
+        reescribe el archivo si hay algo que quitar; las líneas recientes
+        se copian sin decodificar. Devuelve las ejecuciones quitadas.
+        """
+        now = now or datetime.now()
+        full_cutoff = (now - timedelta(days=full_days)).isoformat()
+        daily_cutoff = (now - timedelta(days=daily_days)).isoformat()
+
+        with self._locked():
+            try:
+                f = open(self.history_path, "rb")
+            except FileNotFoundError:
+                return 0
+
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                boundary = self._seek(f, size, full_cutoff)
+
+                f.seek(0)
+                kept, total = {}, 0
+                while f.tell() < boundary:
+                    line = f.readline()
+                    try:
+                        timestamp = json.loads(line)["timestamp"]
+                    except (ValueError, KeyError):
+                        continue
+                    total += 1
+                    kept[bucket(timestamp, full_cutoff, daily_cutoff)] = line
+
+                removed = total - len(kept)
+                if not removed:
+                    return 0
+
+                tmp = f"{self.history_path}.tmp"
+                with open(tmp, "wb") as out:
+                    out.writelines(kept.values())
+                    f.seek(boundary)
+                    shutil.copyfileobj(f, out)
+                os.replace(tmp, self.history_path)
+
+        print(f"🗜️  Historial de resultados: {removed} ejecuciones antiguas adelgazadas")
+        return removed
+
+    def import_files(self, paths):
+        """
+        Incorpora archivos correlations_<fecha>.json sueltos al historial,
+        en orden de timestamp, y los elimina. Devuelve cuántos se importaron.
+        """
+        imported, loaded = {}, []
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                imported[record["timestamp"]] = record
+                loaded.append(path)
+            except (ValueError, KeyError, OSError) as e:
+                print(f"⚠️  No se pudo importar {os.path.basename(path)}: {e}")
+        if not loaded:
+            return 0
+
+        with self._locked():
+            # Si una importación anterior se cortó, el historial ya tiene algunas
+            records = {r["timestamp"]: r for r in self.range()}
+            records.update(imported)
+
+            tmp = f"{self.history_path}.tmp"
+            with open(tmp, "wb") as out:
+                out.writelines(encode(records[t]) for t in sorted(records))
+            os.replace(tmp, self.history_path)
+
+        for path in loaded:
+            os.remove(path)
+        return len(loaded)
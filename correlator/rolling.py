@@ -0,0 +1,229 @@
+"""
+Correlaciones móviles (7, 30, 90 días...) mantenidas de forma incremental.
+
+Por cada ventana se guardan las sumas n, Σx, Σy, Σxy, Σx², Σy² de todos
+los temas (x = conteo del día, y = variación % del COLCAP). Agregar un
+día suma su observación y resta las que salen de la ventana, así que el
+costo es O(temas × ventanas) sin importar cuánta historia haya. El
+estado (sumas, las observaciones que siguen dentro de la ventana más
+larga y la serie de tiempo resultante) se guarda entre ciclos.
+
+Los conteos de los días más recientes todavía cambian cuando llegan
+artículos tarde, por eso solo se incorporan los días con más de
+ROLLING_SETTLE_DAYS de antigüedad. Si cambian los temas, las ventanas o
+el origen de la serie (conteos o puntajes de otro clasificador), el
+estado se reconstruye desde la historia completa.
+"""
+import os
+import json
+import numpy as np
+from datetime import date, timedelta
+
+WINDOWS = [int(w) for w in os.getenv("ROLLING_WINDOWS", "7,30,90").split(",") if w.strip()]
+SETTLE_DAYS = int(os.getenv("ROLLING_SETTLE_DAYS", 2))
+
+# Puntos de la serie que se conservan por ventana
+HISTORY_POINTS = int(os.getenv("ROLLING_HISTORY_POINTS", 730))
+
+# Cada cuántas actualizaciones se recalculan las sumas desde las observaciones
+# guardadas, para que no se acumule error de redondeo
+RESYNC_EVERY = 256
+
+MIN_OBSERVATIONS = 3
+
+def save_json_atomic(path, data):
+    """Escribe JSON en un temporal y lo renombra"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+class WindowSums:
+    """Sumas de una ventana para todos los temas"""
+
+    def __init__(self, n_topics):
+        self.n = 0
+        self.sx = np.zeros(n_topics)
+        self.sxx = np.zeros(n_topics)
+        self.sxy = np.zeros(n_topics)
+        self.sy = 0.0
+        self.syy = 0.0
+
+    def add(self, x, y, sign=1):
+        self.n += sign
+        self.sx += sign * x
+        self.sxx += sign * x * x
+        self.sxy += sign * x * y
+        self.sy += sign * y
+        self.syy += sign * y * y
+
+    def correlations(self):
+        """Pearson por tema; None si hay pocas observaciones o no hay variación"""
+        if self.n < MIN_OBSERVATIONS:
+            return [None] * len(self.sx)
+        n = self.n
+        cov = self.sxy - self.sx * self.sy / n
+        var_x = self.sxx - self.sx * self.sx / n
+        var_y = self.syy - self.sy * self.sy / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = cov / np.sqrt(var_x * var_y)
+        # Varianzas casi nulas por redondeo cuentan como sin variación
+        r[(var_x <= 1e-9) | (var_y <= 1e-12)] = np.nan
+        return [None if np.isnan(v) else round(float(min(1.0, max(-1.0, v))), 6) for v in r]
+
+    def to_dict(self):
+        return {"n": self.n, "sx": self.sx.tolist(), "sxx": self.sxx.tolist(),
+                "sxy": self.sxy.tolist(), "sy": self.sy, "syy": self.syy}
+
+    @classmethod
+    def from_dict(cls, data):
+        sums = cls(len(data["sx"]))
+        sums.n = data["n"]
+        sums.sx = np.array(data["sx"])
+        sums.sxx = np.array(data["sxx"])
+        sums.sxy = np.array(data["sxy"])
+        sums.sy = data["sy"]
+        sums.syy = data["syy"]
+        return sums
+
+class RollingCorrelations:
+    """Estado incremental de todas las ventanas"""
+
+    def __init__(self, topics, windows=WINDOWS, source=None):
+        self.topics = list(topics)
+        self.windows = sorted(windows)
+        self.source = source
+        self.last_day = None
+        self.updates = 0
+
+        # Observaciones que siguen dentro de la ventana más larga
+        self.obs_days = []      # ordinales
+        self.obs_y = []
+        self.obs_x = []         # listas por tema
+
+        # Primera observación dentro de cada ventana (índice en obs_*)
+        self.start = {w: 0 for w in self.windows}
+        self.sums = {w: WindowSums(len(self.topics)) for w in self.windows}
+        self.series = {w: {"dates": [], "correlations": {t: [] for t in self.topics}}
+                       for w in self.windows}
+
+    def add(self, day, x, y):
+        """Incorpora la observación del día (ISO) y extiende las series"""
+        ordinal = date.fromisoformat(day).toordinal()
+        x = np.asarray(x, dtype=float)
+
+        self.obs_days.append(ordinal)
+        self.obs_y.append(float(y))
+        self.obs_x.append(x.tolist())
+
+        for w in self.windows:
+            sums = self.sums[w]
+            sums.add(x, y)
+
+            # Sacar lo que quedó fuera de los últimos w días
+            while self.obs_days[self.start[w]] <= ordinal - w:
+                i = self.start[w]
+                sums.add(np.asarray(self.obs_x[i]), self.obs_y[i], sign=-1)
+                self.start[w] += 1
+
+            series = self.series[w]
+            series["dates"].append(day)
+            for topic, r in zip(self.topics, sums.correlations()):
+                series["correlations"][topic].append(r)
+
+        self._trim()
+        self.last_day = day
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.resync()
+
+    def _trim(self):
+        """Descarta observaciones que ya salieron de todas las ventanas"""
+        drop = min(self.start.values())
+        if drop:
+            del self.obs_days[:drop], self.obs_y[:drop], self.obs_x[:drop]
+            for w in self.windows:
+                self.start[w] -= drop
+
+        for series in (s for s in self.series.values() if len(s["dates"]) > HISTORY_POINTS):
+            cut = len(series["dates"]) - HISTORY_POINTS
+            del series["dates"][:cut]
+            for values in series["correlations"].values():
+                del values[:cut]
+
+    def resync(self):
+        """Recalcula las sumas de cada ventana desde sus observaciones"""
+        for w in self.windows:
+            sums = WindowSums(len(self.topics))
+            for i in range(self.start[w], len(self.obs_days)):
+                sums.add(np.asarray(self.obs_x[i]), self.obs_y[i])
+            self.sums[w] = sums
+
+    def update(self, news_data, dates, returns, today=None):
+        """
+        Agrega las fechas de retorno posteriores al último día procesado
+        y ya asentadas. Devuelve cuántos días se agregaron.
+        """
+        today = today or date.today()
+        settled = (today - timedelta(days=SETTLE_DAYS)).isoformat()
+
+        added = 0
+        for day, y in zip(dates, returns):
+            if (self.last_day and day <= self.last_day) or day > settled:
+                continue
+            counts = news_data.get(day, {})
+            self.add(day, [counts.get(t, 0) for t in self.topics], y)
+            added += 1
+        return added
+
+    def to_dict(self):
+        return {
+            "topics": self.topics,
+            "windows": self.windows,
+            "source": self.source,
+            "last_day": self.last_day,
+            "updates": self.updates,
+            "obs_days": self.obs_days,
+            "obs_y": self.obs_y,
+            "obs_x": self.obs_x,
+            "start": {str(w): s for w, s in self.start.items()},
+            "sums": {str(w): s.to_dict() for w, s in self.sums.items()},
+            "series": {str(w): s for w, s in self.series.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        rolling = cls(data["topics"], data["windows"], data.get("source"))
+        rolling.last_day = data["last_day"]
+        rolling.updates = data["updates"]
+        rolling.obs_days = data["obs_days"]
+        rolling.obs_y = data["obs_y"]
+        rolling.obs_x = data["obs_x"]
+        rolling.start = {int(w): s for w, s in data["start"].items()}
+        rolling.sums = {int(w): WindowSums.from_dict(s) for w, s in data["sums"].items()}
+        rolling.series = {int(w): s for w, s in data["series"].items()}
+        return rolling
+
+    def public(self):
+        """Series para el dashboard"""
+        return {
+            "last_day": self.last_day,
+            "windows": {str(w): self.series[w] for w in self.windows},
+        }
+
+def load(path, topics, windows=WINDOWS, source=None):
+    """Estado guardado, o uno nuevo si no existe o cambiaron temas/ventanas/origen"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if (data["topics"] == list(topics) and data["windows"] == sorted(windows)
+                and data.get("source") == source):
+            return RollingCorrelations.from_dict(data)
+        print("♻️  Cambiaron los temas, las ventanas o la serie: reconstruyendo correlaciones móviles")
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    return RollingCorrelations(topics, windows, source)
+
+def save(rolling, state_path, public_path):
+    save_json_atomic(state_path, rolling.to_dict())
+    save_json_atomic(public_path, rolling.public())
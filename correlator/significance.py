@@ -0,0 +1,242 @@
+"""
+Significancia de las correlaciones: permutaciones y bootstrap por bloques.
+
+- p-valor por permutación: se baraja la serie de retornos miles de veces
+  y se cuenta cuántas veces |r| iguala o supera al observado. Con las
+  columnas estandarizadas, cada lote de permutaciones de todos los temas
+  es un solo producto de matrices.
+- Intervalo de confianza por bootstrap de bloques móviles: se remuestrean
+  bloques de días consecutivos (largo ≈ n^(1/3)) para respetar la
+  autocorrelación de las series, y se toman los percentiles de r.
+- Los remuestreos se reparten en tareas pequeñas sobre un pool de
+  procesos, con a lo sumo una tarea por proceso en vuelo. No se envía
+  una tarea nueva si ya no alcanzaría a terminar dentro de
+  SIGNIFICANCE_BUDGET_SECONDS (según la más lenta hasta ahora), y al
+  cerrar se espera a las que están corriendo: ningún proceso queda
+  trabajando después del ciclo. Se usan los remuestreos completados.
+- Sobre los p-valores de todos los temas se aplica Benjamini-Hochberg
+  (q-valor), para no encontrar "relaciones" por azar al probar muchos temas.
+"""
+import os
+import time
+import warnings
+import numpy as np
+from itertools import zip_longest
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from common.resources import cpu_limit
+
+PERMUTATIONS = int(os.getenv("SIGNIFICANCE_PERMUTATIONS", 5000))
+BOOTSTRAPS = int(os.getenv("SIGNIFICANCE_BOOTSTRAPS", 2000))
+ALPHA = float(os.getenv("SIGNIFICANCE_ALPHA", 0.05))
+
+# Por defecto, una cuarta parte del intervalo del correlador (máx. 5 minutos)
+BUDGET_SECONDS = (float(os.getenv("SIGNIFICANCE_BUDGET_SECONDS", 0))
+                  or min(300.0, 0.25 * int(os.getenv("SLEEP_INTERVAL", 3600))))
+
+WORKERS = int(os.getenv("SIGNIFICANCE_WORKERS", 0)) or cpu_limit()
+
+# Remuestreos por tarea y por lote dentro de cada tarea
+TASK_RESAMPLES = 250
+CHUNK = 25
+
+MIN_OBSERVATIONS = 4
+
+# Series de la ejecución actual, copiadas a cada proceso al iniciarlo
+_jobs = {}
+
+def _init_worker(jobs):
+    global _jobs
+    _jobs = jobs
+
+def standardize(x):
+    """Columnas con media 0 y norma 1 (las constantes quedan en 0)"""
+    xc = x - x.mean(axis=0)
+    norm = np.sqrt((xc * xc).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(norm > 0, xc / norm, 0.0)
+
+def permutation_task(name, seed, count):
+    """Cuántas permutaciones igualan o superan |r| observado, por tema"""
+    xs, ys, observed = _jobs[name]["xs"], _jobs[name]["ys"], _jobs[name]["observed"]
+    rng = np.random.default_rng(seed)
+    n = len(ys)
+    exceed = np.zeros(xs.shape[1], dtype=np.int64)
+    threshold = np.abs(observed) - 1e-12
+
+    for start in range(0, count, CHUNK):
+        c = min(CHUNK, count - start)
+        permuted = ys[rng.permuted(np.tile(np.arange(n), (c, 1)), axis=1)]
+        r = permuted @ xs
+        exceed += (np.abs(r) >= threshold).sum(axis=0)
+
+    return "permutation", name, count, exceed
+
+def bootstrap_task(name, seed, count):
+    """
+    r de cada remuestreo por bloques móviles (count × temas). Cada
+    remuestreo se expresa como cuántas veces aparece cada día (pesos), así
+    que las sumas de todos los temas salen de productos de matrices.
+    """
+    job = _jobs[name]
+    x, x2, y = job["x"], job["x2"], job["y"]
+    rng = np.random.default_rng(seed)
+    n = len(y)
+    block = max(1, int(round(n ** (1 / 3))))
+    n_blocks = -(-n // block)
+    offsets = np.arange(block)
+
+    results = []
+    for start in range(0, count, CHUNK):
+        c = min(CHUNK, count - start)
+        starts = rng.integers(0, n - block + 1, size=(c, n_blocks))
+        idx = (starts[:, :, None] + offsets).reshape(c, -1)[:, :n]
+        weights = np.bincount((idx + np.arange(c)[:, None] * n).ravel(),
+                              minlength=c * n).reshape(c, n).astype(float)
+
+        sx = weights @ x
+        sxx = weights @ x2
+        sxy = (weights * y) @ x
+        sy = weights @ y
+        syy = weights @ (y * y)
+
+        cov = n * sxy - sx * sy[:, None]
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = cov / np.sqrt(var_x * var_y[:, None])
+        # Remuestreos sin variación no aportan al intervalo
+        r[(var_x <= 1e-9 * n * n) | (var_y[:, None] <= 1e-12 * n * n)] = np.nan
+        results.append(r)
+
+    return "bootstrap", name, count, np.vstack(results)
+
+def benjamini_hochberg(p_values):
+    """q-valores (FDR) de Benjamini-Hochberg"""
+    p = np.asarray(p_values, dtype=float)
+    m = len(p)
+    if m == 0:
+        return p
+    order = np.argsort(p)
+    ranked = p[order] * m / np.arange(1, m + 1)
+    q = np.minimum.accumulate(ranked[::-1])[::-1]
+    out = np.empty(m)
+    out[order] = np.minimum(q, 1.0)
+    return out
+
+def run_tasks(jobs, tasks, budget):
+    """
+    Ejecuta (función, nombre, semilla, cantidad) hasta terminar o agotar
+    el presupuesto. Devuelve los resultados completados.
+    """
+    deadline = time.monotonic() + budget
+    # Duración de la tarea más lenta vista: no empezar otra que no alcance
+    slowest = 0.0
+    tasks = iter(tasks)
+
+    if WORKERS <= 1:
+        _init_worker(jobs)
+        results = []
+        for fn, name, seed, count in tasks:
+            if deadline - time.monotonic() < slowest:
+                break
+            start = time.monotonic()
+            results.append(fn(name, seed, count))
+            slowest = max(slowest, time.monotonic() - start)
+        return results
+
+    pool = ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_worker, initargs=(jobs,))
+    results = []
+    started = {}
+    try:
+        # Una tarea por proceso: ninguna queda en cola cuando se acaba el tiempo
+        for fn, name, seed, count in tasks:
+            if len(started) >= WORKERS:
+                done, _ = wait(started, return_when=FIRST_COMPLETED)
+                for future in done:
+                    slowest = max(slowest, time.monotonic() - started.pop(future))
+                    results.append(future.result())
+            if deadline - time.monotonic() < slowest:
+                break
+            started[pool.submit(fn, name, seed, count)] = time.monotonic()
+    finally:
+        # Esperar a las que están corriendo (a lo sumo una por proceso)
+        pool.shutdown(wait=True, cancel_futures=True)
+    results.extend(f.result() for f in started)
+    return results
+
+def test_correlations(samples, permutations=PERMUTATIONS, bootstraps=BOOTSTRAPS,
+                      budget=BUDGET_SECONDS, alpha=ALPHA, seed=None):
+    """
+    samples: {nombre: (x[n × temas], y[n], temas, con_bootstrap)}
+    Devuelve {nombre: {tema: {...}}} con r, p_value, ci_low, ci_high y
+    el número de remuestreos efectivamente usados.
+    """
+    rng = np.random.default_rng(seed)
+    jobs = {}
+    tasks = []
+
+    for name, (x, y, topics, with_bootstrap) in samples.items():
+        if len(y) < MIN_OBSERVATIONS:
+            continue
+        xs, ys = standardize(x), standardize(y[:, None])[:, 0]
+        jobs[name] = {"x": x, "x2": x * x, "y": y, "xs": xs, "ys": ys, "observed": ys @ xs}
+
+        kinds = [(permutation_task, permutations)]
+        if with_bootstrap:
+            kinds.append((bootstrap_task, bootstraps))
+        for fn, total in kinds:
+            for start in range(0, total, TASK_RESAMPLES):
+                tasks.append((fn, name, int(rng.integers(2**32)), min(TASK_RESAMPLES, total - start)))
+
+    # Intercalar tipos de tarea para que un corte por tiempo deje de todo un poco
+    groups = defaultdict(list)
+    for task in tasks:
+        groups[task[:2]].append(task)
+    tasks = [t for batch in zip_longest(*groups.values()) for t in batch if t is not None]
+    results = run_tasks(jobs, tasks, budget) if tasks else []
+
+    permuted = {name: [0, 0] for name in jobs}
+    boot = {name: [] for name in jobs}
+    for kind, name, count, value in results:
+        if kind == "permutation":
+            permuted[name][0] += count
+            permuted[name][1] = permuted[name][1] + value
+        else:
+            boot[name].append(value)
+
+    report = {}
+    for name, (x, y, topics, _) in samples.items():
+        if name not in jobs:
+            report[name] = {t: {"r": None, "p_value": None, "ci_low": None, "ci_high": None,
+                                "permutations": 0, "bootstraps": 0, "observations": len(y)}
+                            for t in topics}
+            continue
+
+        observed = jobs[name]["observed"]
+        done, exceed = permuted[name]
+        p_values = (1 + exceed) / (1 + done) if done else np.full(len(topics), np.nan)
+
+        draws = np.vstack(boot[name]) if boot[name] else np.empty((0, len(topics)))
+        low = high = np.full(len(topics), np.nan)
+        if len(draws):
+            with warnings.catch_warnings():
+                # Temas sin ningún remuestreo con variación: intervalo nulo
+                warnings.simplefilter("ignore", RuntimeWarning)
+                low, high = np.nanpercentile(draws, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+
+        report[name] = {
+            topic: {
+                "r": round(float(observed[j]), 6),
+                "p_value": None if np.isnan(p_values[j]) else round(float(p_values[j]), 6),
+                "ci_low": None if np.isnan(low[j]) else round(float(low[j]), 6),
+                "ci_high": None if np.isnan(high[j]) else round(float(high[j]), 6),
+                "permutations": int(done),
+                "bootstraps": len(draws),
+                "observations": len(y),
+            }
+            for j, topic in enumerate(topics)
+        }
+
+    return report
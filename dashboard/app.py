@@ -1,13 +1,35 @@
-from flask import Flask, render_template, jsonify
-import json
+from flask import Flask, Response, render_template, jsonify, request
 import os
 from datetime import datetime
+from file_cache import FileCache, cached_response
+from stream import Broadcaster, REJECTED_RETRY_SECONDS
+from news_counts import NewsCounts, parse_query
 
 app = Flask(__name__)
 
+# Respuestas preparadas por versión (mtime, tamaño) de cada archivo
+cache = FileCache()
+
 RESULTS_DIR = "/app/data/results"
 ANALYSIS_DIR = "/app/data/analysis"
 
+# Conteos diarios, semanales y mensuales que mantiene el analizador
+news_counts = NewsCounts(cache, ANALYSIS_DIR)
+
+# Datos cuyos cambios se empujan a los navegadores por /api/stream
+broadcaster = Broadcaster({
+    "correlations": lambda: cache.get(os.path.join(RESULTS_DIR, "correlations_latest.json")),
+    "news_counts": news_counts.view,
+})
+
+def warm_cache():
+    """Prepara las respuestas más pedidas (en gunicorn, antes del fork)"""
+    for source in broadcaster.sources.values():
+        try:
+            source()
+        except Exception as e:
+            print(f"⚠️  No se pudo precargar: {e}")
+
 @app.route('/')
 def index():
     """Página principal del dashboard"""
@@ -18,44 +40,97 @@ def get_correlations():
     """API endpoint para obtener correlaciones"""
     try:
         path = os.path.join(RESULTS_DIR, "correlations_latest.json")
+        entry = cache.get(path)
         
-        if not os.path.exists(path):
+        if entry is None:
             return jsonify({"error": "No data available"}), 404
         
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        return cached_response(entry)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rolling_correlations')
+def get_rolling_correlations():
+    """API endpoint para obtener las series de correlaciones móviles"""
+    try:
+        path = os.path.join(RESULTS_DIR, "rolling_correlations.json")
+        entry = cache.get(path)
         
-        return jsonify(data)
+        if entry is None:
+            return jsonify({"error": "No data available"}), 404
+        
+        return cached_response(entry)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/news_counts')
 def get_news_counts():
-    """API endpoint para obtener conteos de noticias"""
+    """
+    API endpoint para obtener conteos de noticias.
+    Parámetros opcionales: start, end (YYYY-MM-DD), topics (separados por
+    coma) y resolution (day por defecto, week, month o auto). La respuesta
+    indica la resolución usada y si se recortaron períodos (truncated)
+    """
     try:
-        path = os.path.join(ANALYSIS_DIR, "daily_counts.json")
+        try:
+            resolution, start, end, topics = parse_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        if not os.path.exists(path):
-            return jsonify({"error": "No data available"}), 404
+        entry = news_counts.view(resolution, start, end, topics)
         
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if entry is None:
+            return jsonify({"error": "No data available"}), 404
         
-        return jsonify(data)
+        return cached_response(entry)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def stream():
+    """Server-Sent Events: estado inicial y luego solo los cambios"""
+    # Sin lugar: 503 y la página pasa a consultar la API cada tanto
+    if not broadcaster.acquire():
+        response = jsonify({"error": "demasiadas conexiones abiertas"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(REJECTED_RETRY_SECONDS)
+        return response
+
+    response = Response(broadcaster.stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # Se llama al cerrar la respuesta, aunque el generador no haya empezado
+    response.call_on_close(broadcaster.release)
+    return response
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: el proceso responde"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: el volumen de datos está montado y se puede leer"""
+    missing = [d for d in (RESULTS_DIR, ANALYSIS_DIR) if not os.access(d, os.R_OK | os.X_OK)]
+    if missing:
+        return jsonify({"status": "not ready", "missing": missing}), 503
+    return jsonify({"status": "ready"})
+
 @app.route('/api/status')
 def get_status():
     """API endpoint para verificar estado del sistema"""
     status = {
         "timestamp": datetime.now().isoformat(),
         "correlations_available": os.path.exists(os.path.join(RESULTS_DIR, "correlations_latest.json")),
+        "rolling_available": os.path.exists(os.path.join(RESULTS_DIR, "rolling_correlations.json")),
         "news_data_available": os.path.exists(os.path.join(ANALYSIS_DIR, "daily_counts.json"))
     }
     return jsonify(status)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    # Solo para desarrollo; en producción: gunicorn -c gunicorn.conf.py app:app
+    app.run(host='0.0.0.0', port=8080, debug=os.getenv("FLASK_DEBUG", "0") == "1")
\ No newline at end of file
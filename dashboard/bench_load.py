@@ -0,0 +1,83 @@
+"""
+Prueba de carga del dashboard.
+
+Abre N conexiones keep-alive en paralelo (un hilo por conexión) contra
+una URL durante unos segundos y reporta peticiones por segundo y
+latencias p50 / p99. Con --etag cada cliente reenvía el ETag recibido,
+como hace el navegador al revalidar (respuestas 304).
+
+Uso: python bench_load.py [url] [conexiones] [segundos] [--etag] [--gzip]
+Ej.: python bench_load.py http://localhost:8080/api/correlations 32 10
+"""
+import sys
+import time
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def client(url, deadline, latencies, statuses, use_etag, use_gzip):
+    """Repite la petición por una misma conexión hasta el plazo"""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    headers = {"Accept-Encoding": "gzip"} if use_gzip else {}
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            statuses.append("error")
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status)
+
+        if use_etag and response.getheader("ETag"):
+            headers["If-None-Match"] = response.getheader("ETag")
+
+    conn.close()
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    url = args[0] if args else "http://localhost:8080/api/correlations"
+    connections = int(args[1]) if len(args) > 1 else 32
+    seconds = float(args[2]) if len(args) > 2 else 10
+    use_etag = "--etag" in sys.argv
+    use_gzip = "--gzip" in sys.argv
+
+    print(f"🔥 {url}: {connections} conexiones durante {seconds:.0f}s"
+          f"{' (ETag)' if use_etag else ''}{' (gzip)' if use_gzip else ''}\n")
+
+    latencies, statuses = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=client, args=(url, deadline, latencies, statuses, use_etag, use_gzip))
+               for _ in range(connections)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    by_status = {}
+    for status in statuses:
+        by_status[status] = by_status.get(status, 0) + 1
+
+    print(f"   - Peticiones:      {len(latencies)} ({', '.join(f'{s}: {n}' for s, n in sorted(by_status.items(), key=str))})")
+    print(f"   - Peticiones/s:    {len(latencies) / elapsed:.0f}")
+    print(f"   - Latencia p50:    {percentile(latencies, 50) * 1e3:.2f} ms")
+    print(f"   - Latencia p99:    {percentile(latencies, 99) * 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    main()
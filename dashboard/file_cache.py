@@ -0,0 +1,129 @@
+"""
+Caché de respuestas JSON del dashboard.
+
+Cada archivo de datos (correlations_latest.json, daily_counts.json...)
+se lee, se serializa y se comprime una sola vez por versión; la versión
+es (mtime, tamaño) del archivo. Las peticiones siguientes solo hacen un
+stat: si el archivo no cambió se responde con los bytes ya preparados,
+o con 304 si el navegador ya tiene esa versión (ETag).
+
+Si el archivo cambió pero todavía no se puede leer (escritura a medias),
+se sigue sirviendo la versión anterior.
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# max-age de Cache-Control: con 0 el navegador revalida siempre (y recibe 304)
+MAX_AGE = int(os.getenv("DASHBOARD_CACHE_MAX_AGE", 0))
+
+# Vistas derivadas (consultas con parámetros) que se conservan preparadas
+VIEW_CACHE_SIZE = 256
+
+class CachedFile:
+    """Una versión de un archivo, lista para responder"""
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+        self.body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+        # Codificación -> (cuerpo, ETag de esa representación)
+        self.encodings = {
+            "gzip": (gzip.compress(self.body, compresslevel=6, mtime=0), f"{self.etag}-gz"),
+        }
+        if brotli is not None:
+            self.encodings["br"] = (brotli.compress(self.body), f"{self.etag}-br")
+
+    def etags(self):
+        return [self.etag] + [tag for _, tag in self.encodings.values()]
+
+class FileCache:
+    """Archivos JSON parseados y serializados, por ruta"""
+
+    def __init__(self):
+        self._entries = {}
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, transform=None):
+        """
+        CachedFile con la versión actual del archivo, o None si no existe.
+        `transform` se aplica a los datos leídos antes de serializarlos.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        version = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.version == version:
+            return entry
+
+        # Una sola lectura por versión aunque lleguen muchas peticiones a la vez
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.version == version:
+                return entry
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except ValueError:
+                if entry is not None:
+                    return entry
+                raise
+            entry = CachedFile(version, transform(data) if transform else data)
+            self._entries[path] = entry
+            return entry
+
+    def view(self, key, build):
+        """
+        CachedFile de una vista derivada. `key` debe incluir las versiones
+        de los archivos de origen, así un cambio de datos arma una vista
+        nueva y las viejas salen por antigüedad.
+        """
+        with self._lock:
+            entry = self._views.get(key)
+            if entry is not None:
+                self._views.move_to_end(key)
+                return entry
+
+        entry = CachedFile(key, build())
+        with self._lock:
+            self._views[key] = entry
+            while len(self._views) > VIEW_CACHE_SIZE:
+                self._views.popitem(last=False)
+        return entry
+
+def cached_response(entry):
+    """Respuesta para un CachedFile: 304 si el ETag coincide, si no el cuerpo comprimido"""
+    headers = {
+        "Cache-Control": f"public, max-age={MAX_AGE}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+
+    for tag in entry.etags():
+        if request.if_none_match.contains(tag):
+            headers["ETag"] = f'"{tag}"'
+            return Response(status=304, headers=headers)
+
+    body, etag = entry.body, entry.etag
+    for encoding in ("br", "gzip"):
+        if encoding in entry.encodings and request.accept_encodings[encoding]:
+            body, etag = entry.encodings[encoding]
+            headers["Content-Encoding"] = encoding
+            break
+
+    headers["ETag"] = f'"{etag}"'
+    return Response(body, mimetype="application/json", headers=headers)
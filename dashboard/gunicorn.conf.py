@@ -0,0 +1,42 @@
+"""
+Configuración de gunicorn para el dashboard en producción.
+
+- Workers gthread: varios procesos, cada uno con un pool de hilos. Cada
+  navegador con el dashboard abierto ocupa un hilo con /api/stream. Cada
+  worker acepta a lo sumo DASHBOARD_MAX_STREAMS conexiones (por defecto
+  threads menos STREAM_RESERVED_THREADS); el resto de los hilos queda
+  para la API y las sondas, y las pestañas rechazadas consultan la API.
+- preload_app: la app y la caché de respuestas se cargan una vez en el
+  proceso maestro y los workers la heredan al hacer fork.
+- Recarga sin cortes: `kill -HUP <maestro>` reemplaza los workers de a
+  uno. Como el código está precargado, para desplegar código nuevo se
+  reinicia el contenedor (en Kubernetes, un rolling update).
+- Al apagarse, los workers tienen graceful_timeout segundos para
+  terminar; las conexiones SSE se cortan y el navegador se reconecta.
+"""
+import os
+from common.resources import cpu_limit
+
+bind = f"0.0.0.0:{os.getenv('DASHBOARD_PORT', 8080)}"
+
+worker_class = "gthread"
+workers = int(os.getenv("DASHBOARD_WORKERS", 0)) or 2 * cpu_limit() + 1
+threads = int(os.getenv("DASHBOARD_THREADS", 16))
+
+preload_app = True
+
+# Los hilos ocupados con SSE no bloquean el latido del worker (gthread)
+timeout = 30
+graceful_timeout = int(os.getenv("DASHBOARD_GRACEFUL_TIMEOUT", 20))
+keepalive = 5
+
+accesslog = None
+errorlog = "-"
+loglevel = "info"
+
+def when_ready(server):
+    """Lee los datos una vez en el maestro, antes de crear los workers"""
+    from app import warm_cache, broadcaster
+    warm_cache()
+    server.log.info("🚀 Dashboard listo: %s workers × %s hilos (%s streams por worker)",
+                    workers, threads, broadcaster.max_streams)
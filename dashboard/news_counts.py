@@ -0,0 +1,118 @@
+"""
+Consultas sobre los conteos de noticias para /api/news_counts.
+
+El analizador mantiene tres archivos con la misma forma
+{período: {tema: conteo}}:
+
+    daily_counts.json     período = día (YYYY-MM-DD)
+    weekly_counts.json    período = lunes de la semana (YYYY-MM-DD)
+    monthly_counts.json   período = mes (YYYY-MM)
+
+Una consulta elige el archivo según la resolución (diaria por defecto),
+recorta el rango de fechas por bisección sobre los períodos ordenados y
+deja solo los temas pedidos. Nunca devuelve más de
+NEWS_COUNTS_MAX_POINTS períodos (los más recientes), así que la
+respuesta no crece con la historia. Con resolution=auto se usa la
+resolución más fina que cabe en ese límite.
+
+La respuesta dice qué se aplicó, para que el gráfico y los clientes
+sepan si los datos se recortaron o se agregaron:
+
+    {"resolution": "day",       resolución usada (auto elige una)
+     "truncated": false,        true si se omitieron períodos antiguos
+     "start": "2025-01-01",     primer y último período devueltos
+     "end": "2025-03-31",
+     "counts": {período: {tema: conteo}}}
+"""
+import os
+import bisect
+from datetime import date, timedelta
+
+ANALYSIS_DIR = "/app/data/analysis"
+
+RESOLUTION_FILES = {
+    "day": "daily_counts.json",
+    "week": "weekly_counts.json",
+    "month": "monthly_counts.json",
+}
+
+MAX_POINTS = int(os.getenv("NEWS_COUNTS_MAX_POINTS", 400))
+
+def period_bound(day, resolution):
+    """Clave del período que contiene el día (para recortar el rango)"""
+    d = date.fromisoformat(day)
+    if resolution == "month":
+        return day[:7]
+    if resolution == "week":
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return d.isoformat()
+
+def period_range(periods, resolution, start=None, end=None):
+    """(i, j) de los períodos ordenados que caen entre start y end"""
+    i = bisect.bisect_left(periods, period_bound(start, resolution)) if start else 0
+    j = bisect.bisect_right(periods, period_bound(end, resolution)) if end else len(periods)
+    return i, j
+
+def parse_query(args):
+    """Valida los parámetros; ValueError con el motivo si alguno no sirve"""
+    resolution = args.get("resolution", "day")
+    if resolution != "auto" and resolution not in RESOLUTION_FILES:
+        raise ValueError(f"resolution debe ser auto, {', '.join(RESOLUTION_FILES)}")
+
+    start, end = args.get("start"), args.get("end")
+    for value in (start, end):
+        if value:
+            date.fromisoformat(value)
+    if start and end and start > end:
+        raise ValueError("start es posterior a end")
+
+    topics = args.get("topics")
+    topics = tuple(sorted({t.strip() for t in topics.split(",") if t.strip()})) if topics else None
+    return resolution, start, end, topics
+
+class NewsCounts:
+    """Vistas de conteos, preparadas una vez por versión de los datos"""
+
+    def __init__(self, cache, analysis_dir=ANALYSIS_DIR):
+        self.cache = cache
+        self.paths = {r: os.path.join(analysis_dir, f) for r, f in RESOLUTION_FILES.items()}
+
+    def view(self, resolution="day", start=None, end=None, topics=None):
+        """CachedFile con la respuesta (ver el docstring del módulo), o None si no hay datos"""
+        entries = {r: self.cache.get(path) for r, path in self.paths.items()}
+        if entries["day"] is None or (resolution != "auto" and entries[resolution] is None):
+            return None
+
+        versions = tuple(e.version if e else None for e in entries.values())
+        key = ("news_counts", versions, resolution, start, end, topics)
+        return self.cache.view(key, lambda: self._build(entries, resolution, start, end, topics))
+
+    @staticmethod
+    def _build(entries, resolution, start, end, topics):
+        periods = {r: sorted(e.data) for r, e in entries.items() if e is not None}
+
+        # La resolución más fina que cabe; sin agregados (analizador
+        # anterior) solo queda la diaria
+        if resolution == "auto":
+            resolution = next((r for r, p in periods.items()
+                               if len(range(*period_range(p, r, start, end))) <= MAX_POINTS),
+                              list(periods)[-1])
+
+        data, ordered = entries[resolution].data, periods[resolution]
+        i, j = period_range(ordered, resolution, start, end)
+        truncated = j - i > MAX_POINTS
+        i = max(i, j - MAX_POINTS)
+
+        selected = {}
+        for period in ordered[i:j]:
+            counts = data[period]
+            if topics is not None:
+                counts = {t: counts[t] for t in topics if t in counts}
+            selected[period] = counts
+        return {
+            "resolution": resolution,
+            "truncated": truncated,
+            "start": ordered[i] if i < j else None,
+            "end": ordered[j - 1] if i < j else None,
+            "counts": selected,
+        }
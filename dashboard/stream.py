@@ -0,0 +1,158 @@
+"""
+Actualizaciones del dashboard por Server-Sent Events (/api/stream).
+
+Un solo hilo por proceso revisa con stat() los archivos que escriben el
+correlador y el analizador (a través de FileCache, así que leerlos no
+cuesta nada si no cambiaron). Cuando el contenido de uno cambia, calcula
+una vez la diferencia con la versión anterior y la reparte a todas las
+conexiones abiertas.
+
+Mensajes:
+
+    event: snapshot   {"correlations": {...}, "news_counts": {...}}
+                      al conectarse (o si la conexión se atrasó)
+    event: patch      {"source": "correlations", "ops": [...]}
+                      ops: ["set", ruta, valor] o ["del", ruta]; la ruta
+                      vacía reemplaza el documento completo
+
+Cada conexión abierta ocupa un hilo del worker de gunicorn hasta que el
+navegador se va. Para que /api/*, /healthz y /readyz siempre tengan
+hilos libres, cada proceso acepta a lo sumo MAX_STREAMS conexiones; las
+demás reciben 503 con Retry-After y la página consulta la API cada
+tanto hasta que vuelve a haber lugar.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+
+POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", 1))
+HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", 15))
+
+# Cambios recientes que se guardan para las conexiones más lentas
+BUFFER_EVENTS = 64
+
+# Milisegundos que espera el navegador antes de reconectarse
+RETRY_MS = 5000
+
+# Hilos por worker (los mismos que en gunicorn.conf.py) y cuántos quedan
+# siempre libres para la API y las sondas de Kubernetes
+THREADS = int(os.getenv("DASHBOARD_THREADS", 16))
+RESERVED_THREADS = int(os.getenv("STREAM_RESERVED_THREADS", 4))
+MAX_STREAMS = int(os.getenv("DASHBOARD_MAX_STREAMS", 0)) or max(1, THREADS - RESERVED_THREADS)
+
+# Segundos que espera una conexión rechazada antes de volver a intentar
+REJECTED_RETRY_SECONDS = 60
+
+def diff(old, new, path=()):
+    """Operaciones que llevan `old` a `new`, bajando por los diccionarios"""
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return [["set", list(path), new]]
+
+    ops = [["del", list(path + (key,))] for key in old if key not in new]
+    for key, value in new.items():
+        if key not in old:
+            ops.append(["set", list(path + (key,)), value])
+        # El tipo también cuenta: en Python 1 == True, en JSON no
+        elif old[key] != value or type(old[key]) is not type(value):
+            ops.extend(diff(old[key], value, path + (key,)))
+    return ops
+
+def message(event, seq, data):
+    """Un evento SSE; `data` ya es JSON en una sola línea"""
+    return f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+
+class Broadcaster:
+    """Vigila las fuentes y reparte los cambios a las conexiones"""
+
+    def __init__(self, sources, max_streams=MAX_STREAMS):
+        self.sources = sources          # nombre -> función que devuelve un CachedFile
+        self.max_streams = max_streams
+        self.open_streams = 0
+        self._slots = threading.Lock()
+        self.current = {name: None for name in sources}
+        self.seq = 0
+        self.events = deque(maxlen=BUFFER_EVENTS)
+        self.cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self.cond:
+            if self._thread is None:
+                self._poll()
+                self._thread = threading.Thread(target=self._watch, daemon=True)
+                self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(POLL_SECONDS)
+            self._poll()
+
+    def _poll(self):
+        for name, source in self.sources.items():
+            try:
+                entry = source()
+            except Exception as e:
+                print(f"❌ Error leyendo {name} para el stream: {e}")
+                continue
+            old = self.current[name]
+            if (entry and entry.etag) == (old and old.etag):
+                continue
+
+            ops = diff(old.data if old else None, entry.data if entry else None)
+            payload = json.dumps({"source": name, "ops": ops}, separators=(",", ":"))
+            # Si la diferencia no ahorra nada, mandar el documento completo
+            if entry and len(payload) > len(entry.body):
+                payload = json.dumps({"source": name, "ops": [["set", [], entry.data]]},
+                                     separators=(",", ":"))
+
+            with self.cond:
+                self.current[name] = entry
+                self.seq += 1
+                self.events.append((self.seq, payload))
+                self.cond.notify_all()
+
+    def acquire(self):
+        """Reserva un lugar para una conexión; False si el proceso está lleno"""
+        with self._slots:
+            if self.open_streams >= self.max_streams:
+                return False
+            self.open_streams += 1
+            return True
+
+    def release(self):
+        """Libera el lugar de una conexión que se cerró"""
+        with self._slots:
+            self.open_streams = max(0, self.open_streams - 1)
+
+    def snapshot(self):
+        """(seq, evento snapshot) con el estado actual de todas las fuentes"""
+        with self.cond:
+            seq, current = self.seq, dict(self.current)
+        data = ",".join(f'"{name}":{entry.body.decode("utf-8") if entry else "null"}'
+                        for name, entry in current.items())
+        return seq, message("snapshot", seq, "{" + data + "}")
+
+    def stream(self):
+        """Generador de eventos para una conexión"""
+        self.start()
+        seq, snapshot = self.snapshot()
+        yield f"retry: {RETRY_MS}\n" + snapshot
+
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.seq > seq, timeout=HEARTBEAT_SECONDS)
+                pending = [(s, payload) for s, payload in self.events if s > seq]
+                missed = self.seq > seq and (not pending or pending[0][0] > seq + 1)
+
+            if missed:
+                seq, snapshot = self.snapshot()
+                yield snapshot
+            elif pending:
+                for s, payload in pending:
+                    yield message("patch", s, payload)
+                seq = pending[-1][0]
+            else:
+                # Comentario para que proxies y navegador no cierren la conexión
+                yield ": ping\n\n"
@@ -28,7 +28,7 @@ fi
 
 # Crear directorios
 echo "📁 Creando directorios..."
-mkdir -p data/{raw,clean,analysis,economic,results,commoncrawl}
+mkdir -p data/{raw,clean,analysis,economic,results,commoncrawl,store,events}
 
 # Construir y desplegar
 echo "🔨 Construyendo imágenes..."
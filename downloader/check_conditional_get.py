@@ -0,0 +1,184 @@
+"""
+Verificación de la descarga concurrente con GET condicional.
+
+Levanta un http.server local con feeds RSS de prueba (ETag y
+Last-Modified) y ejecuta fetch_rss contra él, con el almacén, el índice
+de enlaces, el estado de feeds y los eventos en un directorio temporal.
+Comprueba que:
+
+1. un feed lento no retrasa el guardado de los demás,
+2. un 304 deja intactos el almacén y los validadores guardados,
+3. un ETag nuevo vuelve a descargar el feed y guarda lo nuevo.
+
+Uso: python check_conditional_get.py
+"""
+import os
+import sys
+import json
+import shutil
+import time
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import main_loop
+from common.article_store import ArticleStore
+from common.seen_links import SeenLinks
+from common import events
+
+# Cuánto puede esperar el feed lento a que los demás queden guardados
+SLOW_WAIT = 10
+
+def rss(name, version, items):
+    entries = "".join(
+        f"<item><title>{name} noticia {i}</title><link>http://feeds.test/{name}/{i}</link>"
+        f"<description>Resumen {i} de {name}, versión {version}</description></item>"
+        for i in range(items)
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>{name}</title>{entries}</channel></rss>").encode("utf-8")
+
+class Feed:
+    """Un feed servido: versión (ETag), número de entradas y si es lento"""
+
+    def __init__(self, name, items, slow=False):
+        self.name = name
+        self.version = 1
+        self.items = items
+        self.modified = formatdate(time.time() - 3600, usegmt=True)
+        # Mientras no se libere, la respuesta del feed lento queda en espera
+        self.release = threading.Event()
+        if not slow:
+            self.release.set()
+
+    @property
+    def etag(self):
+        return f'"{self.name}-v{self.version}"'
+
+    def update(self, items):
+        self.version += 1
+        self.items = items
+        self.modified = formatdate(usegmt=True)
+
+# El lento va primero: una descarga en serie lo esperaría antes que a los demás
+FEEDS = {f"/{f.name}.xml": f for f in (Feed("lento", 2, slow=True), Feed("a", 3), Feed("b", 2))}
+requests_log = []
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        feed = FEEDS.get(self.path)
+        if feed is None:
+            self.send_error(404)
+            return
+        feed.release.wait(SLOW_WAIT)
+
+        if self.headers.get("If-None-Match") == feed.etag:
+            requests_log.append((feed.name, 304))
+            self.send_response(304)
+            self.send_header("ETag", feed.etag)
+            self.end_headers()
+            return
+
+        body = rss(feed.name, feed.version, feed.items)
+        requests_log.append((feed.name, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", feed.etag)
+        self.send_header("Last-Modified", feed.modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def store_sources():
+    """Número de artículos guardados por feed"""
+    main_loop.raw_store.refresh()
+    counts = {}
+    for key in main_loop.raw_store.keys():
+        source = main_loop.raw_store.get(key)["source"]
+        counts[source] = counts.get(source, 0) + 1
+    return counts
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def check(ok, message):
+    print(f"   {'✅' if ok else '❌'} {message}")
+    return ok
+
+def run(url, tmp):
+    """Los tres ciclos de fetch_rss; devuelve el resultado de cada comprobación"""
+    main_loop.raw_store = ArticleStore(os.path.join(tmp, "raw"))
+    main_loop.seen_links = SeenLinks(os.path.join(tmp, "seen_links.bin"))
+    main_loop.FEED_STATE_FILE = os.path.join(tmp, "feed_state.json")
+    main_loop.RSS_FEEDS = list(url.values())
+    events.EVENTS_DIR = os.path.join(tmp, "events")
+
+    results = []
+
+    print("1️⃣  Primera descarga, con un feed lento")
+    cycle = threading.Thread(target=main_loop.fetch_rss)
+    cycle.start()
+    deadline = time.time() + SLOW_WAIT
+    while time.time() < deadline:
+        counts = store_sources()
+        if counts.get(url["a"]) == 3 and counts.get(url["b"]) == 2:
+            break
+        time.sleep(0.05)
+    results.append(check(counts == {url["a"]: 3, url["b"]: 2},
+                         f"a y b guardados mientras el feed lento sigue en curso: {counts}"))
+    FEEDS["/lento.xml"].release.set()
+    cycle.join()
+    results.append(check(store_sources().get(url["lento"]) == 2, "el feed lento se guarda al responder"))
+
+    state_before = read_bytes(main_loop.FEED_STATE_FILE)
+    index_before = read_bytes(main_loop.raw_store.index_path)
+    results.append(check(json.loads(state_before)[url["a"]]["etag"] == FEEDS["/a.xml"].etag,
+                         "validadores guardados (ETag y Last-Modified)"))
+
+    print("\n2️⃣  Sin cambios: el servidor responde 304")
+    del requests_log[:]
+    main_loop.fetch_rss()
+    results.append(check(sorted(requests_log) == [("a", 304), ("b", 304), ("lento", 304)],
+                         f"todas las respuestas son 304: {sorted(requests_log)}"))
+    results.append(check(read_bytes(main_loop.raw_store.index_path) == index_before,
+                         "el almacén raw no cambia"))
+    results.append(check(read_bytes(main_loop.FEED_STATE_FILE) == state_before,
+                         "los validadores guardados no cambian"))
+
+    print("\n3️⃣  El feed b cambia de ETag")
+    FEEDS["/b.xml"].update(items=4)
+    del requests_log[:]
+    main_loop.fetch_rss()
+    results.append(check(sorted(requests_log) == [("a", 304), ("b", 200), ("lento", 304)],
+                         f"solo b se vuelve a descargar: {sorted(requests_log)}"))
+    results.append(check(store_sources().get(url["b"]) == 4, "se guardan solo las 2 entradas nuevas de b"))
+    state = json.loads(read_bytes(main_loop.FEED_STATE_FILE))
+    results.append(check(state[url["b"]]["etag"] == FEEDS["/b.xml"].etag
+                         and state[url["a"]] == json.loads(state_before)[url["a"]],
+                         "se guarda el ETag nuevo de b y se conserva el de a"))
+
+    return results
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    url = {feed.name: f"{base}{path}" for path, feed in FEEDS.items()}
+
+    tmp = tempfile.mkdtemp(prefix="check_conditional_get_")
+    try:
+        results = run(url, tmp)
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'✅ Todo correcto' if all(results) else '❌ Hay fallos'} ({sum(results)}/{len(results)})")
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,30 @@ import feedparser
 import json
 import os
 import time
+import threading
+import requests
 from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from common.article_store import ArticleStore, today
+from common.seen_links import SeenLinks, link_digest
+from common import events
+from common import metrics
 
-OUTDIR = "/app/data/raw"
-os.makedirs(OUTDIR, exist_ok=True)
+RAW_STORE_DIR = "/app/data/store/raw"
+raw_store = ArticleStore(RAW_STORE_DIR)
+
+# Enlaces ya descargados; sobrevive a la retención del almacén raw
+SEEN_LINKS_FILE = "/app/data/store/seen_links.bin"
+seen_links = SeenLinks(SEEN_LINKS_FILE)
+
+# ETag / Last-Modified de cada feed, para pedir solo lo que cambió
+FEED_STATE_FILE = "/app/data/store/feed_state.json"
+
+# Concurrencia de descarga
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 16))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", 2))
+FETCH_TIMEOUT = int(os.getenv("FETCH_TIMEOUT", 30))
 
 RSS_FEEDS = [
     "https://www.eltiempo.com/rss/colombia.xml",
@@ -13,45 +33,175 @@ RSS_FEEDS = [
     "https://www.elespectador.com/rss/economia",
 ]
 
+# Métricas en /metrics (METRICS_PORT)
+cycle = metrics.track_cycle("downloader")
+FEED_SECONDS = metrics.Histogram("rss_fetch_seconds", "Latencia de la descarga de cada feed", ["feed"])
+FEED_RESPONSES = metrics.Counter("rss_feed_responses_total", "Respuestas de cada feed: 200, 304 o error",
+                                 ["feed", "status"])
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+def host_slot(url):
+    """Semáforo que limita las conexiones simultáneas a un mismo host"""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(FETCH_PER_HOST)
+        return _host_slots[host]
+
+def load_feed_state():
+    """Carga los validadores HTTP guardados por feed"""
+    if not os.path.exists(FEED_STATE_FILE):
+        return {}
+    
+    try:
+        with open(FEED_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"  ⚠️ Estado de feeds ilegible, se descarga todo: {e}")
+        return {}
+
+def save_feed_state(state):
+    """Guarda los validadores HTTP de forma atómica"""
+    tmp_path = f"{FEED_STATE_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, FEED_STATE_FILE)
+
+def make_session():
+    """Sesión HTTP con un pool de conexiones del tamaño del pool de hilos"""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "NewsAnalyzer/1.0 (Educational)"})
+    adapter = requests.adapters.HTTPAdapter(pool_connections=FETCH_WORKERS,
+                                            pool_maxsize=FETCH_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_feed(session, url, validators):
+    """
+    Descarga un feed con GET condicional.
+    Devuelve (feed, validadores); feed es None si el servidor respondió 304.
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("modified"):
+        headers["If-Modified-Since"] = validators["modified"]
+    
+    with host_slot(url), FEED_SECONDS.time(feed=url):
+        response = session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+    
+    if response.status_code == 304:
+        return None, validators
+    
+    response.raise_for_status()
+    
+    new_validators = {}
+    if response.headers.get("ETag"):
+        new_validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        new_validators["modified"] = response.headers["Last-Modified"]
+    
+    return feedparser.parse(response.content), new_validators
+
+def seed_seen_links():
+    """Primera ejecución: poblar el conjunto con los enlaces RSS del almacén"""
+    if len(seen_links) > 0:
+        return
+    
+    digests = [key[len("rss_"):] for key in raw_store.keys() if key.startswith("rss_")]
+    if digests:
+        seen_links.add_many(digests)
+        print(f"🔑 Índice de enlaces inicializado con {len(digests)} entradas")
+
+@cycle
 def fetch_rss():
     """Descarga noticias de feeds RSS"""
     print(f"[{datetime.now()}] Iniciando descarga de noticias...")
     
+    # Incorporar lo que otras réplicas hayan agregado desde el último ciclo
+    seen_links.refresh()
+    
+    feed_state = load_feed_state()
+    session = make_session()
+    
     total = 0
-    for url in RSS_FEEDS:
-        try:
-            feed = feedparser.parse(url)
-            print(f"  - {url}: {len(feed.entries)} entradas")
-            
-            for entry in feed.entries:
-                item = {
-                    "title": entry.get("title", ""),
-                    "link": entry.get("link", ""),
-                    "summary": entry.get("summary", ""),
-                    "published": entry.get("published", datetime.utcnow().isoformat()),
-                    "source": url
-                }
+    unchanged = 0
+    
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {
+            pool.submit(fetch_feed, session, url, feed_state.get(url, {})): url
+            for url in RSS_FEEDS
+        }
+        
+        # Las entradas se guardan en este hilo a medida que llegan los feeds
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                feed, validators = future.result()
+                
+                if feed is None:
+                    print(f"  - {url}: sin cambios (304)")
+                    FEED_RESPONSES.inc(feed=url, status="304")
+                    unchanged += 1
+                    continue
                 
-                # Usar hash del link para evitar duplicados
-                import hashlib
-                link_hash = hashlib.md5(item["link"].encode()).hexdigest()
-                fname = os.path.join(OUTDIR, f"rss_{link_hash}.json")
+                FEED_RESPONSES.inc(feed=url, status="200")
                 
-                # Solo guardar si no existe
-                if not os.path.exists(fname):
-                    with open(fname, "w", encoding="utf-8") as f:
-                        json.dump(item, f, ensure_ascii=False, indent=2)
-                    total += 1
+                print(f"  - {url}: {len(feed.entries)} entradas")
+                
+                new_items = {}
+                new_digests = []
+                for entry in feed.entries:
+                    item = {
+                        "title": entry.get("title", ""),
+                        "link": entry.get("link", ""),
+                        "summary": entry.get("summary", ""),
+                        "published": entry.get("published", datetime.utcnow().isoformat()),
+                        "source": url
+                    }
                     
-        except Exception as e:
-            print(f"  ❌ Error en {url}: {e}")
+                    # Usar hash del link para evitar duplicados
+                    link_hash = link_digest(item["link"])
+                    key = f"rss_{link_hash}"
+                    
+                    # Descartar los ya vistos (consulta en memoria)
+                    if link_hash not in seen_links and key not in new_items:
+                        new_items[key] = (key, item, today())
+                        new_digests.append(link_hash)
+                
+                # Volver a filtrar bajo el flock de seen_links y guardar antes
+                # de soltarlo: otra réplica no puede guardar el mismo enlace, y
+                # si el anexado falla los enlaces no quedan marcados
+                with seen_links.claim(new_digests) as fresh:
+                    written = raw_store.append_many([new_items[f"rss_{d}"] for d in fresh])
+                total += written
+                cycle.count("stored", written)
+                
+                # Recordar validadores solo cuando las entradas quedaron guardadas
+                feed_state[url] = validators
+                        
+            except Exception as e:
+                print(f"  ❌ Error en {url}: {e}")
+                FEED_RESPONSES.inc(feed=url, status="error")
+    
+    save_feed_state(feed_state)
     
-    print(f"✅ Descargadas {total} noticias nuevas\n")
+    # Despertar al procesador
+    if total > 0:
+        events.publish("raw")
+    
+    print(f"✅ Descargadas {total} noticias nuevas ({unchanged} feeds sin cambios)\n")
 
 def main():
     """Loop principal que ejecuta cada cierto tiempo"""
     interval = int(os.getenv("SLEEP_INTERVAL", 3600))
     
+    metrics.serve()
+    seed_seen_links()
+    
     while True:
         try:
             fetch_rss()
@@ -62,4 +212,4 @@ def main():
         time.sleep(interval)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark de normalización de fechas.
+
+Compara `dateutil.parser.parse` (el extract_date original) contra
+normalize_date, con y sin caché, sobre fechas reales de los feeds.
+Si se indica un directorio con JSON raw (formato anterior) o el almacén
+raw, se usan sus campos "published"; si no, una muestra incluida aquí.
+
+Uso: python bench_dates.py [directorio_raw] [repeticiones]
+"""
+import os
+import sys
+import json
+import time
+
+from dateutil import parser
+
+from date_normalizer import normalize_date, _parse_uncached
+
+# Muestras de data/raw y de los formatos RFC-822 de los feeds
+SAMPLE_DATES = [
+    "2025-12-17T08:53:29-05:00",
+    "2025-12-15T19:03:20-05:00",
+    "2025-12-14T03:55:00-05:00",
+    "2025-12-20T11:02:45-05:00",
+    "20251106212822",
+    "20251108153010",
+    "Wed, 17 Dec 2025 13:53:29 GMT",
+    "Mon, 15 Dec 2025 08:07:02 -0500",
+    "Sat, 20 Dec 2025 16:44:11 +0000",
+    "2025-12-19T21:10:00Z",
+    "2025-12-19T21:10:00.000Z",
+    "2025-12-17 08:53:29",
+]
+
+def load_corpus(path):
+    """Fechas "published" de un directorio de JSON o del almacén raw"""
+    dates = []
+    index = os.path.join(path, "index.jsonl")
+
+    if os.path.exists(index):
+        for name in os.listdir(path):
+            if name.endswith(".jsonl") and name != "index.jsonl":
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    for line in f:
+                        dates.append(json.loads(line)["data"].get("published"))
+    else:
+        for name in os.listdir(path):
+            if name.endswith(".json"):
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    dates.append(json.load(f).get("published"))
+
+    return [d for d in dates if d]
+
+def legacy(value):
+    """extract_date original"""
+    return parser.parse(value).isoformat()
+
+def uncached(value):
+    return _parse_uncached(value).isoformat()
+
+def timed(fn, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in corpus:
+            fn(value)
+    return time.perf_counter() - start
+
+def main():
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else SAMPLE_DATES
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    n = len(corpus) * repeat
+
+    print(f"📊 {len(corpus)} fechas distintas x {repeat} repeticiones = {n:,} llamadas\n")
+
+    for label, fn in [
+        ("dateutil.parser.parse", legacy),
+        ("Rutas rápidas sin caché", uncached),
+        ("normalize_date (LRU)", normalize_date),
+    ]:
+        elapsed = timed(fn, corpus, repeat)
+        print(f"   - {label:<25} {elapsed:.3f}s ({elapsed / n * 1e6:.2f} µs/fecha)")
+
+if __name__ == "__main__":
+    main()
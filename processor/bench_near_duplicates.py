@@ -0,0 +1,97 @@
+"""
+Benchmark de la detección de casi duplicados.
+
+Llena un índice temporal con N artículos sintéticos y luego asigna un
+lote de artículos nuevos: la mitad son copias retocadas de artículos ya
+indexados (otro titular, algunas palabras cambiadas, el texto cortado
+como en un resumen de RSS) y la otra mitad son noticias distintas.
+Reporta el costo por artículo (firma y consulta), el tiempo de carga del
+índice desde disco y la precisión / cobertura de los duplicados.
+
+Uso: python bench_near_duplicates.py [n_indexados] [n_nuevos]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+from near_duplicates import NearDuplicateIndex, signatures
+
+DAY = "2025-12-17"
+
+def make_vocabulary(rng, size=20_000):
+    letters = "abcdefghijlmnoprstuvz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+def make_article(rng, vocabulary):
+    title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 12)))
+    text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(60, 200)))
+    return title, text
+
+def near_copy(rng, vocabulary, title, text):
+    """Otra versión de la misma noticia: retoques en título y texto"""
+    words = text.split()
+    for _ in range(rng.randint(0, 3)):
+        words[rng.randrange(min(len(words), 60))] = rng.choice(vocabulary)
+    words = words[:rng.randint(50, len(words))]
+    title_words = title.split()
+    title_words[rng.randrange(len(title_words))] = rng.choice(vocabulary)
+    return " ".join(title_words), " ".join(words)
+
+def main():
+    n_indexed = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_new = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(rng)
+    indexed = [make_article(rng, vocabulary) for _ in range(n_indexed)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "near_duplicates.bin")
+        index = NearDuplicateIndex(path)
+
+        print(f"📦 Indexando {n_indexed:,} artículos...")
+        start = time.perf_counter()
+        for i in range(0, n_indexed, 1000):
+            chunk = indexed[i:i + 1000]
+            index.assign([(f"k{i + j}", sig, DAY) for j, sig in enumerate(signatures(chunk))])
+        print(f"   - {time.perf_counter() - start:.1f}s, {os.path.getsize(path) / 1e6:.1f} MB en disco")
+
+        start = time.perf_counter()
+        loaded = NearDuplicateIndex(path)
+        print(f"   - Carga desde disco: {time.perf_counter() - start:.2f}s ({len(loaded):,} registros)\n")
+
+        # Nuevos: copias de artículos indexados y noticias distintas
+        batch, expected = [], []
+        for i in range(n_new):
+            if i % 2 == 0:
+                source = rng.randrange(n_indexed)
+                batch.append(near_copy(rng, vocabulary, *indexed[source]))
+                expected.append(f"k{source}")
+            else:
+                batch.append(make_article(rng, vocabulary))
+                expected.append(None)
+
+        start = time.perf_counter()
+        sigs = signatures(batch)
+        signed = time.perf_counter() - start
+
+        keys = [f"n{i}" for i in range(n_new)]
+        start = time.perf_counter()
+        canonicals = loaded.assign(list(zip(keys, sigs, [DAY] * n_new)))
+        assigned = time.perf_counter() - start
+
+    found = [c if c != key else None for key, c in zip(keys, canonicals)]
+    hits = sum(1 for f, e in zip(found, expected) if f is not None and f == e)
+    predicted = sum(1 for f in found if f is not None)
+    actual = sum(1 for e in expected if e is not None)
+
+    print(f"⚡ {n_new:,} artículos nuevos:")
+    print(f"   - Firma MinHash:   {signed / n_new * 1e6:.0f} µs/artículo")
+    print(f"   - Consulta + alta: {assigned / n_new * 1e6:.0f} µs/artículo")
+    print(f"   - Precisión: {hits / predicted if predicted else 0:.3f}   "
+          f"cobertura: {hits / actual if actual else 0:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Normalización de fechas de publicación.
+
+Los feeds usan pocas variantes de RFC-822 e ISO-8601, y Common Crawl usa
+marcas de 14 dígitos (YYYYMMDDhhmmss, en UTC). Esos formatos se resuelven
+con rutas rápidas de la biblioteca estándar; dateutil solo se usa para
+lo desconocido. El resultado se lleva siempre a la hora de Bogotá para
+que el analizador agrupe por el día colombiano correcto.
+"""
+import re
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    BOGOTA = ZoneInfo("America/Bogota")
+except Exception:
+    # Sin base de zonas horarias: Bogotá es UTC-5 fijo (sin horario de verano)
+    BOGOTA = timezone(timedelta(hours=-5), "America/Bogota")
+
+CDX_TIMESTAMP = re.compile(r"\d{14}")
+RFC822_HINT = re.compile(r"^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{2,4}\s")
+
+def _parse_iso(value):
+    """ISO-8601 con `datetime.fromisoformat` (acepta el sufijo Z)"""
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
+def _parse_uncached(value):
+    value = value.strip()
+
+    # Marca de tiempo de Common Crawl, siempre en UTC
+    if CDX_TIMESTAMP.fullmatch(value):
+        return datetime.strptime(value, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+
+    # "2025-12-17T08:53:29-05:00", "2025-12-17 08:53:29", "2025-12-17"
+    if value[:4].isdigit() and value[4:5] == "-":
+        try:
+            dt = _parse_iso(value)
+        except ValueError:
+            pass
+        else:
+            # Una fecha sin hora ya es un día colombiano
+            if len(value) == 10:
+                dt = dt.replace(tzinfo=BOGOTA)
+            return dt
+
+    # "Wed, 17 Dec 2025 13:53:29 GMT", "17 Dec 2025 08:53:29 -0500"
+    if RFC822_HINT.match(value):
+        try:
+            return parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            pass
+
+    # Formatos desconocidos
+    from dateutil import parser
+    return parser.parse(value)
+
+@lru_cache(maxsize=8192)
+def normalize_date(value):
+    """
+    Convierte una fecha en texto a ISO-8601 en hora de Bogotá.
+    Las fechas sin zona se interpretan en UTC, igual que los utcnow()
+    que usa el pipeline como respaldo. Lanza ValueError si no se reconoce.
+    """
+    try:
+        dt = _parse_uncached(value)
+    except (ValueError, OverflowError) as e:
+        raise ValueError(f"Fecha no reconocida: {value!r}") from e
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+
+    return dt.astimezone(BOGOTA).isoformat()
+
+def now_bogota():
+    """Fecha y hora actual en Bogotá, en ISO-8601"""
+    return datetime.now(BOGOTA).isoformat()
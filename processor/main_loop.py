@@ -1,51 +1,74 @@
 import os
-import json
 import time
-import re
+import zlib
+import fcntl
+import random
 from datetime import datetime
-from html import unescape
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from date_normalizer import normalize_date, now_bogota
+from near_duplicates import NearDuplicateIndex, signatures
+from common.article_store import ArticleStore, today
+from common.seen_links import DailySeenLinks, link_digest
+from common.text_cleaning import clean_html
+from common.resources import cpu_limit
+from common import events
+from common import metrics
 
-RAW_DIR = "/app/data/raw"
-CLEAN_DIR = "/app/data/clean"
+RAW_STORE_DIR = "/app/data/store/raw"
+CLEAN_STORE_DIR = "/app/data/store/clean"
 
-os.makedirs(CLEAN_DIR, exist_ok=True)
+raw_store = ArticleStore(RAW_STORE_DIR)
+clean_store = ArticleStore(CLEAN_STORE_DIR)
 
-def clean_html(text):
-    """Elimina etiquetas HTML y limpia el texto"""
-    if not text:
-        return ""
-    
-    # Decodificar entidades HTML
-    text = unescape(text)
-    
-    # Eliminar etiquetas HTML
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # Eliminar múltiples espacios
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Eliminar caracteres especiales problemáticos
-    text = text.replace('\xa0', ' ')
-    text = text.replace('\u200b', '')
-    
-    return text.strip()
+# Artículos limpios por lote anexado al almacén
+BATCH_SIZE = 200
+
+# Reparto entre réplicas: cada clave pertenece a un shard fijo y cada
+# réplica reclama shards libres con un flock mientras los procesa
+SHARD_COUNT = int(os.getenv("PROCESSOR_SHARDS", 8))
+SHARD_LOCK_DIR = "/app/data/store/processor_shards"
+os.makedirs(SHARD_LOCK_DIR, exist_ok=True)
+
+WORKERS = int(os.getenv("PROCESSOR_WORKERS", 0)) or cpu_limit()
+
+# Firmas MinHash de los artículos limpios, compartidas entre réplicas
+NEAR_DUP_FILE = "/app/data/store/near_duplicates.bin"
+near_duplicates = NearDuplicateIndex(NEAR_DUP_FILE)
+
+# Claves sin contenido mínimo (process_article devolvió INVALID): nunca
+# llegan a clean, así que se recuerdan para no contarlas como pendientes
+# ni volver a procesarlas. Un archivo por día, con la retención de raw
+REJECTED_DIR = "/app/data/store/processor_rejected"
+rejected = DailySeenLinks(REJECTED_DIR)
+
+# Resultado de process_article para un artículo sin contenido mínimo (un
+# str, para que se compare igual al volver del pool de procesos). None
+# indica un error: el artículo se reintenta en el próximo ciclo
+INVALID = "invalid"
+
+# Métricas en /metrics (METRICS_PORT); el pendiente sirve para escalar réplicas
+cycle = metrics.track_cycle("processor")
+BACKLOG = metrics.Gauge("processor_backlog_articles",
+                        "Artículos en raw que aún no están en clean ni fueron descartados")
+NEAR_DUPLICATES = metrics.Counter("processor_near_duplicates_total",
+                                  "Artículos agrupados con una noticia ya vista")
+
+_pool = None
 
 def extract_date(published_str):
     """
-    Extrae y normaliza la fecha de publicación
-    Maneja diferentes formatos de fecha
+    Extrae y normaliza la fecha de publicación a hora de Bogotá
+    Maneja diferentes formatos de fecha (ver date_normalizer)
     """
     if not published_str:
-        return datetime.utcnow().isoformat()
+        return now_bogota()
     
     try:
-        # Intentar parsear diferentes formatos comunes
-        from dateutil import parser
-        dt = parser.parse(published_str)
-        return dt.isoformat()
-    except:
+        return normalize_date(published_str)
+    except ValueError:
         # Si falla, usar fecha actual
-        return datetime.utcnow().isoformat()
+        return now_bogota()
 
 def process_article(raw_data):
     """Procesa un artículo individual"""
@@ -71,7 +94,7 @@ def process_article(raw_data):
         
         # Validar que tenga contenido mínimo
         if len(title) < 10 and len(summary) < 20:
-            return None
+            return INVALID
         
         return clean_data
         
@@ -79,88 +102,224 @@ def process_article(raw_data):
         print(f"  ⚠️  Error procesando artículo: {e}")
         return None
 
+def shard_of(key):
+    """Shard fijo de una clave, igual en todas las réplicas"""
+    return zlib.crc32(key.encode()) % SHARD_COUNT
+
+def try_claim_shard(shard):
+    """
+    Intenta reclamar un shard sin bloquear.
+    Devuelve el archivo de bloqueo (se libera al cerrarlo) o None si otra
+    réplica lo está procesando.
+    """
+    lock = open(os.path.join(SHARD_LOCK_DIR, f"shard-{shard:03d}.lock"), "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return lock
+    except BlockingIOError:
+        lock.close()
+        return None
+
+def is_done(key):
+    """El artículo ya está en clean o fue descartado"""
+    return key in clean_store or link_digest(key) in rejected
+
+def pending_keys():
+    """Claves de raw que aún no están en clean ni fueron descartadas"""
+    return [key for key in raw_store.keys() if not is_done(key)]
+
+def get_pool():
+    """Pool de procesos reutilizado entre ciclos"""
+    global _pool
+    if _pool is None and WORKERS > 1:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+def reset_pool():
+    """Descarta el pool (p. ej. si el OOM killer mató un worker)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def clean_articles(raw_docs):
+    """
+    process_article sobre un lote, en el pool si hay más de un worker. Un
+    pool con un worker muerto ya no acepta trabajo: se crea otro y se
+    reintenta el lote una vez; si vuelve a fallar, el lote queda para el
+    próximo ciclo (y ese ciclo empieza con un pool nuevo).
+    """
+    for attempt in range(2):
+        pool = get_pool()
+        if not pool:
+            return list(map(process_article, raw_docs))
+        try:
+            chunksize = max(1, len(raw_docs) // (WORKERS * 4))
+            return list(pool.map(process_article, raw_docs, chunksize=chunksize))
+        except BrokenProcessPool:
+            print("⚠️  Un worker del pool murió; se crea un pool nuevo")
+            reset_pool()
+            if attempt:
+                raise
+
+def mark_near_duplicates(batch):
+    """
+    Agrupa los artículos del lote con sus casi duplicados ya vistos (o del
+    mismo lote). Los duplicados se guardan igual, con la clave del primer
+    artículo del grupo en "duplicate_of", y el analizador los cuenta una
+    sola vez. Devuelve cuántos duplicados hubo.
+    """
+    sigs = signatures([(clean_data["title"], clean_data["text"]) for _, clean_data, _ in batch])
+    canonicals = near_duplicates.assign(
+        [(key, sig, day) for (key, _, day), sig in zip(batch, sigs)]
+    )
+    
+    duplicates = 0
+    for (key, clean_data, _), canonical in zip(batch, canonicals):
+        if canonical != key:
+            clean_data["duplicate_of"] = canonical
+            duplicates += 1
+    return duplicates
+
+def process_batch(keys):
+    """
+    Lee, procesa y guarda un lote de artículos.
+    Devuelve (procesados, saltados, casi duplicados)
+    """
+    docs = []
+    skipped = 0
+    
+    for key in keys:
+        try:
+            docs.append((key, raw_store.get(key)))
+        except Exception as e:
+            print(f"  ❌ Error con {key}: {e}")
+            skipped += 1
+    
+    results = clean_articles([raw_data for _, raw_data in docs])
+    
+    batch = []
+    invalid = []
+    for (key, _), clean_data in zip(docs, results):
+        if clean_data == INVALID:
+            invalid.append(key)
+        elif clean_data:
+            batch.append((key, clean_data, today()))
+        else:
+            # Error al procesar: queda pendiente para el próximo ciclo
+            skipped += 1
+    
+    # Recordar los inválidos para no reprocesarlos en cada ciclo
+    if invalid:
+        rejected.add_many([link_digest(key) for key in invalid], today())
+        skipped += len(invalid)
+    
+    duplicates = mark_near_duplicates(batch) if batch else 0
+    
+    return clean_store.append_many(batch), skipped, duplicates
+
+@cycle
 def process_all_files():
-    """Procesa todos los archivos en el directorio raw"""
+    """Procesa los artículos del almacén raw que aún no están en clean"""
     print(f"[{datetime.now()}] Iniciando procesamiento de noticias...")
     
     processed = 0
     skipped = 0
+    duplicates = 0
     
-    # Obtener lista de archivos raw
-    raw_files = [f for f in os.listdir(RAW_DIR) if f.endswith('.json')]
+    # Incorporar lo escrito por otros servicios desde el último ciclo
+    raw_store.refresh()
+    clean_store.refresh()
+    rejected.refresh()
     
-    print(f"📄 Archivos encontrados: {len(raw_files)}")
+    print(f"📄 Artículos encontrados: {len(raw_store)}")
     
-    for filename in raw_files:
-        raw_path = os.path.join(RAW_DIR, filename)
-        
-        # Usar mismo nombre para archivo limpio
-        clean_path = os.path.join(CLEAN_DIR, filename)
-        
-        # Saltar si ya fue procesado
-        if os.path.exists(clean_path):
+    # Saltar los ya procesados o descartados y agrupar por shard
+    pending = {}
+    for key in raw_store.keys():
+        if is_done(key):
             skipped += 1
+        else:
+            pending.setdefault(shard_of(key), []).append(key)
+    
+    # Orden aleatorio para que las réplicas empiecen por shards distintos
+    shards = list(pending)
+    random.shuffle(shards)
+    claimed = 0
+    
+    for shard in shards:
+        lock = try_claim_shard(shard)
+        if lock is None:
             continue
         
-        try:
-            # Leer archivo raw
-            with open(raw_path, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
+        with lock:
+            claimed += 1
             
-            # Procesar
-            clean_data = process_article(raw_data)
+            # Otra réplica pudo haberlo procesado antes de que lo reclamáramos
+            clean_store.refresh()
+            rejected.refresh()
+            keys = [key for key in pending[shard] if not is_done(key)]
+            skipped += len(pending[shard]) - len(keys)
             
-            if clean_data:
-                # Guardar archivo limpio
-                with open(clean_path, 'w', encoding='utf-8') as f:
-                    json.dump(clean_data, f, ensure_ascii=False, indent=2)
-                
-                processed += 1
-            else:
-                skipped += 1
-                
-        except Exception as e:
-            print(f"  ❌ Error con {filename}: {e}")
-            skipped += 1
+            for i in range(0, len(keys), BATCH_SIZE):
+                done, failed, repeated = process_batch(keys[i:i + BATCH_SIZE])
+                processed += done
+                skipped += failed
+                duplicates += repeated
+                cycle.count("processed", done)
+                cycle.count("invalid", failed)
+                NEAR_DUPLICATES.inc(repeated)
+    
+    # Despertar al analizador
+    if processed > 0:
+        events.publish("clean")
     
-    print(f"✅ Procesados: {processed} nuevos")
-    print(f"⏭️  Saltados: {skipped} (ya procesados o inválidos)\n")
+    # Pendiente al terminar el ciclo (incluye lo que llegó mientras tanto)
+    raw_store.refresh()
+    clean_store.refresh()
+    rejected.refresh()
+    BACKLOG.set(len(pending_keys()))
+    
+    print(f"✅ Procesados: {processed} nuevos ({claimed}/{len(shards)} shards, {WORKERS} procesos)")
+    print(f"🧬 Casi duplicados: {duplicates} (agrupados con una noticia ya vista)")
+    print(f"⏭️  Saltados: {skipped} (ya procesados, inválidos o con error)\n")
 
 def cleanup_old_files(days_to_keep=7):
     """
-    Limpia archivos antiguos para ahorrar espacio
+    Limpia particiones antiguas para ahorrar espacio
     Mantiene solo los últimos N días
     """
     from datetime import timedelta
     
-    cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+    cutoff_day = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
     
     deleted = 0
     
-    for directory in [RAW_DIR, CLEAN_DIR]:
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            
-            # Obtener fecha de modificación
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-            
-            # Eliminar si es muy antiguo
-            if file_mtime < cutoff_date:
-                os.remove(filepath)
-                deleted += 1
+    for store in [raw_store, clean_store]:
+        deleted += store.drop_days_before(cutoff_day)
+    
+    # Las firmas y los descartados siguen la misma retención que los artículos
+    dropped = near_duplicates.drop_days_before(cutoff_day)
+    rejected.drop_days_before(cutoff_day)
     
     if deleted > 0:
-        print(f"🗑️  Eliminados {deleted} archivos antiguos")
+        print(f"🗑️  Eliminados {deleted} artículos antiguos")
+    if dropped > 0:
+        print(f"🗑️  Eliminadas {dropped} firmas de casi duplicados")
 
 def get_statistics():
     """Obtiene estadísticas del procesamiento"""
-    raw_count = len([f for f in os.listdir(RAW_DIR) if f.endswith('.json')])
-    clean_count = len([f for f in os.listdir(CLEAN_DIR) if f.endswith('.json')])
+    raw_store.refresh()
+    clean_store.refresh()
+    rejected.refresh()
+    
+    pending = len(pending_keys())
+    BACKLOG.set(pending)
     
     return {
-        "raw_files": raw_count,
-        "clean_files": clean_count,
-        "pending": raw_count - clean_count
+        "raw_files": len(raw_store),
+        "clean_files": len(clean_store),
+        "pending": pending
     }
 
 def main():
@@ -170,6 +329,11 @@ def main():
     print("🚀 Iniciando procesador de noticias...")
     print(f"⏱️  Intervalo: {interval} segundos ({interval/60:.1f} minutos)\n")
     
+    # Nuevos artículos raw despiertan al procesador antes del intervalo
+    raw_events = events.Subscription("raw")
+    
+    metrics.serve()
+    
     while True:
         try:
             # Mostrar estadísticas
@@ -189,8 +353,8 @@ def main():
             import traceback
             traceback.print_exc()
         
-        print(f"💤 Esperando {interval} segundos...\n")
-        time.sleep(interval)
+        print(f"💤 Esperando nuevos artículos (máx. {interval} segundos)...\n")
+        raw_events.wait(interval)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
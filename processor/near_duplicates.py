@@ -0,0 +1,302 @@
+"""
+Detección de noticias casi duplicadas (MinHash + LSH).
+
+La misma noticia llega por RSS y por Common Crawl, o la replican varios
+medios con cambios menores; el hash del enlace no las reconoce. Cada
+artículo se resume en una firma MinHash de NUM_PERM valores sobre los
+shingles de 3 palabras de su título y el comienzo de su texto. La
+fracción de valores iguales entre dos firmas estima la similitud de
+Jaccard entre sus conjuntos de shingles.
+
+La firma se divide en NEAR_DUP_BANDS bandas; dos artículos son
+candidatos si coinciden en todos los valores de alguna banda, y se
+confirman si la similitud estimada llega a NEAR_DUP_THRESHOLD. Con 16
+bandas de 4 valores, un par con similitud 0.6 se encuentra con
+probabilidad ~0.89 y uno con 0.8 con ~0.999, mientras que dos artículos
+distintos casi nunca llegan a compararse.
+
+Los casi duplicados forman un grupo cuyo representante es el primer
+artículo visto: cada registro guarda la clave de su representante.
+
+El índice es un archivo binario de solo anexado, compartido por las
+réplicas del procesador (un registro de tamaño fijo por artículo, con
+flock al escribir). En memoria se mantiene un arreglo ordenado con las
+claves de banda de todos los registros más un diccionario con las de los
+agregados desde la última fusión, así que consultar no toca el disco.
+drop_days_before() compacta el archivo con la misma retención por días
+que los almacenes.
+"""
+import os
+import re
+import zlib
+import fcntl
+import numpy as np
+from datetime import date
+
+NUM_PERM = 64
+BANDS = int(os.getenv("NEAR_DUP_BANDS", 16))
+THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.6))
+
+# Palabras por shingle y palabras del texto que entran en la firma: el
+# resumen de RSS y el texto de Common Crawl coinciden en el comienzo
+SHINGLE_SIZE = 3
+TEXT_WORDS = 60
+
+# Con menos shingles la firma no es confiable y el artículo no se indexa
+MIN_SHINGLES = 4
+
+# Claves de banda pendientes a partir de las cuales se fusionan al arreglo
+MERGE_THRESHOLD = 65536
+
+# Permutaciones (a·x + b) mod PRIME; semillas fijas para que las firmas
+# sean las mismas en todas las réplicas y ejecuciones
+PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240611)
+PERM_A = _rng.integers(1, int(PRIME), NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.integers(0, int(PRIME), NUM_PERM, dtype=np.uint64)
+
+FNV_PRIME = np.uint64(1099511628211)
+
+TOKEN_RE = re.compile(r"\w+")
+
+RECORD = np.dtype([
+    ("key", "S48"),            # clave del artículo (rss_<md5>, cc_<md5>)
+    ("canonical", "S48"),      # clave del representante de su grupo
+    ("day", "<u4"),            # ordinal del día de la partición
+    ("signature", "<u4", (NUM_PERM,)),
+])
+
+def shingles(title, text):
+    """Hashes (crc32) de los shingles de palabras de un artículo"""
+    words = TOKEN_RE.findall(title.lower()) + TOKEN_RE.findall(text.lower())[:TEXT_WORDS]
+    grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return [zlib.crc32(gram.encode()) for gram in grams]
+
+def signatures(docs):
+    """
+    Firmas MinHash (artículos × NUM_PERM) de una lista de (título, texto).
+    None en las filas con muy pocos shingles.
+    """
+    hashed = [shingles(title, text) for title, text in docs]
+    valid = [i for i, h in enumerate(hashed) if len(h) >= MIN_SHINGLES]
+    result = [None] * len(docs)
+    if not valid:
+        return result
+
+    lengths = [len(hashed[i]) for i in valid]
+    values = np.fromiter((h for i in valid for h in hashed[i]), dtype=np.uint64, count=sum(lengths))
+
+    # Todas las permutaciones de todos los shingles de una vez; el mínimo
+    # por artículo sale de reduceat sobre los tramos de cada uno
+    permuted = (values[:, None] * PERM_A + PERM_B) % PRIME
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    minimums = np.minimum.reduceat(permuted, starts, axis=0).astype(np.uint32)
+
+    for row, i in enumerate(valid):
+        result[i] = minimums[row]
+    return result
+
+def band_keys(sigs, bands=BANDS):
+    """Clave de 64 bits de cada banda (registros × bandas), distinta por banda"""
+    sigs = np.atleast_2d(sigs).astype(np.uint64)
+    rows = NUM_PERM // bands
+    keys = np.broadcast_to(np.arange(bands, dtype=np.uint64) + np.uint64(1), (len(sigs), bands)).copy()
+    blocks = sigs[:, :bands * rows].reshape(len(sigs), bands, rows)
+    with np.errstate(over="ignore"):
+        for r in range(rows):
+            keys = (keys ^ blocks[:, :, r]) * FNV_PRIME
+    return keys
+
+def day_ordinal(day):
+    return date.fromisoformat(day).toordinal()
+
+class NearDuplicateIndex:
+    """Índice LSH de firmas MinHash respaldado por un archivo binario"""
+
+    def __init__(self, path, threshold=THRESHOLD, bands=BANDS):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.threshold = threshold
+        self.bands = bands
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        self._records = np.zeros(0, dtype=RECORD)
+        self._size = 0
+        self._pos = 0
+        self._ino = None
+
+        # Claves de banda fusionadas (ordenadas) y su registro; pendientes aparte
+        self._band_keys = np.zeros(0, dtype=np.uint64)
+        self._band_rows = np.zeros(0, dtype=np.int64)
+        self._pending = {}
+        self._pending_count = 0
+
+    def __len__(self):
+        return self._size
+
+    def refresh(self):
+        """
+        Incorpora los registros agregados al archivo desde la última lectura.
+        Si el archivo fue compactado (cambió de inodo) se recarga completo.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if st.st_ino != self._ino or st.st_size < self._pos:
+            self._reset()
+            self._ino = st.st_ino
+
+        # Ignorar un registro escrito a medias al final del archivo
+        size = st.st_size - st.st_size % RECORD.itemsize
+        if size <= self._pos:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._pos)
+            new = np.frombuffer(f.read(size - self._pos), dtype=RECORD)
+        self._pos = size
+        self._extend(new)
+
+    def _extend(self, new):
+        """Agrega registros al arreglo en memoria y sus claves de banda al índice"""
+        first = self._size
+        if first + len(new) > len(self._records):
+            grown = np.zeros(max(2 * len(self._records), first + len(new), 1024), dtype=RECORD)
+            grown[:first] = self._records[:first]
+            self._records = grown
+        self._records[first:first + len(new)] = new
+        self._size += len(new)
+
+        keys = band_keys(new["signature"], self.bands)
+        if first == 0:
+            # Carga inicial: ordenar una sola vez
+            self._band_keys, self._band_rows = keys.ravel(), np.repeat(np.arange(len(new)), self.bands)
+            order = np.argsort(self._band_keys, kind="stable")
+            self._band_keys, self._band_rows = self._band_keys[order], self._band_rows[order]
+            return
+
+        for row, row_keys in enumerate(keys.tolist(), start=first):
+            for key in row_keys:
+                self._pending.setdefault(key, []).append(row)
+        self._pending_count += keys.size
+        self._maybe_merge()
+
+    def _maybe_merge(self):
+        """Fusiona las claves pendientes al arreglo ordenado cuando crecen"""
+        if self._pending_count < MERGE_THRESHOLD:
+            return
+        keys = np.array([k for k, rows in self._pending.items() for _ in rows], dtype=np.uint64)
+        rows = np.array([r for rows in self._pending.values() for r in rows], dtype=np.int64)
+        keys, rows = np.concatenate([self._band_keys, keys]), np.concatenate([self._band_rows, rows])
+        order = np.argsort(keys, kind="stable")
+        self._band_keys, self._band_rows = keys[order], rows[order]
+        self._pending.clear()
+        self._pending_count = 0
+
+    def _candidates(self, keys):
+        """Registros que comparten alguna banda (claves de banda de una firma)"""
+        rows = set()
+        lo = np.searchsorted(self._band_keys, keys, side="left")
+        hi = np.searchsorted(self._band_keys, keys, side="right")
+        for i, j, key in zip(lo.tolist(), hi.tolist(), keys.tolist()):
+            if i < j:
+                rows.update(self._band_rows[i:j].tolist())
+            rows.update(self._pending.get(key, ()))
+        return rows
+
+    def match(self, signature, keys=None):
+        """(fila, similitud) del registro más parecido sobre el umbral, o None"""
+        if keys is None:
+            keys = band_keys(signature, self.bands)[0]
+        rows = list(self._candidates(keys))
+        if not rows:
+            return None
+
+        similarity = (self._records["signature"][rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return rows[best], float(similarity[best])
+
+    def assign(self, items):
+        """
+        Asigna cada artículo (clave, firma, día) a un grupo y anexa los
+        registros al archivo en una sola escritura. Devuelve la clave del
+        representante de cada artículo (la propia si no tiene duplicados
+        previos). Los artículos sin firma no se indexan.
+        """
+        canonicals = []
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Ver lo que otras réplicas anexaron antes de comparar
+                self.refresh()
+
+                new = []
+                for key, signature, day in items:
+                    if signature is None:
+                        canonicals.append(key)
+                        continue
+
+                    found = self.match(signature)
+                    if found is not None and self._records["key"][found[0]].decode() == key:
+                        # Ya indexado (p. ej. un ciclo que falló antes de escribir en clean)
+                        canonicals.append(self._records["canonical"][found[0]].decode())
+                        continue
+
+                    canonical = self._records["canonical"][found[0]].decode() if found else key
+                    canonicals.append(canonical)
+
+                    record = np.zeros(1, dtype=RECORD)
+                    record["key"], record["canonical"] = key.encode(), canonical.encode()
+                    record["day"], record["signature"] = day_ordinal(day), signature
+
+                    # Visible para los siguientes artículos del mismo lote
+                    self._extend(record)
+                    new.append(record)
+
+                if new:
+                    data = np.concatenate(new).tobytes()
+                    with open(self.path, "ab") as f:
+                        f.write(data)
+                    self._pos += len(data)
+                    if self._ino is None:
+                        self._ino = os.stat(self.path).st_ino
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        return canonicals
+
+    def drop_days_before(self, cutoff_day):
+        """
+        Elimina los registros de días anteriores a `cutoff_day` (YYYY-MM-DD)
+        y compacta el archivo. Devuelve el número de registros eliminados.
+        """
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                records = self._records[:self._size]
+                kept = records[records["day"] >= day_ordinal(cutoff_day)]
+                removed = len(records) - len(kept)
+                if not removed:
+                    return 0
+
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(kept.tobytes())
+                os.replace(tmp_path, self.path)
+
+                self._reset()
+                self.refresh()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        return removed